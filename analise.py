@@ -4,6 +4,7 @@ Gera relatórios e análises dos dados processados.
 """
 
 import os
+import numpy as np
 import pandas as pd
 import config
 
@@ -130,6 +131,99 @@ def analise_por_pais(df: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
     return analise
 
 
+def periodo_mensal(ano: int, mes: int) -> str:
+    """Rótulo do mês no formato dos artefatos ("2024-03")."""
+    return f"{int(ano)}-{int(mes):02d}"
+
+
+class IndicePrefixos:
+    """
+    Somas acumuladas de séries mensais para totais de intervalos em O(1).
+
+    O eixo é contínuo (todos os meses do primeiro ao último dos dados, sem
+    lacunas), então a posição de um mês é aritmética. Para cada série (uma
+    combinação de valores das colunas chave) guarda-se acumulado[k] = soma dos
+    k primeiros meses (acumulado[0] = 0), e o total de [inicio, fim] é
+    acumulado[fim + 1] - acumulado[inicio]: duas leituras, qualquer que seja a
+    largura do intervalo.
+
+    Exemplo:
+        indice = IndicePrefixos(df_exp, ['CADEIA', 'CO_PAIS'])
+        indice.total('2023-07', '2024-06', ('Sojicultura', 160))
+        indice.totais('2024-01', '2024-03')   # todas as séries
+    """
+
+    def __init__(self, df: pd.DataFrame, chaves=(), valor: str = 'VL_FOB', eixo=None):
+        """
+        Args:
+            df: Registros com CO_ANO, CO_MES, as colunas chave e a coluna valor
+            chaves: Colunas que identificam uma série (vazio = série única)
+            valor: Coluna somada
+            eixo: ((ano, mes), (ano, mes)) do primeiro e último mês do eixo
+                (padrão: os dos dados); meses fora do eixo são ignorados
+        """
+        self.chaves = list(chaves)
+        meses = (df['CO_ANO'].astype(np.int64) * 12 + df['CO_MES'].astype(np.int64) - 1).to_numpy()
+        if eixo is None:
+            self.inicio, fim = int(meses.min()), int(meses.max())
+        else:
+            self.inicio, fim = (int(ano) * 12 + int(mes) - 1 for ano, mes in eixo)
+        n_meses = fim - self.inicio + 1
+
+        if self.chaves:
+            codigos, series = pd.MultiIndex.from_frame(df[self.chaves]).factorize(sort=True)
+            self.series = series.set_names(self.chaves)
+        else:
+            codigos = np.zeros(len(df), dtype=np.int64)
+            self.series = pd.Index([()])
+
+        posicoes = meses - self.inicio
+        validas = (codigos >= 0) & (posicoes >= 0) & (posicoes < n_meses)
+        mensal = np.zeros((len(self.series), n_meses + 1))
+        np.add.at(mensal, (codigos[validas], posicoes[validas] + 1), df[valor].to_numpy()[validas])
+        self.acumulado = np.cumsum(mensal, axis=1)
+
+    @property
+    def periodos(self) -> list:
+        """Meses do eixo ("AAAA-MM"), na ordem das colunas de acumulado[:, 1:]."""
+        return [periodo_mensal(m // 12, m % 12 + 1)
+                for m in range(self.inicio, self.inicio + self.acumulado.shape[1] - 1)]
+
+    def posicao(self, periodo) -> int:
+        """Posição de um mês ("AAAA-MM" ou (ano, mes)) no eixo, limitada ao eixo."""
+        ano, mes = (periodo.split('-') if isinstance(periodo, str) else periodo)
+        pos = int(ano) * 12 + int(mes) - 1 - self.inicio
+        return min(max(pos, -1), self.acumulado.shape[1] - 1)
+
+    def _limites(self, inicio, fim):
+        i = max(self.posicao(inicio), 0)
+        j = min(self.posicao(fim) + 1, self.acumulado.shape[1] - 1)
+        return i, max(i, j)
+
+    def total(self, inicio, fim, serie=()) -> float:
+        """
+        Total da série no intervalo [inicio, fim] (meses inclusivos).
+
+        Args:
+            inicio, fim: "AAAA-MM" ou (ano, mes)
+            serie: Valores das chaves (tupla na ordem de chaves; vazio sem chaves)
+
+        Returns:
+            float (0 para séries ausentes)
+        """
+        serie = serie if isinstance(serie, tuple) else (serie,)
+        linha = self.series.get_indexer([serie])[0] if self.chaves else 0
+        if linha < 0:
+            return 0.0
+        i, j = self._limites(inicio, fim)
+        return float(self.acumulado[linha, j] - self.acumulado[linha, i])
+
+    def totais(self, inicio, fim) -> pd.Series:
+        """Total de cada série no intervalo [inicio, fim], indexado pelas chaves."""
+        i, j = self._limites(inicio, fim)
+        return pd.Series(self.acumulado[:, j] - self.acumulado[:, i], index=self.series)
+
+
 def gerar_balanca_comercial(dados: dict) -> pd.DataFrame:
     """Gera balança comercial agrícola do Paraná."""
     resultados = []
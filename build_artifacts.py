@@ -0,0 +1,633 @@
+# -*- coding: utf-8 -*-
+"""
+Geração paralela dos artefatos do dashboard.
+
+Carrega os dados processados uma única vez, monta o cubo base e gera todos
+os arquivos de dashboard/public/data em um pool de processos, respeitando
+as dependências entre eles (ex.: forecasts.json usa a saída do
+forecasting.py). O tempo total passa a ser o do artefato mais lento, e não
+a soma de todos.
+
+Substitui a sequência forecasting.py -> prepare_dashboard_data.py (e a
+geração de sankey_data.json / municipios_data.json) depois do
+process_unified.py. Por último, shards.py fatia os artefatos em boot.json
+e shards/ para o carregamento sob demanda do dashboard, e manifesto.py
+publica cópias com o hash do conteúdo no nome e o manifest.json (com os
+deltas de aggregated.json/detailed.json para a versão anterior, deltas.py).
+O manifesto é regerado sempre que algum artefato é gerado; se não puder ser
+(ex.: um artefato de dados falhou), o anterior é removido, para que o
+dashboard não resolva cópias desatualizadas.
+
+Cada artefato registra uma chave com o hash das suas entradas (parquets
+processados, previsões, regras de cadeia, código dos módulos usados, opções
+de formato e chaves das dependências) em data/processed/artefatos_estado.json.
+Só os artefatos cuja chave mudou (ou cuja saída não existe) são gerados, e os
+dados só são carregados se algum deles precisar. Arquivos com o mesmo
+conteúdo não são regravados (serializacao.gravar_se_mudou).
+
+Os parquets entram na chave inteiros, não por ano: como quase todo artefato
+cobre a série completa, qualquer atualização mensal dos dados muda a chave de
+todos os artefatos que leem dados (entradas=True) e gera todos de novo. A
+geração incremental só economiza quando mudam código, regras, opções de
+formato, previsões ou as fontes geográficas - e os dados ficam iguais.
+
+Uso:
+    python build_artifacts.py                 # Gera todos os artefatos
+    python build_artifacts.py --workers 2     # Limita o pool
+    python build_artifacts.py --threads       # Pool de threads em vez de processos
+    python build_artifacts.py --colunar       # Tabelas grandes no formato colunar
+    python build_artifacts.py --arrow         # Também publica tabelas em Arrow IPC
+    python build_artifacts.py --forcar        # Gera mesmo os artefatos em dia
+    python build_artifacts.py aggregated.json map_data.json   # Apenas alguns
+"""
+
+import argparse
+import glob
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from pathlib import Path
+
+import config
+from compressao import imprimir_tamanhos
+from manifesto import MANIFESTO
+from serializacao import escrever_json
+from shards import ENTRADAS as SHARDS_ENTRADAS
+# prepare_dashboard_data já ajusta o encoding do stdout no Windows
+import prepare_dashboard_data as dashboard
+
+# Colunas dos registros usadas pelos artefatos por município (Sankey e mapa)
+COLUNAS_MUNICIPIO = ['CO_ANO', 'CO_MUN', 'NO_MUN', 'CO_PAIS', 'NO_PAIS', 'CADEIA', 'VL_FOB', 'KG_LIQUIDO']
+
+# Arquivos lidos por carregar_entradas (dashboard.carregar_dados), com hash
+# do arquivo inteiro: um mês novo invalida todos os artefatos com entradas
+ARQUIVOS_DADOS = [
+    os.path.join(dashboard.DATA_DIR, nome)
+    for nome in ("unified_exp_pr.parquet", "unified_imp_pr.parquet",
+                 "exportacoes_pr_agro.parquet", "importacoes_pr_agro.parquet")
+]
+
+# Saída do forecasting.py, lida por forecasts.json
+PREVISOES_PATH = os.path.join(config.PROCESSED_DIR, "previsoes.json")
+
+# Chave de entradas de cada artefato na última geração
+ESTADO_PATH = os.path.join(config.PROCESSED_DIR, "artefatos_estado.json")
+
+# Código usado por todos os artefatos / pelos que partem do cubo
+CODIGO_BASE = ['build_artifacts.py', 'config.py', 'serializacao.py', 'compressao.py']
+CODIGO_DADOS = ['prepare_dashboard_data.py', 'ncm_cadeias_map.py', 'cadeia_lookup.py', 'dimensoes.py']
+
+
+def _saida(nome):
+    return os.path.join(dashboard.OUTPUT_DIR, nome)
+
+
+# =============================================================================
+# ARTEFATOS
+# =============================================================================
+# Cada artefato é uma função de módulo (serializável para o pool de processos)
+# que recebe apenas as entradas que declara em ARTEFATOS.
+
+def gerar_previsoes(cubo_exp, cubo_imp):
+    """Previsões do forecasting.py (entrada de forecasts.json)."""
+    import forecasting
+
+    forecasts = forecasting.generate_forecasts(cubo_exp, cubo_imp, n_periods=2)
+    if forecasts is None:
+        raise RuntimeError("Não foi possível gerar previsões")
+    forecasting.salvar_previsoes(forecasts, PREVISOES_PATH, comprimir=False)
+
+
+def gerar_aggregated(cubo_exp, cubo_imp):
+    dashboard.salvar_json(dashboard.preparar_aggregated(cubo_exp, cubo_imp), "aggregated.json")
+
+
+def gerar_detailed(cubo_exp, cubo_imp):
+    dashboard.salvar_json(dashboard.preparar_detailed(cubo_exp, cubo_imp), "detailed.json")
+
+
+def gerar_forecasts(cubo_exp, cubo_imp):
+    dashboard.salvar_json(dashboard.preparar_forecasts(cubo_exp, cubo_imp, PREVISOES_PATH),
+                          "forecasts.json")
+
+
+def gerar_mapa_paises(cubo_exp, cubo_imp):
+    dashboard.salvar_json(dashboard.preparar_mapa_paises(cubo_exp, cubo_imp), "map_data.json")
+
+
+def gerar_graficos(cubo_exp, cubo_imp):
+    dashboard.salvar_json(dashboard.preparar_graficos(cubo_exp, cubo_imp), "graficos.json")
+
+
+def gerar_prefixos(cubo_exp, cubo_imp):
+    dashboard.salvar_json(dashboard.preparar_prefixos(cubo_exp, cubo_imp), "prefixos.json")
+
+
+def gerar_hierarquia_hs(cubo_exp, cubo_imp):
+    dashboard.salvar_json(dashboard.preparar_hierarquia_hs(cubo_exp, cubo_imp), "hierarquia_hs.json")
+
+
+def gerar_sankey(registros):
+    from process_unified import generate_sankey_data, salvar_sankey
+
+    salvar_sankey(generate_sankey_data(registros, {}, {}))
+
+
+def gerar_municipios(registros):
+    from update_municipios import preparar_municipios_data, salvar_municipios_data
+
+    salvar_municipios_data(preparar_municipios_data(registros, registros))
+
+
+def gerar_shards():
+    from shards import gerar_shards as gerar
+
+    if gerar(dashboard.OUTPUT_DIR) is None:
+        raise RuntimeError("aggregated.json não encontrado")
+
+
+def gerar_manifesto():
+    from manifesto import publicar_manifesto
+
+    publicar_manifesto(dashboard.OUTPUT_DIR)
+
+
+def _manter_publicado(nome, motivo):
+    """
+    Mantém o GeoJSON já publicado quando a fonte não pode ser convertida aqui
+    (ex.: CI sem geopandas). Sem o arquivo publicado, é uma falha.
+    """
+    if not os.path.exists(os.path.join(dashboard.OUTPUT_DIR, nome)):
+        raise RuntimeError(f"{motivo} e {nome} não publicado")
+    print(f"  AVISO: {motivo}; mantendo {nome} publicado")
+
+
+def remover_manifesto():
+    """Remove o manifest.json (e os irmãos .gz/.br), se existir."""
+    for sufixo in ('', '.gz', '.br'):
+        caminho = Path(dashboard.OUTPUT_DIR) / f"{MANIFESTO}{sufixo}"
+        if caminho.exists():
+            caminho.unlink()
+            if not sufixo:
+                print(f"  AVISO: {MANIFESTO} removido (não foi regerado)")
+
+
+def gerar_geojson():
+    if importlib.util.find_spec('geopandas') is None:
+        _manter_publicado('countries.geojson', "geopandas não instalado")
+    elif not os.path.exists(dashboard.SHAPEFILE_PATH):
+        _manter_publicado('countries.geojson', f"{dashboard.SHAPEFILE_PATH} não encontrado")
+    elif not dashboard.converter_shapefile_geojson():
+        raise RuntimeError("Shapefile não convertido")
+
+
+def gerar_topojson_paises():
+    if not dashboard.publicar_mapa_paises():
+        raise RuntimeError("countries_merged.geojson não encontrado")
+
+
+def gerar_geojson_municipios():
+    if not os.path.exists(dashboard.MUNICIPIOS_GEOJSON_PATH):
+        _manter_publicado('mun_PR.geojson', f"{dashboard.MUNICIPIOS_GEOJSON_PATH} não encontrado")
+    elif not dashboard.publicar_mapa_municipios():
+        raise RuntimeError("GeoJSON de municípios não publicado")
+
+
+# nome -> função, entradas (chaves de carregar_entradas), dependências e, para
+# a chave de entradas, o código (módulos), arquivos lidos e saídas esperadas
+ARTEFATOS = {
+    'previsoes': {
+        'funcao': gerar_previsoes,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': [],
+        'codigo': CODIGO_DADOS + ['forecasting.py'],
+        'arquivos': [],
+        'saidas': [PREVISOES_PATH],
+    },
+    'aggregated.json': {
+        'funcao': gerar_aggregated,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': [],
+        'codigo': CODIGO_DADOS,
+        'arquivos': [],
+        'saidas': [_saida('aggregated.json')],
+    },
+    'detailed.json': {
+        'funcao': gerar_detailed,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': [],
+        'codigo': CODIGO_DADOS,
+        'arquivos': [],
+        'saidas': [_saida('detailed.json')],
+    },
+    'forecasts.json': {
+        'funcao': gerar_forecasts,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': ['previsoes'],
+        'codigo': CODIGO_DADOS,
+        'arquivos': [PREVISOES_PATH],
+        'saidas': [_saida('forecasts.json')],
+    },
+    'map_data.json': {
+        'funcao': gerar_mapa_paises,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': [],
+        'codigo': CODIGO_DADOS,
+        'arquivos': [],
+        'saidas': [_saida('map_data.json')],
+    },
+    'graficos.json': {
+        'funcao': gerar_graficos,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': [],
+        'codigo': CODIGO_DADOS,
+        'arquivos': [],
+        'saidas': [_saida('graficos.json')],
+    },
+    'prefixos.json': {
+        'funcao': gerar_prefixos,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': [],
+        'codigo': CODIGO_DADOS + ['analise.py'],
+        'arquivos': [],
+        'saidas': [_saida('prefixos.json')],
+    },
+    'hierarquia_hs.json': {
+        'funcao': gerar_hierarquia_hs,
+        'entradas': ['cubo_exp', 'cubo_imp'],
+        'depende': [],
+        'codigo': CODIGO_DADOS,
+        'arquivos': [],
+        'saidas': [_saida('hierarquia_hs.json')],
+    },
+    'sankey_data.json': {
+        'funcao': gerar_sankey,
+        'entradas': ['registros'],
+        'depende': [],
+        'codigo': CODIGO_DADOS + ['process_unified.py', 'sankey.py'],
+        'arquivos': [],
+        'saidas': [_saida('sankey_data.json'), _saida('sankey_layout.json')],
+    },
+    'municipios_data.json': {
+        'funcao': gerar_municipios,
+        'entradas': ['registros'],
+        'depende': [],
+        'codigo': CODIGO_DADOS + ['update_municipios.py', 'sankey.py'],
+        'arquivos': [],
+        'saidas': [_saida('municipios_data.json')],
+    },
+    'shards': {
+        'funcao': gerar_shards,
+        'entradas': [],
+        'depende': SHARDS_ENTRADAS,
+        'codigo': ['shards.py', 'manifesto.py', 'dimensoes.py', 'ncm_cadeias_map.py'],
+        'arquivos': [],
+        'saidas': [_saida('boot.json'), _saida('shards/index.json')],
+    },
+    'countries.geojson': {
+        'funcao': gerar_geojson,
+        'entradas': [],
+        'depende': [],
+        'codigo': ['prepare_dashboard_data.py', 'topologia.py'],
+        'arquivos': sorted(glob.glob(os.path.splitext(dashboard.SHAPEFILE_PATH)[0] + '.*')),
+        'saidas': [_saida('countries.geojson')],
+    },
+    # Mapa do WorldMap: countries_merged.geojson é versionado (merge_countries.py)
+    # e o TopoJSON é gerado dele, sem geopandas
+    'countries_merged.topojson': {
+        'funcao': gerar_topojson_paises,
+        'entradas': [],
+        'depende': [],
+        'codigo': ['prepare_dashboard_data.py', 'topologia.py'],
+        'arquivos': [_saida('countries_merged.geojson')],
+        'saidas': [_saida('countries_merged.topojson')],
+    },
+    'mun_PR.geojson': {
+        'funcao': gerar_geojson_municipios,
+        'entradas': [],
+        'depende': [],
+        'codigo': ['prepare_dashboard_data.py', 'topologia.py'],
+        'arquivos': [dashboard.MUNICIPIOS_GEOJSON_PATH],
+        'saidas': [_saida('mun_PR.geojson'), _saida('mun_PR.topojson')],
+    },
+}
+
+# Mapas: podem ficar como publicados (sem geopandas no CI), então não impedem
+# os artefatos que esperam por eles
+ARTEFATOS_GEO = ['countries.geojson', 'countries_merged.topojson', 'mun_PR.geojson']
+
+# Por último: versiona o que foi gerado (nomes com hash + manifest.json). Os
+# mapas são dependências opcionais: o manifesto espera por eles, mas é gerado
+# mesmo se falharem
+ARTEFATOS[MANIFESTO] = {
+    'funcao': gerar_manifesto,
+    'entradas': [],
+    'depende': [nome for nome in ARTEFATOS if nome not in ARTEFATOS_GEO],
+    'opcionais': ARTEFATOS_GEO,
+    'codigo': ['manifesto.py', 'deltas.py'],
+    'arquivos': [],
+    'saidas': [_saida('manifest.json')],
+}
+
+
+# =============================================================================
+# CHAVES DE ENTRADA
+# =============================================================================
+
+def _hash_arquivo(caminho, cache):
+    """Hash do conteúdo de um arquivo (None se não existe), com cache por execução."""
+    caminho = str(caminho)
+    if caminho not in cache:
+        cache[caminho] = None
+        if os.path.exists(caminho):
+            h = hashlib.sha256()
+            with open(caminho, 'rb') as f:
+                for bloco in iter(lambda: f.read(1024 * 1024), b''):
+                    h.update(bloco)
+            cache[caminho] = h.hexdigest()
+    return cache[caminho]
+
+
+def _dependencias(spec):
+    """Dependências obrigatórias e opcionais de um artefato."""
+    return spec['depende'] + spec.get('opcionais', [])
+
+
+def chave_artefato(nome, chaves_dependencias, cache):
+    """
+    Hash de tudo o que determina a saída de um artefato.
+
+    Args:
+        nome: Artefato de ARTEFATOS
+        chaves_dependencias: {dependência: chave} usadas na geração
+        cache: Cache de hashes de arquivos (compartilhado entre artefatos)
+
+    Returns:
+        str: chave hexadecimal
+    """
+    from cadeia_lookup import hash_regras
+
+    spec = ARTEFATOS[nome]
+    diretorio = Path(__file__).resolve().parent
+    codigo = sorted(set(CODIGO_BASE) | set(spec['codigo']))
+
+    partes = {
+        'codigo': {m: _hash_arquivo(diretorio / m, cache) for m in codigo},
+        'arquivos': {str(a): _hash_arquivo(a, cache) for a in spec['arquivos']},
+        'formato': {'colunar': config.FORMATO_COLUNAR, 'arrow': config.ARTEFATOS_ARROW},
+        'depende': {d: chaves_dependencias.get(d) for d in _dependencias(spec)},
+    }
+    if spec['entradas']:
+        partes['dados'] = {a: _hash_arquivo(a, cache) for a in ARQUIVOS_DADOS}
+        partes['regras'] = hash_regras()
+
+    conteudo = json.dumps(partes, sort_keys=True)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def calcular_chaves(cache=None):
+    """Chaves atuais de todos os artefatos (dependências antes dos dependentes)."""
+    cache = {} if cache is None else cache
+    chaves = {}
+
+    def calcular(nome):
+        if nome not in chaves:
+            for dep in _dependencias(ARTEFATOS[nome]):
+                calcular(dep)
+            chaves[nome] = chave_artefato(nome, chaves, cache)
+        return chaves[nome]
+
+    for nome in ARTEFATOS:
+        calcular(nome)
+    return chaves
+
+
+def carregar_estado():
+    """Chaves registradas na última geração ({} se não há registro)."""
+    if not os.path.exists(ESTADO_PATH):
+        return {}
+    with open(ESTADO_PATH, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def salvar_estado(estado):
+    escrever_json(ESTADO_PATH, dict(sorted(estado.items())))
+
+
+def desatualizado(nome, chaves, estado):
+    """Indica se o artefato precisa ser gerado (chave mudou ou saída ausente)."""
+    if estado.get(nome) != chaves[nome]:
+        return True
+    return not all(os.path.exists(saida) for saida in ARTEFATOS[nome]['saidas'])
+
+
+def carregar_entradas():
+    """
+    Carrega os dados processados uma única vez.
+
+    Returns:
+        dict com cubo_exp, cubo_imp e registros (exportações por município,
+        None na pipeline legada, que não tem CO_MUN)
+    """
+    df_exp, df_imp = dashboard.carregar_dados()
+
+    print("\nAgregando cubo base...")
+    entradas = {
+        'cubo_exp': dashboard.construir_cubo(df_exp),
+        'cubo_imp': dashboard.construir_cubo(df_imp),
+        'registros': None,
+    }
+    print(f"  Exportacoes: {len(df_exp):,} registros -> {len(entradas['cubo_exp']):,} linhas")
+    print(f"  Importacoes: {len(df_imp):,} registros -> {len(entradas['cubo_imp']):,} linhas")
+
+    if all(c in df_exp.columns for c in COLUNAS_MUNICIPIO):
+        entradas['registros'] = df_exp[COLUNAS_MUNICIPIO]
+
+    return entradas
+
+
+def _executar(funcao, argumentos):
+    """Executa um artefato no worker e retorna a duração."""
+    inicio = time.perf_counter()
+    funcao(**argumentos)
+    return time.perf_counter() - inicio
+
+
+def gerar_artefatos(entradas, artefatos=ARTEFATOS, workers=None, threads=False):
+    """
+    Gera os artefatos em paralelo, na ordem das dependências.
+
+    Um artefato é enviado ao pool assim que todas as suas dependências
+    terminam. Se um artefato falha, os que dependem dele são pulados; uma
+    dependência opcional ('opcionais') só é esperada, e sua falha não pula
+    o artefato.
+    Artefatos sem entradas disponíveis (ex.: registros na pipeline legada)
+    são pulados sem contar como erro.
+
+    Args:
+        entradas: Dados de carregar_entradas
+        artefatos: Subconjunto de ARTEFATOS a gerar
+        workers: Tamanho do pool (padrão do executor se None)
+        threads: Usa ThreadPoolExecutor em vez de ProcessPoolExecutor
+
+    Returns:
+        tuple: ({nome: duração em segundos} dos artefatos gerados,
+                artefatos com erro, incluindo os pulados por dependência)
+    """
+    concluidos = {}
+    falhas = set()
+    erros = set()
+    em_execucao = {}
+
+    pendentes = {}
+    for nome, spec in artefatos.items():
+        if any(entradas.get(e) is None for e in spec['entradas']):
+            print(f"  AVISO: {nome} ignorado (entradas indisponíveis)")
+            falhas.add(nome)
+            continue
+        pendentes[nome] = spec
+
+    executor_cls = ThreadPoolExecutor if threads else ProcessPoolExecutor
+    with executor_cls(max_workers=workers) as executor:
+        while pendentes or em_execucao:
+            for nome, spec in list(pendentes.items()):
+                # Dependências fora da seleção são usadas como estão em disco
+                deps = [d for d in spec['depende'] if d in artefatos]
+                opcionais = [d for d in spec.get('opcionais', []) if d in artefatos]
+                if any(d in falhas for d in deps):
+                    print(f"  AVISO: {nome} ignorado (dependência não gerada)")
+                    falhas.add(nome)
+                    if any(d in erros for d in deps):
+                        erros.add(nome)
+                    del pendentes[nome]
+                elif (all(d in concluidos for d in deps)
+                      and all(d in concluidos or d in falhas for d in opcionais)):
+                    argumentos = {e: entradas[e] for e in spec['entradas']}
+                    em_execucao[executor.submit(_executar, spec['funcao'], argumentos)] = nome
+                    del pendentes[nome]
+
+            if not em_execucao:
+                break
+
+            feitos, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+            for futuro in feitos:
+                nome = em_execucao.pop(futuro)
+                try:
+                    concluidos[nome] = futuro.result()
+                except Exception as e:
+                    print(f"  ERRO ao gerar {nome}: {e}")
+                    falhas.add(nome)
+                    erros.add(nome)
+
+    return concluidos, erros
+
+
+def main():
+    """Carrega os dados e gera os artefatos do dashboard em paralelo."""
+    parser = argparse.ArgumentParser(description="Gera os artefatos do dashboard em paralelo")
+    parser.add_argument('artefatos', nargs='*',
+                        help=f"Artefatos a gerar (padrão: todos): {', '.join(ARTEFATOS)}")
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Tamanho do pool (padrão: número de CPUs)')
+    parser.add_argument('--threads', action='store_true',
+                        help='Usa threads em vez de processos')
+    parser.add_argument('--colunar', action='store_true',
+                        help='Grava as tabelas grandes no formato colunar (config.FORMATO_COLUNAR)')
+    parser.add_argument('--arrow', action='store_true',
+                        help='Publica também as tabelas por mês/cadeia em Arrow IPC (config.ARTEFATOS_ARROW)')
+    parser.add_argument('--forcar', action='store_true',
+                        help='Gera os artefatos mesmo se as entradas não mudaram')
+    args = parser.parse_args()
+
+    if args.arrow:
+        os.environ['COMEXSTAT_ARTEFATOS_ARROW'] = '1'
+        config.ARTEFATOS_ARROW = True
+
+    if args.colunar:
+        # Variável de ambiente para os workers iniciados por spawn (Windows)
+        os.environ['COMEXSTAT_FORMATO_COLUNAR'] = '1'
+        config.FORMATO_COLUNAR = True
+
+    print("\n" + "="*60)
+    print("GERACAO DE ARTEFATOS DO DASHBOARD")
+    print("="*60 + "\n")
+
+    Path(dashboard.OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+
+    inicio = time.perf_counter()
+
+    desconhecidos = [nome for nome in args.artefatos if nome not in ARTEFATOS]
+    if desconhecidos:
+        parser.error(f"artefatos desconhecidos: {', '.join(desconhecidos)}")
+
+    selecionados = ARTEFATOS
+    if args.artefatos:
+        selecionados = {nome: ARTEFATOS[nome] for nome in args.artefatos}
+
+    # Apenas os artefatos cujas entradas mudaram
+    cache = {}
+    chaves = calcular_chaves(cache)
+    estado = carregar_estado()
+    pendentes = {
+        nome: spec for nome, spec in selecionados.items()
+        if args.forcar or desatualizado(nome, chaves, estado)
+    }
+    # O manifesto acompanha os nomes fixos: se algo vai ser gerado, ele também
+    if pendentes and MANIFESTO not in pendentes:
+        pendentes[MANIFESTO] = ARTEFATOS[MANIFESTO]
+    em_dia = [nome for nome in selecionados if nome not in pendentes]
+    if em_dia:
+        print(f"Em dia (entradas inalteradas): {', '.join(em_dia)}")
+
+    duracoes = {}
+    erros = set()
+    if pendentes:
+        entradas = {}
+        if any(spec['entradas'] for spec in pendentes.values()):
+            entradas = carregar_entradas()
+
+        print("\nGerando artefatos...")
+        duracoes, erros = gerar_artefatos(entradas, pendentes, workers=args.workers, threads=args.threads)
+
+        # Sem manifesto novo, o anterior apontaria para cópias desatualizadas;
+        # sem ele, o dashboard usa os nomes fixos
+        if MANIFESTO not in duracoes:
+            remover_manifesto()
+
+        # Registrar a chave com as dependências como estão em disco (as saídas
+        # recém-gravadas podem ser entradas de outros artefatos)
+        for nome in duracoes:
+            for saida in ARTEFATOS[nome]['saidas']:
+                cache.pop(str(saida), None)
+        for nome in duracoes:
+            estado[nome] = chave_artefato(nome, estado, cache)
+        salvar_estado(estado)
+    else:
+        print("\nNenhum artefato desatualizado.")
+
+    total = time.perf_counter() - inicio
+    print("\n" + "="*60)
+    print("RESUMO")
+    print("="*60)
+    for nome, duracao in sorted(duracoes.items(), key=lambda x: -x[1]):
+        print(f"  {nome:25} {duracao:6.2f}s")
+    print(f"  {'Soma dos artefatos':25} {sum(duracoes.values()):6.2f}s")
+    print(f"  {'Tempo total':25} {total:6.2f}s")
+    print(f"  Gerados: {len(duracoes)} de {len(pendentes)} desatualizados ({len(selecionados)} selecionados)")
+
+    # Tamanhos publicados (bruto / gzip / brotli)
+    imprimir_tamanhos(dashboard.OUTPUT_DIR)
+
+    if erros:
+        print(f"\nERRO: artefatos não gerados: {', '.join(sorted(erros))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Tabela pré-compilada NCM -> cadeia produtiva.
+
+As regras de ncm_cadeias_map (NCM_ESPECIFICO, KEYWORDS_CADEIA,
+CAPITULO_TO_CADEIA) só mudam quando as regras ou a nomenclatura NCM mudam.
+Este módulo avalia as regras uma única vez sobre toda a tabela NCM das
+tabelas auxiliares e grava o resultado em parquet versionado:
+
+    data/processed/cadeia_lookup/ncm_cadeia_<versao>.parquet
+
+A versão é um hash das regras e do arquivo da tabela NCM. Os estágios
+classificam os dados com um único join nessa tabela; NCMs ausentes da
+tabela (códigos novos) são classificados pelas regras normalmente.
+
+Uso:
+    python cadeia_lookup.py            # Gera a tabela da versão atual
+    python cadeia_lookup.py --forcar   # Regenera mesmo se já existir
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+import ncm_cadeias_map as regras
+
+LOOKUP_DIR = Path(config.PROCESSED_DIR) / "cadeia_lookup"
+ARQUIVO_TABELAS = Path(config.AUXILIARY_DIR) / "TABELAS_AUXILIARES.xlsx"
+
+# Incrementar quando o formato da tabela gerada mudar
+FORMATO_LOOKUP = 1
+
+
+def regras_atuais() -> dict:
+    """Regras de classificação que determinam a tabela (entrada do hash)."""
+    return {
+        "formato": FORMATO_LOOKUP,
+        "cadeias": regras.CADEIAS,
+        "tipo_cadeia": regras.TIPO_CADEIA,
+        "capitulo_to_cadeia": {str(k): v for k, v in regras.CAPITULO_TO_CADEIA.items()},
+        "keywords_cadeia": regras.KEYWORDS_CADEIA,
+        "ncm_especifico": regras.NCM_ESPECIFICO,
+    }
+
+
+def hash_regras() -> str:
+    """Hash estável do conjunto de regras."""
+    conteudo = json.dumps(regras_atuais(), sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def hash_arquivo(caminho) -> str:
+    """Hash do conteúdo de um arquivo."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def versao_lookup(arquivo_tabelas=ARQUIVO_TABELAS) -> str:
+    """Versão da tabela: hash das regras + hash da tabela NCM."""
+    base = hash_regras() + hash_arquivo(arquivo_tabelas)
+    return hashlib.sha256(base.encode('ascii')).hexdigest()[:12]
+
+
+def caminho_lookup(versao: str) -> Path:
+    return LOOKUP_DIR / f"ncm_cadeia_{versao}.parquet"
+
+
+def avaliar_regras(df_ncm: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aplica as regras de ncm_cadeias_map a uma tabela NCM.
+
+    Args:
+        df_ncm: DataFrame com CO_NCM e NO_NCM_POR
+
+    Returns:
+        DataFrame com CO_NCM, CADEIA_KEY, CADEIA e TIPO
+    """
+    ncms = df_ncm['CO_NCM'].astype(str).str.zfill(8)
+    descricoes = df_ncm['NO_NCM_POR'] if 'NO_NCM_POR' in df_ncm.columns else None
+    capitulos = pd.to_numeric(ncms.str[:2], errors='coerce')
+
+    chaves, nomes = regras.classificar_cadeia_array(ncms, descricoes, capitulos)
+
+    lookup = pd.DataFrame({
+        'CO_NCM': ncms.to_numpy(),
+        'CADEIA_KEY': np.asarray(chaves),
+        'CADEIA': np.asarray(nomes),
+    })
+    lookup['TIPO'] = lookup['CADEIA'].map(regras.TIPO_CADEIA).fillna('produto')
+    return lookup.drop_duplicates('CO_NCM').sort_values('CO_NCM').reset_index(drop=True)
+
+
+def construir_lookup(forcar: bool = False):
+    """
+    Gera a tabela NCM -> cadeia da versão atual, se ainda não existir.
+
+    Args:
+        forcar: Regenera mesmo se o arquivo da versão já existir
+
+    Returns:
+        Caminho do parquet gerado ou None se a tabela NCM não está disponível
+    """
+    if not ARQUIVO_TABELAS.exists():
+        return None
+
+    destino = caminho_lookup(versao_lookup())
+    if destino.exists() and not forcar:
+        return destino
+
+    from process_data import carregar_tabela_ncm
+
+    lookup = avaliar_regras(carregar_tabela_ncm())
+
+    LOOKUP_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = destino.with_suffix('.tmp')
+    lookup.to_parquet(tmp, index=False)
+    os.replace(tmp, destino)
+    print(f"  Tabela NCM->cadeia: {destino} ({len(lookup)} NCMs)")
+    return destino
+
+
+def carregar_lookup():
+    """
+    Carrega a tabela da versão atual, gerando-a se necessário.
+
+    Returns:
+        DataFrame indexado por CO_NCM ou None se indisponível
+    """
+    caminho = construir_lookup()
+    if caminho is None:
+        return None
+    return pd.read_parquet(caminho).set_index('CO_NCM')
+
+
+def classificar_ncm(ncms, descricoes=None, capitulos=None, lookup=None):
+    """
+    Classifica códigos NCM por join na tabela pré-compilada.
+
+    NCMs ausentes da tabela (ou todos, se a tabela não puder ser gerada)
+    são classificados por ncm_cadeias_map.classificar_cadeia_array.
+
+    Args:
+        ncms: Array/Series de códigos NCM
+        descricoes: Descrições (usadas apenas para NCMs fora da tabela)
+        capitulos: Capítulos (usados apenas para NCMs fora da tabela)
+        lookup: Tabela já carregada (opcional)
+
+    Returns:
+        tuple: (chaves, nomes) como pd.Categorical
+    """
+    ncms = pd.Series(np.asarray(ncms)).astype(str).str.zfill(8)
+    if capitulos is None:
+        capitulos = pd.to_numeric(ncms.str[:2], errors='coerce')
+    if lookup is None:
+        lookup = carregar_lookup()
+    if lookup is None:
+        return regras.classificar_cadeia_array(ncms, descricoes, capitulos)
+
+    posicoes = lookup.index.get_indexer(ncms)
+    encontrados = posicoes >= 0
+
+    chaves = np.empty(len(ncms), dtype=object)
+    chaves[encontrados] = lookup['CADEIA_KEY'].to_numpy()[posicoes[encontrados]]
+
+    if not encontrados.all():
+        faltantes = ~encontrados
+        desc = None if descricoes is None else np.asarray(descricoes, dtype=object)[faltantes]
+        chaves_faltantes, _ = regras.classificar_cadeia_array(
+            ncms[faltantes], desc, np.asarray(capitulos)[faltantes]
+        )
+        chaves[faltantes] = np.asarray(chaves_faltantes)
+
+    chaves = pd.Categorical(chaves, categories=list(regras.CADEIAS.keys()))
+    nomes = chaves.rename_categories(list(regras.CADEIAS.values()))
+    return chaves, nomes
+
+
+def main():
+    """Gera a tabela NCM -> cadeia para a versão atual das regras e da tabela NCM."""
+    parser = argparse.ArgumentParser(description="Tabela NCM -> cadeia pré-compilada")
+    parser.add_argument('--forcar', action='store_true',
+                        help='Regenera mesmo se a versão atual já existir')
+    args = parser.parse_args()
+
+    if not ARQUIVO_TABELAS.exists():
+        print(f"Tabelas auxiliares nao encontradas: {ARQUIVO_TABELAS}")
+        print("Execute download_data.py primeiro.")
+        return
+
+    print(f"Versão: {versao_lookup()}")
+    print(f"Salvo: {construir_lookup(forcar=args.forcar)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Versões pré-comprimidas dos artefatos do dashboard.
+
+O host estático não comprime as respostas, então cada artefato publicado em
+dashboard/public/data ganha irmãos .gz (gzip nível 9) e .br (brotli
+qualidade 11), gerados por quem grava o arquivo. O brotli é opcional: sem o
+pacote, apenas o .gz é gerado (e um .br antigo é removido, para não ficar
+desatualizado).
+
+Uso:
+    python compressao.py            # Comprime e mostra a tabela de tamanhos
+"""
+
+import gzip
+import shutil
+import sys
+import io
+from pathlib import Path
+
+from manifesto import versionado
+from serializacao import substituir_se_mudou
+
+# Fix encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DIRETORIO_ARTEFATOS = Path("dashboard/public/data")
+EXTENSOES_ARTEFATOS = ('.json', '.geojson', '.topojson', '.arrow')
+
+# Bytes lidos por vez ao comprimir e comparar
+BLOCO = 1024 * 1024
+
+
+def comprimir(caminho):
+    """
+    Grava caminho.gz e caminho.br ao lado do artefato.
+
+    O .gz é gerado com mtime=0, então o mesmo conteúdo gera os mesmos bytes.
+    Se o .gz existente já corresponde ao artefato, nada é regravado (o .br é
+    gravado antes do .gz, então também está em dia). O artefato é lido e
+    comprimido em blocos de BLOCO bytes, sem carregá-lo inteiro na memória.
+
+    Args:
+        caminho: Artefato já gravado
+
+    Returns:
+        tuple: (bruto, gzip, brotli) em bytes; brotli é None sem o pacote
+    """
+    caminho = Path(caminho)
+    bruto = caminho.stat().st_size
+    caminho_gz = Path(f"{caminho}.gz")
+    caminho_br = Path(f"{caminho}.br")
+
+    if _em_dia(caminho_gz, caminho) and (brotli is None or caminho_br.exists()):
+        tamanho_br = caminho_br.stat().st_size if brotli is not None else None
+        return bruto, caminho_gz.stat().st_size, tamanho_br
+
+    tamanho_br = None
+    if brotli is not None:
+        compressor = brotli.Compressor(quality=11)
+        with open(caminho, 'rb') as origem, open(f"{caminho_br}.tmp", 'wb') as destino:
+            for bloco in iter(lambda: origem.read(BLOCO), b''):
+                destino.write(compressor.process(bloco))
+            destino.write(compressor.finish())
+        substituir_se_mudou(f"{caminho_br}.tmp", caminho_br)
+        tamanho_br = caminho_br.stat().st_size
+    elif caminho_br.exists():
+        caminho_br.unlink()
+
+    # filename='' para não gravar o nome do temporário no cabeçalho
+    with open(caminho, 'rb') as origem, open(f"{caminho_gz}.tmp", 'wb') as destino:
+        with gzip.GzipFile(filename='', mode='wb', compresslevel=9, fileobj=destino, mtime=0) as gz:
+            shutil.copyfileobj(origem, gz, BLOCO)
+    substituir_se_mudou(f"{caminho_gz}.tmp", caminho_gz)
+
+    return bruto, caminho_gz.stat().st_size, tamanho_br
+
+
+def _em_dia(caminho_gz, caminho):
+    """Indica se caminho_gz existe e descomprime exatamente para o conteúdo de caminho."""
+    if not caminho_gz.exists():
+        return False
+    try:
+        with gzip.open(caminho_gz, 'rb') as gz, open(caminho, 'rb') as origem:
+            while True:
+                bloco = origem.read(BLOCO)
+                if gz.read(len(bloco) or 1) != bloco:
+                    return False
+                if not bloco:
+                    return True
+    except (OSError, EOFError):
+        return False
+
+
+def _kb(tamanho):
+    return "-" if tamanho is None else f"{tamanho / 1024:,.1f} KB"
+
+
+def tamanhos(diretorio=DIRETORIO_ARTEFATOS):
+    """
+    Tamanhos bruto/gzip/brotli dos artefatos de um diretório.
+
+    As cópias versionadas (ver manifesto.py) não entram na tabela.
+
+    Returns:
+        list: [(nome, bruto, gzip, brotli)] (None para irmãos ausentes)
+    """
+    linhas = []
+    for caminho in sorted(Path(diretorio).iterdir()):
+        if caminho.suffix not in EXTENSOES_ARTEFATOS or not caminho.is_file():
+            continue
+        if versionado(caminho.name):
+            continue
+        irmaos = [Path(f"{caminho}.gz"), Path(f"{caminho}.br")]
+        linhas.append((
+            caminho.name,
+            caminho.stat().st_size,
+            *[p.stat().st_size if p.exists() else None for p in irmaos],
+        ))
+    return linhas
+
+
+def imprimir_tamanhos(diretorio=DIRETORIO_ARTEFATOS):
+    """Imprime a tabela de tamanhos bruto/gzip/brotli dos artefatos."""
+    linhas = tamanhos(diretorio)
+    if not linhas:
+        return
+
+    largura = max(30, *(len(linha[0]) for linha in linhas))
+    print(f"\n  {'Artefato':{largura}} {'Bruto':>12} {'gzip':>12} {'brotli':>12}")
+    for nome, bruto, gz, br in linhas:
+        print(f"  {nome:{largura}} {_kb(bruto):>12} {_kb(gz):>12} {_kb(br):>12}")
+
+    def total(i):
+        valores = [linha[i] for linha in linhas]
+        return None if None in valores else sum(valores)
+
+    print(f"  {'Total':{largura}} {_kb(total(1)):>12} {_kb(total(2)):>12} {_kb(total(3)):>12}")
+    if brotli is None:
+        print("  AVISO: brotli nao instalado - .br nao gerado (pip install brotli)")
+
+
+def main():
+    """Comprime todos os artefatos publicados e mostra os tamanhos."""
+    for caminho in sorted(DIRETORIO_ARTEFATOS.iterdir()):
+        if caminho.suffix in EXTENSOES_ARTEFATOS and caminho.is_file():
+            comprimir(caminho)
+    imprimir_tamanhos()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@
 Configurações da Pipeline ComexStat - Paraná Agricultura
 """
 
+import os
+
 # URLs base para download dos dados
 BASE_URL_COMEXSTAT = "https://balanca.economia.gov.br/balanca/bd/comexstat-bd/ncm"
 BASE_URL_MUNICIPIOS = "https://balanca.economia.gov.br/balanca/bd/comexstat-bd/mun"
@@ -99,3 +101,15 @@ COLUNAS_IMPORTACAO = [
     "VL_FRETE",    # Valor do frete (US$)
     "VL_SEGURO"   # Valor do seguro (US$)
 ]
+
+# Formato das tabelas grandes dos artefatos do dashboard (byPaisByCadeia,
+# linksByCadeia, municipiosByCadeia, exportacoesPorPeriodo/importacoesPorPeriodo)
+#   False: lista de objetos (padrão)
+#   True:  colunar - tabela de strings + um array por campo (ver serializacao.py)
+# Pode ser ativado com a variável de ambiente COMEXSTAT_FORMATO_COLUNAR=1
+FORMATO_COLUNAR = os.environ.get("COMEXSTAT_FORMATO_COLUNAR", "0") == "1"
+
+# Publicar também as tabelas por mês e por cadeia em Apache Arrow IPC
+# (<artefato>.<tabela>.arrow, ao lado do JSON) para carga binária no navegador.
+# Pode ser ativado com a variável de ambiente COMEXSTAT_ARTEFATOS_ARROW=1
+ARTEFATOS_ARROW = os.environ.get("COMEXSTAT_ARTEFATOS_ARROW", "0") == "1"
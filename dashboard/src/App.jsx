@@ -18,7 +18,9 @@ import PRMap from './components/PRMap';
 import WorldMap from './components/WorldMap';
 import ForecastChart from './components/ForecastChart';
 import HeatmapChart from './components/HeatmapChart';
+import ChordDiagram from './components/ChordDiagram';
 import YoYComparisonChart from './components/YoYComparisonChart';
+import PeriodTotals from './components/PeriodTotals';
 import { useData, useFilteredData, useAggregations } from './hooks/useData';
 
 const TABS = [
@@ -98,8 +100,8 @@ export default function App() {
     return Object.values(interactiveFilters).some(v => v !== null);
   }, [interactiveFilters]);
 
-  // Load data
-  const { data, loading, error } = useData();
+  // Load data (boot + shards da aba ativa e dos filtros)
+  const { data, loading, error } = useData(activeTab, filters);
 
   // Apply filters
   const filteredData = useFilteredData(data, filters);
@@ -131,6 +133,15 @@ export default function App() {
       );
     }
 
+    // Comparativo anual pré-calculado: mesmo filtro de ano
+    if (interactiveFilters.ano && result.graficos) {
+      const comparativo = {};
+      Object.entries(result.graficos.comparativo).forEach(([fluxo, serie]) => {
+        comparativo[fluxo] = serie.filter(item => item.ano === interactiveFilters.ano);
+      });
+      result.graficos = { ...result.graficos, comparativo };
+    }
+
     // Filtrar municipios
     if (interactiveFilters.municipio && result.municipios) {
       result.municipios = result.municipios.filter(item =>
@@ -223,20 +234,23 @@ export default function App() {
               <div className="grid grid-cols-1 lg:grid-cols-2 gap-6">
                 <YoYComparisonChart
                   data={interactiveFilteredData?.timeseries}
+                  serie={interactiveFilteredData?.graficos?.comparativo?.exportacoes}
                   title="Comparativo Anual - Exportações"
                   tipo="exportacoes"
                 />
                 <YoYComparisonChart
                   data={interactiveFilteredData?.timeseries}
+                  serie={interactiveFilteredData?.graficos?.comparativo?.importacoes}
                   title="Comparativo Anual - Importações"
                   tipo="importacoes"
                 />
               </div>
 
               {/* Heatmap Sazonal */}
-              {interactiveFilteredData?.detailed && (
+              {(interactiveFilteredData?.graficos || interactiveFilteredData?.detailed) && (
                 <HeatmapChart
                   data={filteredData.detailed}
+                  grade={filteredData.graficos?.heatmap?.exportacoes}
                   title="Padrão Sazonal por Cadeia - Exportações"
                   tipo="exportacoes"
                 />
@@ -247,6 +261,7 @@ export default function App() {
                 <SankeyChart
                   data={interactiveFilteredData?.sankey || data?.sankey}
                   filteredLinks={interactiveFilteredData?.filteredSankeyLinks}
+                  layout={interactiveFilteredData?.sankeyLayout}
                   title="Fluxo de Exportacoes: Municipio > Pais de Destino"
                   filterNote={filters.cadeias?.length > 0 ? `Filtrado por: ${filters.cadeias.join(', ')}` : null}
                 />
@@ -332,6 +347,30 @@ export default function App() {
                   selectedPais={interactiveFilters.pais}
                 />
               )}
+
+              {/* Totais de um intervalo livre de meses (índice de somas acumuladas) */}
+              <PeriodTotals
+                cadeias={filteredData?.cadeiasFiltro}
+                tipo={filters.tipo === 'importacoes' ? 'importacoes' : 'exportacoes'}
+                title="Totais por Periodo (meses)"
+              />
+
+              {/* Cadeias x principais países (matriz pré-calculada) */}
+              {filteredData?.graficos?.cordas && (
+                <ChordDiagram
+                  matriz={filteredData.graficos.cordas[filters.tipo === 'importacoes' ? 'importacoes' : 'exportacoes']}
+                  rotulos={filters.tipo === 'importacoes' ? {
+                    origem: 'Cadeia', origens: 'Cadeias', destino: 'Pais', destinos: 'Paises',
+                    descricaoOrigem: 'Cadeia importadora', descricaoDestino: 'Pais de origem',
+                  } : {
+                    origem: 'Cadeia', origens: 'Cadeias', destino: 'Pais', destinos: 'Paises',
+                    descricaoOrigem: 'Cadeia exportadora', descricaoDestino: 'Pais de destino',
+                  }}
+                  title={filters.tipo === 'importacoes'
+                    ? 'Relacoes Comerciais: Cadeias x Paises de Origem'
+                    : 'Relacoes Comerciais: Cadeias x Paises de Destino'}
+                />
+              )}
             </div>
           )}
 
@@ -370,6 +409,7 @@ export default function App() {
                       data={{ topProdutos: interactiveFilteredData?.topProdutos }}
                       tipo="exportacoes"
                       limit={30}
+                      cadeias={data?.dimensoes?.cadeias}
                     />
                   </div>
                   <div>
@@ -380,6 +420,7 @@ export default function App() {
                       data={{ topProdutos: interactiveFilteredData?.topProdutos }}
                       tipo="importacoes"
                       limit={30}
+                      cadeias={data?.dimensoes?.cadeias}
                     />
                   </div>
                 </div>
@@ -392,6 +433,7 @@ export default function App() {
                     data={{ topProdutos: interactiveFilteredData?.topProdutos }}
                     tipo={filters.tipo}
                     limit={50}
+                    cadeias={data?.dimensoes?.cadeias}
                   />
                 </div>
               )}
@@ -6,8 +6,56 @@ const MUNICIPALITY_COLOR = '#0072B2'
 const COUNTRY_COLOR = '#D55E00'
 const HOVER_COLOR = '#E69F00'
 
+// Rótulos dos dois grupos (origem = linhas, destino = colunas)
+const ROTULOS_PADRAO = {
+  origem: 'Municipio',
+  origens: 'Municipios',
+  destino: 'Pais',
+  destinos: 'Paises',
+  descricaoOrigem: 'Municipio exportador',
+  descricaoDestino: 'Pais de destino',
+}
+
+/**
+ * Matriz quadrada (origens e destinos) a partir de uma matriz pré-calculada
+ * { linhas, colunas, valores: [linha][coluna] } (graficos.json).
+ */
+function matrizPreCalculada(matriz, topN) {
+  const ordenar = (nomes, total) => nomes
+    .map((nome, i) => [nome, i, total(i)])
+    .filter(([, , soma]) => soma > 0)
+    .sort((a, b) => b[2] - a[2])
+    .slice(0, topN)
+
+  const linhas = ordenar(matriz.linhas, i => matriz.valores[i].reduce((a, b) => a + b, 0))
+  const colunas = ordenar(matriz.colunas, j => matriz.valores.reduce((soma, linha) => soma + linha[j], 0))
+  const n = linhas.length + colunas.length
+  const matrix = Array(n).fill(null).map(() => Array(n).fill(0))
+
+  linhas.forEach(([, i], a) => {
+    colunas.forEach(([, j], b) => {
+      const valor = matriz.valores[i][j]
+      matrix[a][linhas.length + b] = valor
+      matrix[linhas.length + b][a] = valor
+    })
+  })
+
+  return {
+    topMunicipalities: linhas.map(([nome]) => nome),
+    topCountries: colunas.map(([nome]) => nome),
+    matrix,
+  }
+}
+
+/**
+ * @param {Object} data - sankey ({ nodes, links }), usado sem `matriz`
+ * @param {Object} matriz - matriz pré-calculada { linhas, colunas, valores }
+ * @param {Object} rotulos - nomes dos grupos (ver ROTULOS_PADRAO)
+ */
 export default function ChordDiagram({
   data,
+  matriz,
+  rotulos: rotulosProp,
   title = "Relacoes Comerciais: Municipios x Paises",
   width = 700,
   height = 700,
@@ -15,21 +63,41 @@ export default function ChordDiagram({
 }) {
   const [hoveredIndex, setHoveredIndex] = useState(null)
   const [hoveredChord, setHoveredChord] = useState(null)
+  const rotulos = { ...ROTULOS_PADRAO, ...rotulosProp }
 
   const chartData = useMemo(() => {
+    if (matriz) {
+      const { topMunicipalities, topCountries, matrix } = matrizPreCalculada(matriz, topN)
+      if (matrix.length === 0) return null
+
+      const chords = d3.chord()
+        .padAngle(0.05)
+        .sortSubgroups(d3.descending)
+        .sortChords(d3.descending)(matrix)
+      const innerRadius = Math.min(width, height) * 0.35
+
+      return {
+        chords,
+        names: [...topMunicipalities, ...topCountries],
+        topMunicipalities,
+        topCountries,
+        innerRadius,
+        outerRadius: innerRadius + 20,
+        matrix,
+      }
+    }
+
     if (!data?.nodes || !data?.links) return null
 
-    // Separate municipalities and countries
-    const municipalities = data.nodes.filter(n => n.type === 'municipio')
-    const countries = data.nodes.filter(n => n.type === 'pais')
+    // Nós por id (inteiro, ver sankey.py)
+    const nodes = new Map(data.nodes.map(n => [n.id, n]))
 
     // Get top municipalities by total export value
     const munTotals = {}
     data.links.forEach(l => {
-      const source = l.source
-      if (source.startsWith('mun_')) {
-        const name = source.replace('mun_', '')
-        munTotals[name] = (munTotals[name] || 0) + l.value
+      const source = nodes.get(l.source)
+      if (source?.type === 'municipio') {
+        munTotals[source.name] = (munTotals[source.name] || 0) + l.value
       }
     })
 
@@ -41,10 +109,9 @@ export default function ChordDiagram({
     // Get top countries by total import value
     const countryTotals = {}
     data.links.forEach(l => {
-      const target = l.target
-      if (target.startsWith('pais_')) {
-        const name = target.replace('pais_', '')
-        countryTotals[name] = (countryTotals[name] || 0) + l.value
+      const target = nodes.get(l.target)
+      if (target?.type === 'pais') {
+        countryTotals[target.name] = (countryTotals[target.name] || 0) + l.value
       }
     })
 
@@ -62,8 +129,8 @@ export default function ChordDiagram({
 
     // Fill matrix with link values - bidirectional for proper chord visualization
     data.links.forEach(l => {
-      const sourceId = l.source.replace('mun_', '')
-      const targetId = l.target.replace('pais_', '')
+      const sourceId = nodes.get(l.source)?.name
+      const targetId = nodes.get(l.target)?.name
 
       const sourceIdx = topMunicipalities.indexOf(sourceId)
       const targetIdx = topCountries.indexOf(targetId)
@@ -99,7 +166,7 @@ export default function ChordDiagram({
       outerRadius,
       matrix,
     }
-  }, [data, topN, width, height])
+  }, [data, matriz, topN, width, height])
 
   if (!chartData) {
     return (
@@ -194,7 +261,7 @@ export default function ChordDiagram({
                     <title>
                       {names[i]}
                       {'\n'}Total: {formatValue(getGroupTotal(i))}
-                      {'\n'}Tipo: {i < topMunicipalities.length ? 'Municipio' : 'Pais'}
+                      {'\n'}Tipo: {i < topMunicipalities.length ? rotulos.origem : rotulos.destino}
                     </title>
                   </path>
 
@@ -251,17 +318,17 @@ export default function ChordDiagram({
             <div className="space-y-2">
               <div className="flex items-center gap-2">
                 <div className="w-4 h-4 rounded" style={{ backgroundColor: MUNICIPALITY_COLOR }} />
-                <span className="text-xs text-dark-600">Municipios (origem)</span>
+                <span className="text-xs text-dark-600">{rotulos.origens} (origem)</span>
               </div>
               <div className="flex items-center gap-2">
                 <div className="w-4 h-4 rounded" style={{ backgroundColor: COUNTRY_COLOR }} />
-                <span className="text-xs text-dark-600">Paises (destino)</span>
+                <span className="text-xs text-dark-600">{rotulos.destinos} (destino)</span>
               </div>
             </div>
           </div>
 
           <div>
-            <h4 className="text-sm font-semibold text-dark-600 mb-2">Top Municipios</h4>
+            <h4 className="text-sm font-semibold text-dark-600 mb-2">Top {rotulos.origens}</h4>
             <div className="space-y-1">
               {topMunicipalities.slice(0, 5).map((mun, i) => (
                 <div
@@ -277,7 +344,7 @@ export default function ChordDiagram({
           </div>
 
           <div>
-            <h4 className="text-sm font-semibold text-dark-600 mb-2">Top Paises</h4>
+            <h4 className="text-sm font-semibold text-dark-600 mb-2">Top {rotulos.destinos}</h4>
             <div className="space-y-1">
               {topCountries.slice(0, 5).map((country, i) => (
                 <div
@@ -299,7 +366,7 @@ export default function ChordDiagram({
                 {names[hoveredIndex]}
               </h4>
               <p className="text-xs text-dark-500">
-                {hoveredIndex < topMunicipalities.length ? 'Municipio exportador' : 'Pais de destino'}
+                {hoveredIndex < topMunicipalities.length ? rotulos.descricaoOrigem : rotulos.descricaoDestino}
               </p>
               <p className="text-sm font-mono text-dark-700 mt-1">
                 {formatValue(getGroupTotal(hoveredIndex))}
@@ -311,7 +378,7 @@ export default function ChordDiagram({
 
       {/* Footer */}
       <div className="mt-4 pt-4 border-t text-xs text-dark-500">
-        <p>Diagrama mostra os {topN} principais municipios e paises por valor de exportacao.</p>
+        <p>Diagrama mostra os {topN} principais {rotulos.origens.toLowerCase()} e {rotulos.destinos.toLowerCase()} por valor.</p>
         <p className="mt-1">Passe o mouse sobre os arcos e fitas para ver detalhes.</p>
       </div>
     </div>
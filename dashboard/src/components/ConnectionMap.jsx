@@ -1,5 +1,6 @@
 import { useEffect, useRef, useMemo, useState } from 'react'
 import * as d3 from 'd3'
+import { fetchArtifact } from '../utils/artifacts'
 
 // Coordenadas dos centros dos paises (lon, lat) - Todos os paises do dataset ComexStat
 const COUNTRY_COORDS = {
@@ -227,8 +228,7 @@ export default function ConnectionMap({
 
   // Carregar GeoJSON (world-countries.geojson com poligonos corretos)
   useEffect(() => {
-    const BASE_URL = import.meta.env.BASE_URL || '/'
-    fetch(`${BASE_URL}data/world-countries.geojson`)
+    fetchArtifact('world-countries.geojson')
       .then(res => res.json())
       .then(data => setGeoData(data))
       .catch(err => console.error('Erro ao carregar GeoJSON:', err))
@@ -249,12 +249,13 @@ export default function ConnectionMap({
         }
       })
     }
-    // Formato sankey (objeto com links)
+    // Formato sankey (objeto com nodes e links por id, ver sankey.py)
     else if (data?.links) {
+      const nodes = new Map((data.nodes || []).map(n => [n.id, n]))
       data.links.forEach(link => {
-        if (link.target?.startsWith('pais_')) {
-          const country = link.target.replace('pais_', '')
-          totals[country] = (totals[country] || 0) + link.value
+        const target = nodes.get(link.target)
+        if (target?.type === 'pais') {
+          totals[target.name] = (totals[target.name] || 0) + link.value
         }
       })
     }
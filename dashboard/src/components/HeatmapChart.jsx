@@ -38,27 +38,38 @@ function CustomTooltip({ active, payload }) {
   );
 }
 
-export default function HeatmapChart({ data, title = 'Padrão Sazonal por Cadeia', tipo = 'exportacoes' }) {
-  const heatmapData = useMemo(() => {
-    if (!data?.timeseriesMensal) return { rows: [], maxValue: 0 };
-
-    // Agrupar por categoria e mês
-    const byCatMonth = {};
-
-    data.timeseriesMensal.forEach(item => {
-      const periodo = item.periodo; // formato: "2024-01"
-      const mes = parseInt(periodo.split('-')[1]) - 1; // 0-11
-      const categoria = item.categoria || 'Geral';
-      const valor = tipo === 'exportacoes' ? (item.valorExp || 0) : (item.valorImp || 0);
+/**
+ * Linhas por categoria a partir da série mensal (sem matrizes pré-calculadas).
+ */
+function linhasDaSerieMensal(data, tipo) {
+  // Agrupar por categoria e mês
+  const byCatMonth = {};
+
+  data.timeseriesMensal.forEach(item => {
+    const periodo = item.periodo; // formato: "2024-01"
+    const mes = parseInt(periodo.split('-')[1]) - 1; // 0-11
+    const categoria = item.categoria || 'Geral';
+    const valor = tipo === 'exportacoes' ? (item.valorExp || 0) : (item.valorImp || 0);
+
+    if (!byCatMonth[categoria]) {
+      byCatMonth[categoria] = Array(12).fill(0);
+    }
+    byCatMonth[categoria][mes] += valor;
+  });
+
+  return Object.entries(byCatMonth).map(([categoria, valores]) => ({ categoria, valores }));
+}
 
-      if (!byCatMonth[categoria]) {
-        byCatMonth[categoria] = Array(12).fill(0);
-      }
-      byCatMonth[categoria][mes] += valor;
-    });
+/**
+ * @param {Object} data - detailed (timeseriesMensal), usado sem `grade`
+ * @param {Array} grade - linhas pré-calculadas [{ categoria, valores: [12] }]
+ *   (graficos.json, já filtradas por ano e cadeia em useFilteredData)
+ */
+export default function HeatmapChart({ data, grade, title = 'Padrão Sazonal por Cadeia', tipo = 'exportacoes' }) {
+  const heatmapData = useMemo(() => {
+    if (!grade && !data?.timeseriesMensal) return { rows: [], maxValue: 0 };
 
-    // Converter para array de linhas
-    const rows = Object.entries(byCatMonth).map(([categoria, valores]) => ({
+    const rows = (grade || linhasDaSerieMensal(data, tipo)).map(({ categoria, valores }) => ({
       categoria,
       valores,
       total: valores.reduce((a, b) => a + b, 0),
@@ -67,11 +78,12 @@ export default function HeatmapChart({ data, title = 'Padrão Sazonal por Cadeia
     // Ordenar por total
     rows.sort((a, b) => b.total - a.total);
 
-    // Calcular valor máximo
-    const maxValue = Math.max(...rows.flatMap(r => r.valores));
+    // Top 10 cadeias e valor máximo entre elas
+    const top = rows.filter(r => r.total > 0).slice(0, 10);
+    const maxValue = Math.max(...top.flatMap(r => r.valores));
 
-    return { rows: rows.slice(0, 10), maxValue }; // Top 10 cadeias
-  }, [data, tipo]);
+    return { rows: top, maxValue };
+  }, [data, grade, tipo]);
 
   if (!heatmapData.rows.length) {
     return (
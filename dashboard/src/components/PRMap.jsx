@@ -1,6 +1,7 @@
 import { useEffect, useRef, useState } from 'react';
 import { MapPin } from 'lucide-react';
 import { formatCurrency } from '../utils/format';
+import { loadMapa } from '../utils/topologia';
 
 export default function PRMap({ data, title }) {
   const mapRef = useRef(null);
@@ -25,10 +26,9 @@ export default function PRMap({ data, title }) {
 
       mapInstanceRef.current = map;
 
-      // Load GeoJSON
+      // Load map (TopoJSON, GeoJSON as fallback)
       try {
-        const response = await fetch('./data/mun_PR.geojson');
-        const geojson = await response.json();
+        const geojson = await loadMapa('mun_PR');
 
         // Create value lookup from data
         const valueLookup = {};
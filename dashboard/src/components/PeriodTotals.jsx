@@ -0,0 +1,158 @@
+import { useState, useEffect, useMemo } from 'react';
+import { Calendar } from 'lucide-react';
+import { formatCurrency } from '../utils/format';
+import {
+  loadPrefixos, loadPrefixosCadeia, monthAt, rangeTotal, rangeTotals, mergeBlocks,
+} from '../utils/prefixos';
+
+const FLUXOS = ['exportacoes', 'importacoes'];
+
+/**
+ * Totais de um intervalo livre de meses (não só anos inteiros), pelo índice
+ * de somas acumuladas (ver utils/prefixos.js): cada total custa duas leituras.
+ *
+ * @param {Array|null} cadeias - Cadeias do filtro [{ nome, id }] ou null (todas)
+ * @param {string} tipo - Fluxo do ranking de países ('exportacoes'/'importacoes')
+ */
+export default function PeriodTotals({ cadeias, tipo = 'exportacoes', title, limit = 10 }) {
+  const [prefixos, setPrefixos] = useState(null);
+  const [porCadeia, setPorCadeia] = useState(null);
+  const [de, setDe] = useState(null);
+  const [ate, setAte] = useState(null);
+
+  useEffect(() => {
+    let ativo = true;
+    loadPrefixos().then(base => {
+      if (!ativo || !base) return;
+      setPrefixos(base);
+      // Padrão: últimos 12 meses disponíveis
+      setDe(monthAt(base, Math.max(base.meses - 12, 0)));
+      setAte(monthAt(base, base.meses - 1));
+    });
+    return () => { ativo = false; };
+  }, []);
+
+  // Séries cadeia x país só das cadeias filtradas (shards sob demanda)
+  const chaveCadeias = (cadeias || []).map(c => c.nome).join('|');
+  useEffect(() => {
+    let ativo = true;
+    setPorCadeia(null);
+    if (cadeias && cadeias.length > 0) {
+      Promise.all(cadeias.map(c => loadPrefixosCadeia(c.nome, c.id)))
+        .then(blocos => { if (ativo) setPorCadeia(blocos); });
+    }
+    return () => { ativo = false; };
+  }, [chaveCadeias]);
+
+  const resultado = useMemo(() => {
+    if (!prefixos || !de || !ate) return null;
+    const ids = cadeias && cadeias.length > 0 ? new Set(cadeias.map(c => c.id)) : null;
+
+    const totais = {};
+    for (const fluxo of FLUXOS) {
+      const serie = prefixos[fluxo];
+      totais[fluxo] = !serie ? 0 : ids
+        ? rangeTotals(prefixos, serie.porCadeia, de, ate)
+          .filter(linha => ids.has(linha.cadeia))
+          .reduce((soma, linha) => soma + linha.valor, 0)
+        : rangeTotal(prefixos, serie.total, de, ate);
+    }
+
+    // Ranking de países: porPais, ou porCadeiaPais das cadeias filtradas
+    const bloco = ids
+      ? mergeBlocks((porCadeia || []).map(c => c?.[tipo]?.porCadeiaPais))
+      : prefixos[tipo]?.porPais;
+    let paises = null;
+    if (bloco) {
+      const porPais = new Map();
+      rangeTotals(prefixos, bloco, de, ate).forEach(({ pais, valor }) => {
+        porPais.set(pais, (porPais.get(pais) || 0) + valor);
+      });
+      paises = [...porPais.entries()]
+        .filter(([, valor]) => valor > 0)
+        .sort((a, b) => b[1] - a[1])
+        .slice(0, limit)
+        .map(([pais, valor]) => ({
+          pais: prefixos.dimensoes.paises[pais]?.nome ?? String(pais),
+          valor,
+          percentual: totais[tipo] > 0 ? (valor / totais[tipo]) * 100 : 0,
+        }));
+    }
+    return { totais, paises };
+  }, [prefixos, porCadeia, cadeias, tipo, de, ate, limit]);
+
+  if (!prefixos || !resultado) return null;
+
+  const minimo = monthAt(prefixos, 0);
+  const maximo = monthAt(prefixos, prefixos.meses - 1);
+  const { totais, paises } = resultado;
+  const saldo = totais.exportacoes - totais.importacoes;
+
+  return (
+    <div className="chart-container">
+      <div className="flex flex-wrap items-center justify-between gap-3 mb-4">
+        <h3 className="text-lg font-semibold text-dark-800 flex items-center gap-2">
+          <Calendar className="w-5 h-5 text-primary-600" />
+          {title}
+        </h3>
+        <div className="flex items-center gap-2 text-sm text-dark-600">
+          <input
+            type="month"
+            value={de}
+            min={minimo}
+            max={ate}
+            onChange={e => e.target.value && setDe(e.target.value)}
+            className="border border-dark-200 rounded-lg px-2 py-1"
+          />
+          <span>a</span>
+          <input
+            type="month"
+            value={ate}
+            min={de}
+            max={maximo}
+            onChange={e => e.target.value && setAte(e.target.value)}
+            className="border border-dark-200 rounded-lg px-2 py-1"
+          />
+        </div>
+      </div>
+
+      <div className="grid grid-cols-1 sm:grid-cols-3 gap-4 mb-4">
+        <div>
+          <p className="text-sm text-dark-500">Exportacoes (FOB)</p>
+          <p className="text-xl font-semibold text-primary-600">{formatCurrency(totais.exportacoes, 1)}</p>
+        </div>
+        <div>
+          <p className="text-sm text-dark-500">Importacoes (FOB)</p>
+          <p className="text-xl font-semibold text-accent-600">{formatCurrency(totais.importacoes, 1)}</p>
+        </div>
+        <div>
+          <p className="text-sm text-dark-500">Saldo</p>
+          <p className="text-xl font-semibold text-secondary-600">{formatCurrency(saldo, 1)}</p>
+        </div>
+      </div>
+
+      <div className="pt-4 border-t border-dark-100">
+        <p className="text-sm font-medium text-dark-700 mb-2">
+          {tipo === 'importacoes' ? 'Principais origens no periodo' : 'Principais destinos no periodo'}
+        </p>
+        {!paises ? (
+          <p className="text-sm text-dark-400">Carregando...</p>
+        ) : paises.length === 0 ? (
+          <p className="text-sm text-dark-400">Sem dados para o periodo</p>
+        ) : (
+          <ul className="space-y-1">
+            {paises.map(item => (
+              <li key={item.pais} className="flex justify-between text-sm">
+                <span className="text-dark-600 truncate">{item.pais}</span>
+                <span className="text-dark-800 font-medium">
+                  {formatCurrency(item.valor, 1)}
+                  <span className="text-dark-400 ml-2">{item.percentual.toFixed(1)}%</span>
+                </span>
+              </li>
+            ))}
+          </ul>
+        )}
+      </div>
+    </div>
+  );
+}
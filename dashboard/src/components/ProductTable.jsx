@@ -1,8 +1,139 @@
-import { useState, useMemo } from 'react';
-import { Search, ChevronUp, ChevronDown } from 'lucide-react';
+import { useState, useMemo, useEffect, useCallback } from 'react';
+import { Search, ChevronUp, ChevronDown, ChevronRight, Loader2 } from 'lucide-react';
 import { formatCurrency, formatWeight, getCategoryColor } from '../utils/format';
+import { loadHsChildren, RAIZ_HS } from '../utils/hierarquia';
 
-export default function ProductTable({ data, tipo = 'exportacoes', limit = 50 }) {
+function CategoriaBadge({ cadeia }) {
+  if (!cadeia) return null;
+  return (
+    <span
+      className="inline-flex items-center px-2 py-0.5 rounded-full text-xs font-medium"
+      style={{
+        backgroundColor: `${getCategoryColor(cadeia)}20`,
+        color: getCategoryColor(cadeia)
+      }}
+    >
+      {cadeia}
+    </span>
+  );
+}
+
+/**
+ * Árvore capítulo -> posição -> subposição -> NCM, expandida sob demanda.
+ * Os filhos de cada nó chegam ordenados por valor (ver utils/hierarquia.js).
+ */
+function HsTree({ tipo, cadeias }) {
+  const [filhos, setFilhos] = useState({});
+  const [expandidos, setExpandidos] = useState(() => new Set());
+  const [carregando, setCarregando] = useState(() => new Set([RAIZ_HS]));
+
+  const carregar = useCallback((codigo) => {
+    setCarregando(prev => new Set(prev).add(codigo));
+    loadHsChildren(codigo)
+      .then(nos => setFilhos(prev => ({ ...prev, [codigo]: nos })))
+      .catch(() => setFilhos(prev => ({ ...prev, [codigo]: null })))
+      .finally(() => setCarregando(prev => {
+        const proximo = new Set(prev);
+        proximo.delete(codigo);
+        return proximo;
+      }));
+  }, []);
+
+  useEffect(() => {
+    carregar(RAIZ_HS);
+  }, [carregar]);
+
+  const alternar = (codigo) => {
+    const expandir = !expandidos.has(codigo);
+    if (expandir && !(codigo in filhos)) carregar(codigo);
+    setExpandidos(prev => {
+      const proximo = new Set(prev);
+      if (expandir) proximo.add(codigo);
+      else proximo.delete(codigo);
+      return proximo;
+    });
+  };
+
+  // Linhas visíveis: nós da raiz e filhos dos nós expandidos, em profundidade
+  const linhas = [];
+  const visitar = (codigo, profundidade) => {
+    for (const no of filhos[codigo]?.[tipo] || []) {
+      linhas.push({ no, profundidade });
+      if (expandidos.has(no.codigo)) visitar(no.codigo, profundidade + 1);
+    }
+  };
+  visitar(RAIZ_HS, 0);
+
+  if (linhas.length === 0) {
+    return (
+      <div className="h-64 flex items-center justify-center">
+        <p className="text-dark-400">
+          {carregando.has(RAIZ_HS) ? 'Carregando...' : 'Sem dados para exibir'}
+        </p>
+      </div>
+    );
+  }
+
+  return (
+    <div className="overflow-x-auto scrollbar-thin">
+      <table className="w-full min-w-[700px]">
+        <thead>
+          <tr className="table-header">
+            <th className="px-4 py-3 text-left">Código</th>
+            <th className="px-4 py-3 text-left">Produto</th>
+            <th className="px-4 py-3 text-left">Categoria</th>
+            <th className="px-4 py-3 text-right">Valor FOB</th>
+            <th className="px-4 py-3 text-right">Peso</th>
+          </tr>
+        </thead>
+        <tbody>
+          {linhas.map(({ no, profundidade }) => (
+            <tr key={no.codigo} className="table-row">
+              <td className="px-4 py-3 font-mono text-sm text-dark-600">
+                <div className="flex items-center gap-1" style={{ paddingLeft: `${profundidade * 1.25}rem` }}>
+                  {no.filhos > 0 ? (
+                    <button
+                      type="button"
+                      onClick={() => alternar(no.codigo)}
+                      className="text-dark-400 hover:text-dark-700"
+                      aria-label={expandidos.has(no.codigo) ? 'Recolher' : 'Expandir'}
+                    >
+                      {carregando.has(no.codigo) ? (
+                        <Loader2 className="w-4 h-4 animate-spin" />
+                      ) : expandidos.has(no.codigo) ? (
+                        <ChevronDown className="w-4 h-4" />
+                      ) : (
+                        <ChevronRight className="w-4 h-4" />
+                      )}
+                    </button>
+                  ) : (
+                    <span className="w-4" />
+                  )}
+                  {no.codigo}
+                </div>
+              </td>
+              <td className="px-4 py-3 text-sm text-dark-800 max-w-xs truncate" title={no.descricao}>
+                {no.descricao || '-'}
+              </td>
+              <td className="px-4 py-3">
+                <CategoriaBadge cadeia={no.cadeia >= 0 ? cadeias?.[no.cadeia]?.nome : null} />
+              </td>
+              <td className="px-4 py-3 text-right font-medium text-dark-800">
+                {formatCurrency(no.valor, 1)}
+              </td>
+              <td className="px-4 py-3 text-right text-sm text-dark-600">
+                {formatWeight(no.peso)}
+              </td>
+            </tr>
+          ))}
+        </tbody>
+      </table>
+    </div>
+  );
+}
+
+export default function ProductTable({ data, tipo = 'exportacoes', limit = 50, cadeias }) {
+  const [modo, setModo] = useState('ranking');
   const [search, setSearch] = useState('');
   const [sortField, setSortField] = useState('valor');
   const [sortDirection, setSortDirection] = useState('desc');
@@ -50,7 +181,7 @@ export default function ProductTable({ data, tipo = 'exportacoes', limit = 50 })
       <ChevronDown className="w-4 h-4" />;
   };
 
-  if (produtos.length === 0) {
+  if (produtos.length === 0 && modo === 'ranking') {
     return (
       <div className="chart-container h-96 flex items-center justify-center">
         <p className="text-dark-400">Sem dados para exibir</p>
@@ -60,83 +191,96 @@ export default function ProductTable({ data, tipo = 'exportacoes', limit = 50 })
 
   return (
     <div className="chart-container">
-      {/* Search */}
+      {/* Modo e busca */}
       <div className="flex items-center gap-4 mb-4">
-        <div className="relative flex-1 max-w-md">
-          <Search className="absolute left-3 top-1/2 -translate-y-1/2 w-4 h-4 text-dark-400" />
-          <input
-            type="text"
-            value={search}
-            onChange={(e) => setSearch(e.target.value)}
-            placeholder="Buscar por NCM, produto ou categoria..."
-            className="w-full pl-10 pr-4 py-2 bg-dark-50 border border-dark-200 rounded-xl text-sm
-                     focus:ring-2 focus:ring-primary-500/20 focus:border-primary-500 transition-all"
-          />
+        <div className="flex rounded-xl border border-dark-200 overflow-hidden text-sm">
+          {[['ranking', 'Ranking'], ['arvore', 'Árvore SH']].map(([valor, rotulo]) => (
+            <button
+              key={valor}
+              type="button"
+              onClick={() => setModo(valor)}
+              className={`px-3 py-2 transition-colors ${
+                modo === valor ? 'bg-primary-500 text-white' : 'bg-dark-50 text-dark-600 hover:bg-dark-100'
+              }`}
+            >
+              {rotulo}
+            </button>
+          ))}
         </div>
-        <span className="text-sm text-dark-500">
-          {filteredData.length} de {produtos.length} produtos
-        </span>
+        {modo === 'ranking' && (
+          <>
+            <div className="relative flex-1 max-w-md">
+              <Search className="absolute left-3 top-1/2 -translate-y-1/2 w-4 h-4 text-dark-400" />
+              <input
+                type="text"
+                value={search}
+                onChange={(e) => setSearch(e.target.value)}
+                placeholder="Buscar por NCM, produto ou categoria..."
+                className="w-full pl-10 pr-4 py-2 bg-dark-50 border border-dark-200 rounded-xl text-sm
+                         focus:ring-2 focus:ring-primary-500/20 focus:border-primary-500 transition-all"
+              />
+            </div>
+            <span className="text-sm text-dark-500">
+              {filteredData.length} de {produtos.length} produtos
+            </span>
+          </>
+        )}
       </div>
 
-      {/* Table */}
-      <div className="overflow-x-auto scrollbar-thin">
-        <table className="w-full min-w-[700px]">
-          <thead>
-            <tr className="table-header">
-              <th className="px-4 py-3 text-left">NCM</th>
-              <th className="px-4 py-3 text-left">Produto</th>
-              <th className="px-4 py-3 text-left">Categoria</th>
-              <th
-                className="px-4 py-3 text-right cursor-pointer hover:bg-dark-100"
-                onClick={() => handleSort('valor')}
-              >
-                <div className="flex items-center justify-end gap-1">
-                  Valor FOB
-                  <SortIcon field="valor" />
-                </div>
-              </th>
-              <th
-                className="px-4 py-3 text-right cursor-pointer hover:bg-dark-100"
-                onClick={() => handleSort('peso')}
-              >
-                <div className="flex items-center justify-end gap-1">
-                  Peso
-                  <SortIcon field="peso" />
-                </div>
-              </th>
-            </tr>
-          </thead>
-          <tbody>
-            {filteredData.map((item, index) => (
-              <tr key={index} className="table-row">
-                <td className="px-4 py-3 font-mono text-sm text-dark-600">
-                  {item.ncm}
-                </td>
-                <td className="px-4 py-3 text-sm text-dark-800 max-w-xs truncate" title={item.descricao}>
-                  {item.descricao}
-                </td>
-                <td className="px-4 py-3">
-                  <span
-                    className="inline-flex items-center px-2 py-0.5 rounded-full text-xs font-medium"
-                    style={{
-                      backgroundColor: `${getCategoryColor(item.cadeia)}20`,
-                      color: getCategoryColor(item.cadeia)
-                    }}
-                  >
-                    {item.cadeia}
-                  </span>
-                </td>
-                <td className="px-4 py-3 text-right font-medium text-dark-800">
-                  {formatCurrency(item.valor, 1)}
-                </td>
-                <td className="px-4 py-3 text-right text-sm text-dark-600">
-                  {formatWeight(item.peso)}
-                </td>
+      {modo === 'arvore' ? (
+        <HsTree tipo={tipo} cadeias={cadeias} />
+      ) : (
+        <div className="overflow-x-auto scrollbar-thin">
+          <table className="w-full min-w-[700px]">
+            <thead>
+              <tr className="table-header">
+                <th className="px-4 py-3 text-left">NCM</th>
+                <th className="px-4 py-3 text-left">Produto</th>
+                <th className="px-4 py-3 text-left">Categoria</th>
+                <th
+                  className="px-4 py-3 text-right cursor-pointer hover:bg-dark-100"
+                  onClick={() => handleSort('valor')}
+                >
+                  <div className="flex items-center justify-end gap-1">
+                    Valor FOB
+                    <SortIcon field="valor" />
+                  </div>
+                </th>
+                <th
+                  className="px-4 py-3 text-right cursor-pointer hover:bg-dark-100"
+                  onClick={() => handleSort('peso')}
+                >
+                  <div className="flex items-center justify-end gap-1">
+                    Peso
+                    <SortIcon field="peso" />
+                  </div>
+                </th>
               </tr>
-            ))}
-          </tbody>
-        </table>
-      </div>
+            </thead>
+            <tbody>
+              {filteredData.map((item, index) => (
+                <tr key={index} className="table-row">
+                  <td className="px-4 py-3 font-mono text-sm text-dark-600">
+                    {item.ncm}
+                  </td>
+                  <td className="px-4 py-3 text-sm text-dark-800 max-w-xs truncate" title={item.descricao}>
+                    {item.descricao}
+                  </td>
+                  <td className="px-4 py-3">
+                    <CategoriaBadge cadeia={item.cadeia} />
+                  </td>
+                  <td className="px-4 py-3 text-right font-medium text-dark-800">
+                    {formatCurrency(item.valor, 1)}
+                  </td>
+                  <td className="px-4 py-3 text-right text-sm text-dark-600">
+                    {formatWeight(item.peso)}
+                  </td>
+                </tr>
+              ))}
+            </tbody>
+          </table>
+        </div>
+      )}
     </div>
   );
 }
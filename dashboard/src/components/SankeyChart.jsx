@@ -1,11 +1,14 @@
+import { useState, useMemo } from 'react';
 import { ResponsiveSankey } from '@nivo/sankey';
 import { formatCurrency } from '../utils/format';
 
+const CORES_NO = { municipio: '#22c55e', pais: '#3b82f6' };
+
 function CustomTooltip({ node, link }) {
   if (node) {
     return (
       <div className="bg-white/95 backdrop-blur-sm rounded-xl shadow-lg border border-dark-100 p-3">
-        <p className="font-semibold text-dark-800">{node.id.replace('mun_', '').replace('pais_', '')}</p>
+        <p className="font-semibold text-dark-800">{node.name}</p>
         <p className="text-sm text-dark-600">
           Valor: <span className="font-medium">{formatCurrency(node.value, 1)}</span>
         </p>
@@ -16,7 +19,7 @@ function CustomTooltip({ node, link }) {
     return (
       <div className="bg-white/95 backdrop-blur-sm rounded-xl shadow-lg border border-dark-100 p-3">
         <p className="font-semibold text-dark-800 mb-1">
-          {link.source.id.replace('mun_', '')} → {link.target.id.replace('pais_', '')}
+          {link.source.name} → {link.target.name}
         </p>
         <p className="text-sm text-dark-600">
           Valor FOB: <span className="font-medium">{formatCurrency(link.value, 1)}</span>
@@ -27,7 +30,89 @@ function CustomTooltip({ node, link }) {
   return null;
 }
 
-export default function SankeyChart({ data, title, filterNote, filteredLinks }) {
+/**
+ * Desenha um layout pré-calculado (sankey_layout.json, ver sankey.py): o SVG
+ * usa o tamanho de referência como viewBox e só é escalado pelo navegador.
+ */
+function SankeyPreCalculado({ layout, nodes }) {
+  const [destaque, setDestaque] = useState(null);
+
+  const porId = useMemo(() => new Map(nodes.map(n => [n.id, n])), [nodes]);
+  const posicoes = useMemo(() => new Map(layout.nos.map(n => [n.id, n])), [layout]);
+  const valores = useMemo(() => {
+    const totais = new Map();
+    layout.links.forEach(link => {
+      totais.set(link.source, (totais.get(link.source) || 0) + link.value);
+      totais.set(link.target, (totais.get(link.target) || 0) + link.value);
+    });
+    return totais;
+  }, [layout]);
+
+  return (
+    <svg
+      viewBox={`0 0 ${layout.largura} ${layout.altura}`}
+      preserveAspectRatio="xMidYMid meet"
+      className="w-full h-full"
+    >
+      <g fill="none">
+        {layout.links.map(link => {
+          const origem = posicoes.get(link.source);
+          const destino = posicoes.get(link.target);
+          if (!origem || !destino) return null;
+          const xm = (origem.x1 + destino.x0) / 2;
+          const ativo = destaque === null || destaque === link.source || destaque === link.target;
+          return (
+            <path
+              key={`${link.source}-${link.target}`}
+              d={`M${origem.x1},${link.y0}C${xm},${link.y0} ${xm},${link.y1} ${destino.x0},${link.y1}`}
+              stroke={CORES_NO.municipio}
+              strokeOpacity={ativo ? 0.5 : 0.1}
+              strokeWidth={Math.max(1, link.largura)}
+            >
+              <title>
+                {`${porId.get(link.source)?.name} → ${porId.get(link.target)?.name}: ${formatCurrency(link.value, 1)}`}
+              </title>
+            </path>
+          );
+        })}
+      </g>
+      {layout.nos.map(no => {
+        const node = porId.get(no.id);
+        const municipio = node?.type === 'municipio';
+        return (
+          <g
+            key={no.id}
+            onMouseEnter={() => setDestaque(no.id)}
+            onMouseLeave={() => setDestaque(null)}
+          >
+            <rect
+              x={no.x0}
+              y={no.y0}
+              width={no.x1 - no.x0}
+              height={Math.max(1, no.y1 - no.y0)}
+              rx={3}
+              fill={CORES_NO[node?.type] || '#64748b'}
+            >
+              <title>{`${node?.name}: ${formatCurrency(valores.get(no.id) || 0, 1)}`}</title>
+            </rect>
+            <text
+              x={municipio ? no.x0 - 16 : no.x1 + 16}
+              y={(no.y0 + no.y1) / 2}
+              dy="0.35em"
+              textAnchor={municipio ? 'end' : 'start'}
+              fontSize={11}
+              fill="#334155"
+            >
+              {node?.name}
+            </text>
+          </g>
+        );
+      })}
+    </svg>
+  );
+}
+
+export default function SankeyChart({ data, title, filterNote, filteredLinks, layout }) {
   // Usar links filtrados se disponíveis
   const links = filteredLinks || data?.links || [];
   const nodes = data?.nodes || [];
@@ -49,15 +134,16 @@ export default function SankeyChart({ data, title, filterNote, filteredLinks })
 
   const filteredNodes = nodes.filter(n => usedNodeIds.has(n.id));
 
-  // Preparar dados para o Nivo Sankey
+  // Preparar dados para o Nivo Sankey (ids inteiros dos nós como texto, ver sankey.py)
   const sankeyData = {
     nodes: filteredNodes.map(n => ({
-      id: n.id,
-      nodeColor: n.type === 'municipio' ? '#22c55e' : '#3b82f6'
+      id: String(n.id),
+      name: n.name,
+      nodeColor: CORES_NO[n.type]
     })),
     links: links.map(l => ({
-      source: l.source,
-      target: l.target,
+      source: String(l.source),
+      target: String(l.target),
       value: l.value
     }))
   };
@@ -88,6 +174,9 @@ export default function SankeyChart({ data, title, filterNote, filteredLinks })
       </div>
 
       <div className="h-[500px]">
+        {layout ? (
+          <SankeyPreCalculado layout={layout} nodes={nodes} />
+        ) : (
         <ResponsiveSankey
           data={sankeyData}
           margin={{ top: 20, right: 160, bottom: 20, left: 160 }}
@@ -112,9 +201,10 @@ export default function SankeyChart({ data, title, filterNote, filteredLinks })
             from: 'color',
             modifiers: [['darker', 1]]
           }}
-          label={(node) => node.id.replace('mun_', '').replace('pais_', '')}
+          label={(node) => node.name}
           tooltip={CustomTooltip}
         />
+        )}
       </div>
 
       {/* Summary */}
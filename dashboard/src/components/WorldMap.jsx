@@ -1,6 +1,7 @@
 import { useState, useEffect, useRef } from 'react';
 import { Globe } from 'lucide-react';
 import { formatCurrency } from '../utils/format';
+import { loadMapa } from '../utils/topologia';
 
 // Mapping Portuguese country names to ISO 2-letter codes
 const COUNTRY_TO_ISO = {
@@ -124,10 +125,9 @@ export default function WorldMap({ data, title, tipo = 'exportacoes' }) {
         maxZoom: 19,
       }).addTo(map);
 
-      // Load GeoJSON
+      // Load map (TopoJSON, GeoJSON as fallback)
       try {
-        const response = await fetch('./data/countries_merged.geojson');
-        const geojson = await response.json();
+        const geojson = await loadMapa('countries_merged');
 
         // Style function - uses dataRef for current values
         const style = (feature) => {
@@ -34,8 +34,14 @@ function TrendIndicator({ value }) {
   return <TrendingDown className="w-4 h-4 text-red-500" />;
 }
 
-export default function YoYComparisonChart({ data, title = 'Comparativo Anual', tipo = 'exportacoes' }) {
+/**
+ * @param {Array} data - série anual (timeseries), usada sem `serie`
+ * @param {Array} serie - comparativo pré-calculado [{ ano, valor, valorAnterior, variacao }]
+ *   (graficos.json, já filtrado por ano e cadeia em useFilteredData)
+ */
+export default function YoYComparisonChart({ data, serie, title = 'Comparativo Anual', tipo = 'exportacoes' }) {
   const chartData = useMemo(() => {
+    if (serie) return serie.length < 2 ? [] : serie;
     if (!data || data.length < 2) return [];
 
     return data.map((item, index) => {
@@ -55,7 +61,7 @@ export default function YoYComparisonChart({ data, title = 'Comparativo Anual',
         variacao,
       };
     });
-  }, [data, tipo]);
+  }, [data, serie, tipo]);
 
   // Calcular estatísticas
   const stats = useMemo(() => {
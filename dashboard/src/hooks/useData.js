@@ -1,57 +1,299 @@
-import { useState, useEffect, useMemo } from 'react';
+import { useState, useEffect, useMemo, useRef } from 'react';
+import { fetchArtifact } from '../utils/artifacts';
+import { fetchWithDeltas } from '../utils/deltas';
 
-const BASE_URL = import.meta.env.BASE_URL || '/comexstat-parana/';
+/**
+ * Converte uma tabela no formato colunar (ver serializacao.py) em lista de objetos.
+ * Colunas em `dicionario` guardam índices na tabela `strings` (-1 = nulo).
+ */
+export function decodeColunar({ n, strings, dicionario, colunas }) {
+  const campos = Object.keys(colunas);
+  const comDicionario = campos.map(campo => dicionario.includes(campo));
+  const arrays = campos.map(campo => colunas[campo]);
+  const registros = new Array(n);
+
+  for (let i = 0; i < n; i++) {
+    const registro = {};
+    for (let c = 0; c < campos.length; c++) {
+      const valor = arrays[c][i];
+      registro[campos[c]] = comDicionario[c] ? (valor >= 0 ? strings[valor] : null) : valor;
+    }
+    registros[i] = registro;
+  }
+  return registros;
+}
+
+/**
+ * Decodifica os blocos colunares de um artefato (percorre apenas objetos).
+ */
+function decodeArtifact(obj) {
+  if (!obj || typeof obj !== 'object' || Array.isArray(obj)) return obj;
+  if (obj._formato === 'colunar') return decodeColunar(obj);
+  for (const key of Object.keys(obj)) {
+    obj[key] = decodeArtifact(obj[key]);
+  }
+  return obj;
+}
+
+/**
+ * Prepara as dimensões (ver dimensoes.py) e expande os filtros, que trazem ids,
+ * para objetos/nomes: { dimensoes, filters }.
+ */
+function resolveDimensions(dimensoes, filters) {
+  const capitulos = new Map(dimensoes.capitulos.map(c => [c.codigo, c]));
+  return {
+    dimensoes: {
+      ...dimensoes,
+      indiceCadeias: new Map(dimensoes.cadeias.map((c, i) => [c.nome, i])),
+    },
+    filters: {
+      cadeias: filters.cadeias.map(i => dimensoes.cadeias[i]),
+      capitulos: filters.capitulos.map(codigo => capitulos.get(codigo)),
+      paisesExp: filters.paisesExp.map(i => dimensoes.paises[i].nome),
+      paisesImp: filters.paisesImp.map(i => dimensoes.paises[i].nome),
+    }
+  };
+}
+
+/**
+ * Ids das cadeias efetivas (Set), para comparar inteiros em vez de nomes.
+ */
+function cadeiaIds(data, cadeiasEfetivas) {
+  const indice = data.dimensoes.indiceCadeias;
+  return new Set(cadeiasEfetivas.map(nome => indice.get(nome)));
+}
+
+/**
+ * Cadeias efetivas dos filtros: as selecionadas, restritas ao tipoCategoria
+ * ('produtos'/'insumos'), ou null quando não há filtro de cadeia.
+ */
+export function resolveCadeias(allCadeias, filters = {}) {
+  const { cadeias, tipoCategoria } = filters;
+
+  // Se tipoCategoria é 'todos' ou não definido, não filtrar por cadeias (a menos que cadeias específicas sejam selecionadas)
+  if (!tipoCategoria || tipoCategoria === 'todos') {
+    // Usa cadeias selecionadas manualmente, ou null para mostrar tudo
+    return (cadeias && cadeias.length > 0) ? cadeias : null;
+  }
+
+  // tipoCategoria é 'produtos' ou 'insumos'
+  // Filtrar cadeias pelo tipo
+  const cadeiasDoTipo = (allCadeias || [])
+    .filter(c => c.tipo === tipoCategoria.slice(0, -1)) // 'produtos' -> 'produto', 'insumos' -> 'insumo'
+    .map(c => c.nome);
+
+  if (cadeias && cadeias.length > 0) {
+    // Se há cadeias selecionadas, manter apenas as do tipo correto
+    const cadeiasEfetivas = cadeias.filter(c => cadeiasDoTipo.includes(c));
+    // Se nenhuma sobrou, usar todas do tipo
+    return cadeiasEfetivas.length > 0 ? cadeiasEfetivas : cadeiasDoTipo;
+  }
+  // Se não há cadeias selecionadas, usar todas do tipo
+  return cadeiasDoTipo;
+}
+
+/**
+ * Anos disponíveis dentro do intervalo do filtro, ou null quando o intervalo
+ * cobre todos (usa-se o agregado de todos os anos).
+ */
+function anosSelecionados(anos = [], anoMin, anoMax) {
+  const dentro = anos.filter(ano => (!anoMin || ano >= anoMin) && (!anoMax || ano <= anoMax));
+  return dentro.length === anos.length ? null : dentro;
+}
+
+// Visões (shards/<visao>.json) usadas por cada aba
+const VISOES_POR_ABA = {
+  'visao-geral': ['sankey', 'paises', 'graficos'],
+  'categorias': ['categorias'],
+  'paises': ['paises', 'graficos'],
+  'municipios': ['municipios'],
+  'produtos': ['produtos'],
+  'previsoes': ['previsoes'],
+};
 
 /**
- * Hook para carregar todos os dados do dashboard
+ * Shards (caminhos relativos a data/) necessários para a aba e os filtros atuais.
+ * Ver shards.py para o formato do manifesto.
  */
-export function useData() {
-  const [data, setData] = useState(null);
+function shardsNecessarios(manifest, activeTab, cadeiasEfetivas, anoMin, anoMax) {
+  const visoes = VISOES_POR_ABA[activeTab] || [];
+  const caminhos = visoes.map(v => manifest.visoes?.[v]);
+
+  // Tabelas por cadeia, apenas com filtro de cadeia ativo
+  if (cadeiasEfetivas && cadeiasEfetivas.length > 0) {
+    for (const visao of visoes) {
+      const porCadeia = manifest.porCadeia?.[visao] || {};
+      cadeiasEfetivas.forEach(cadeia => caminhos.push(porCadeia[cadeia]));
+    }
+  }
+
+  // Sankey e municípios por ano, apenas quando o intervalo não cobre todos os anos
+  for (const visao of visoes) {
+    const porAno = manifest.porAno?.[visao];
+    if (!porAno) continue;
+    const anos = anosSelecionados(Object.keys(porAno).map(Number), anoMin, anoMax);
+    (anos || []).forEach(ano => caminhos.push(porAno[ano]));
+  }
+
+  // Série mensal (heatmap) apenas dos anos no intervalo
+  if (activeTab === 'visao-geral') {
+    for (const [ano, caminho] of Object.entries(manifest.porAno?.mensal || {})) {
+      if (anoMin && Number(ano) < anoMin) continue;
+      if (anoMax && Number(ano) > anoMax) continue;
+      caminhos.push(caminho);
+    }
+  }
+
+  return caminhos.filter(Boolean);
+}
+
+/**
+ * Monta o objeto de dados (mesmo formato do carregamento completo) a partir
+ * do boot e dos shards já carregados.
+ */
+function montarDados(boot, manifest, shards) {
+  const visao = nome => shards[manifest.visoes?.[nome]] || null;
+  const porCadeia = nome => Object.values(manifest.porCadeia?.[nome] || {})
+    .map(caminho => shards[caminho])
+    .filter(Boolean);
+  const porAno = nome => Object.values(manifest.porAno?.[nome] || {})
+    .map(caminho => shards[caminho])
+    .filter(Boolean);
+
+  const paisesCadeia = porCadeia('paises');
+  const byPaisByCadeia = paisesCadeia.length > 0 ? {
+    exportacoes: paisesCadeia.flatMap(s => s.exportacoes),
+    importacoes: paisesCadeia.flatMap(s => s.importacoes),
+  } : null;
+
+  const sankeyCadeia = porCadeia('sankey');
+  const sankeyAno = porAno('sankey');
+  const layoutGeral = visao('sankey')?.sankeyLayout;
+  const sankey = visao('sankey') && {
+    ...visao('sankey').sankey,
+    linksByCadeia: sankeyCadeia.flatMap(s => s.linksByCadeia),
+    linksByAno: sankeyAno.flatMap(s => s.linksByAno),
+    linksByAnoCadeia: sankeyAno.flatMap(s => s.linksByAnoCadeia),
+    layout: layoutGeral && {
+      ...layoutGeral,
+      visoes: Object.assign({}, layoutGeral.visoes, ...sankeyCadeia.map(s => s.layouts)),
+      anos: Object.assign({}, ...sankeyAno.map(s => s.layouts)),
+    },
+  };
+
+  const municipiosAno = porAno('municipios');
+  const municipios = visao('municipios') && {
+    ...visao('municipios').municipios,
+    municipiosByCadeia: porCadeia('municipios').flatMap(s => s.municipiosByCadeia),
+    municipiosByAno: municipiosAno.flatMap(s => s.municipiosByAno),
+    totaisByAno: municipiosAno.flatMap(s => s.totaisByAno),
+    municipiosByAnoCadeia: municipiosAno.flatMap(s => s.municipiosByAnoCadeia),
+  };
+
+  const mensal = Object.entries(manifest.porAno?.mensal || {})
+    .sort(([a], [b]) => a - b)
+    .map(([, caminho]) => shards[caminho])
+    .filter(Boolean);
+
+  return {
+    metadata: boot.metadata,
+    ...resolveDimensions(boot.dimensoes, boot.filters),
+    timeseries: boot.timeseries,
+    timeseriesByCadeia: boot.timeseriesByCadeia || [],
+    byCategoria: visao('categorias')?.byCategoria,
+    byPais: visao('paises')?.byPais,
+    byPaisByCadeia,
+    topProdutos: visao('produtos')?.topProdutos,
+    detailed: mensal.length > 0 ? { timeseriesMensal: mensal.flatMap(s => s.timeseriesMensal) } : null,
+    forecasts: visao('previsoes')?.forecasts?.previsoes || null,
+    graficos: visao('graficos')?.graficos || null,
+    mapData: null,
+    sankey: sankey || null,
+    municipios: municipios || null
+  };
+}
+
+/**
+ * Carrega os artefatos completos (publicação sem boot.json).
+ * aggregated.json e detailed.json são atualizados por deltas quando há uma
+ * versão anterior guardada (ver utils/deltas.js).
+ */
+async function carregarCompleto() {
+  // Carregar dados em paralelo
+  const [aggregated, detailed, foreRes, graficosRes, mapRes, sankeyRes, layoutRes, munRes] = await Promise.all([
+    fetchWithDeltas('aggregated.json', decodeArtifact),
+    fetchWithDeltas('detailed.json', decodeArtifact).catch(() => null),
+    fetchArtifact('forecasts.json').catch(() => null),
+    fetchArtifact('graficos.json').catch(() => null),
+    fetchArtifact('map_data.json').catch(() => null),
+    fetchArtifact('sankey_data.json').catch(() => null),
+    fetchArtifact('sankey_layout.json').catch(() => null),
+    fetchArtifact('municipios_data.json').catch(() => null),
+  ]);
+
+  if (!aggregated) throw new Error('Erro ao carregar dados agregados');
+
+  const forecasts = foreRes?.ok ? await foreRes.json() : null;
+  const graficos = graficosRes?.ok ? await graficosRes.json() : null;
+  const mapData = mapRes?.ok ? await mapRes.json() : null;
+  const sankey = sankeyRes?.ok ? decodeArtifact(await sankeyRes.json()) : null;
+  if (sankey && layoutRes?.ok) sankey.layout = await layoutRes.json();
+  const municipios = munRes?.ok ? decodeArtifact(await munRes.json()) : null;
+
+  // Combinar todos os dados
+  return {
+    metadata: aggregated.metadata,
+    ...resolveDimensions(aggregated.dimensoes, aggregated.filters),
+    timeseries: aggregated.timeseries,
+    timeseriesByCadeia: aggregated.timeseriesByCadeia || [],
+    byCategoria: aggregated.byCategoria,
+    byPais: aggregated.byPais,
+    byPaisByCadeia: aggregated.byPaisByCadeia || null,
+    topProdutos: aggregated.topProdutos,
+    detailed,
+    forecasts: forecasts?.previsoes || null,
+    graficos,
+    mapData,
+    sankey,
+    municipios
+  };
+}
+
+/**
+ * Hook para carregar os dados do dashboard.
+ *
+ * Carrega boot.json (metadados, filtros e séries anuais) antes do primeiro
+ * render e busca sob demanda os shards da aba ativa e dos filtros de cadeia
+ * e ano (ver shards.py), aplicando deltas aos que os têm no manifesto. Sem
+ * boot.json, carrega os artefatos completos.
+ */
+export function useData(activeTab = 'visao-geral', filters = {}) {
+  const [boot, setBoot] = useState(null);
+  const [manifest, setManifest] = useState(null);
+  const [shards, setShards] = useState({});
+  const [fullData, setFullData] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingShards, setLoadingShards] = useState(false);
   const [error, setError] = useState(null);
+  const requested = useRef(new Set());
 
   useEffect(() => {
-    async function loadData() {
+    async function loadBoot() {
       try {
         setLoading(true);
         setError(null);
 
-        // Carregar dados em paralelo
-        const [aggRes, detRes, foreRes, mapRes, sankeyRes, munRes] = await Promise.all([
-          fetch(`${BASE_URL}data/aggregated.json`),
-          fetch(`${BASE_URL}data/detailed.json`).catch(() => null),
-          fetch(`${BASE_URL}data/forecasts.json`).catch(() => null),
-          fetch(`${BASE_URL}data/map_data.json`).catch(() => null),
-          fetch(`${BASE_URL}data/sankey_data.json`).catch(() => null),
-          fetch(`${BASE_URL}data/municipios_data.json`).catch(() => null),
-        ]);
-
-        if (!aggRes.ok) throw new Error('Erro ao carregar dados agregados');
-
-        const aggregated = await aggRes.json();
-        const detailed = detRes?.ok ? await detRes.json() : null;
-        const forecasts = foreRes?.ok ? await foreRes.json() : null;
-        const mapData = mapRes?.ok ? await mapRes.json() : null;
-        const sankey = sankeyRes?.ok ? await sankeyRes.json() : null;
-        const municipios = munRes?.ok ? await munRes.json() : null;
-
-        // Combinar todos os dados
-        setData({
-          metadata: aggregated.metadata,
-          filters: aggregated.filters,
-          timeseries: aggregated.timeseries,
-          timeseriesByCadeia: aggregated.timeseriesByCadeia || [],
-          byCategoria: aggregated.byCategoria,
-          byPais: aggregated.byPais,
-          byPaisByCadeia: aggregated.byPaisByCadeia || null,
-          topProdutos: aggregated.topProdutos,
-          detailed,
-          forecasts: forecasts?.previsoes || null,
-          mapData,
-          sankey,
-          municipios
-        });
+        const bootData = await fetchWithDeltas('boot.json', decodeArtifact).catch(() => null);
+        if (!bootData) {
+          setFullData(await carregarCompleto());
+          return;
+        }
+
+        const manifestRes = await fetchArtifact(bootData.shards);
+        if (!manifestRes.ok) throw new Error('Erro ao carregar índice de dados');
 
+        setManifest(await manifestRes.json());
+        setBoot(bootData);
       } catch (err) {
         setError(err.message);
       } finally {
@@ -59,10 +301,117 @@ export function useData() {
       }
     }
 
-    loadData();
+    loadBoot();
   }, []);
 
-  return { data, loading, error };
+  const cadeiasEfetivas = useMemo(() => {
+    if (!boot) return null;
+    const { filters: bootFilters } = resolveDimensions(boot.dimensoes, boot.filters);
+    return resolveCadeias(bootFilters.cadeias, filters);
+  }, [boot, filters.cadeias, filters.tipoCategoria]);
+
+  useEffect(() => {
+    if (!manifest) return;
+
+    const pendentes = shardsNecessarios(manifest, activeTab, cadeiasEfetivas, filters.anoMin, filters.anoMax)
+      .filter(caminho => !requested.current.has(caminho));
+    if (pendentes.length === 0) return;
+
+    pendentes.forEach(caminho => requested.current.add(caminho));
+    setLoadingShards(true);
+
+    // Shards que mudam a cada atualização (série mensal) vêm por deltas
+    // quando há uma versão anterior guardada (ver utils/deltas.js)
+    Promise.all(pendentes.map(async caminho => {
+      const dados = await fetchWithDeltas(caminho, decodeArtifact);
+      if (!dados) throw new Error(`Erro ao carregar ${caminho}`);
+      return [caminho, dados];
+    }))
+      .then(carregados => setShards(prev => ({ ...prev, ...Object.fromEntries(carregados) })))
+      .catch(err => {
+        // Permitir nova tentativa na próxima mudança de aba/filtro
+        pendentes.forEach(caminho => requested.current.delete(caminho));
+        setError(err.message);
+      })
+      .finally(() => setLoadingShards(false));
+  }, [manifest, activeTab, cadeiasEfetivas, filters.anoMin, filters.anoMax]);
+
+  const data = useMemo(
+    () => fullData || (boot && manifest ? montarDados(boot, manifest, shards) : null),
+    [fullData, boot, manifest, shards]
+  );
+
+  return { data, loading, loadingShards, error };
+}
+
+const FLUXOS = ['exportacoes', 'importacoes'];
+
+/**
+ * Restringe as matrizes de graficos.json (ver preparar_graficos) aos anos e
+ * cadeias dos filtros. Cada filtro só soma linhas já agregadas.
+ */
+function filtrarGraficos(graficos, data, cadeiasEfetivas, anoMin, anoMax) {
+  const { anos } = graficos;
+  const indices = anos
+    .map((ano, i) => [ano, i])
+    .filter(([ano]) => (!anoMin || ano >= anoMin) && (!anoMax || ano <= anoMax))
+    .map(([, i]) => i);
+  const ids = cadeiasEfetivas && cadeiasEfetivas.length > 0 ? cadeiaIds(data, cadeiasEfetivas) : null;
+  const selecionada = cadeia => !ids || ids.has(cadeia);
+  const nomeCadeia = cadeia => data.dimensoes.cadeias[cadeia]?.nome ?? String(cadeia);
+  const somar = (linhas, tamanho) => {
+    const soma = new Array(tamanho).fill(0);
+    linhas.forEach(linha => linha.forEach((valor, j) => { soma[j] += valor; }));
+    return soma;
+  };
+
+  // Heatmap: grade [ano][mês] somada nos anos do filtro
+  const heatmap = {};
+  // Cordas: linhas = cadeias, colunas = principais países
+  const cordas = {};
+  // Comparativo anual: total ou soma das cadeias selecionadas
+  const comparativo = {};
+
+  for (const fluxo of FLUXOS) {
+    heatmap[fluxo] = (graficos.heatmap?.[fluxo] || [])
+      .filter(linha => selecionada(linha.cadeia))
+      .map(linha => ({
+        categoria: nomeCadeia(linha.cadeia),
+        valores: somar(indices.map(i => linha.grade[i]), 12),
+      }));
+
+    const matriz = graficos.cordas?.[fluxo];
+    if (matriz) {
+      const linhas = matriz.cadeias
+        .map((cadeia, k) => [cadeia, k])
+        .filter(([cadeia]) => selecionada(cadeia));
+      cordas[fluxo] = {
+        linhas: linhas.map(([cadeia]) => nomeCadeia(cadeia)),
+        colunas: matriz.paises.map(p => p.nome),
+        valores: linhas.map(([, k]) => somar(indices.map(i => matriz.matriz[i][k]), matriz.paises.length)),
+      };
+    }
+
+    const series = graficos.comparativo?.[fluxo];
+    if (series) {
+      const selecionadas = ids ? series.porCadeia.filter(s => ids.has(s.cadeia)) : [series.total];
+      // Uma única série já traz a variação; várias cadeias são somadas
+      const unica = selecionadas.length === 1 ? selecionadas[0] : null;
+      const valores = unica ? unica.valores : somar(selecionadas.map(s => s.valores), anos.length);
+      comparativo[fluxo] = indices.map((i, k) => {
+        const valorAnterior = k > 0 ? valores[i - 1] : null;
+        let variacao = null;
+        if (k > 0) {
+          variacao = unica
+            ? unica.variacao[i]
+            : (valorAnterior > 0 ? ((valores[i] - valorAnterior) / valorAnterior) * 100 : null);
+        }
+        return { ano: anos[i], valor: valores[i], valorAnterior, variacao };
+      });
+    }
+  }
+
+  return { heatmap, cordas, comparativo };
 }
 
 /**
@@ -72,35 +421,10 @@ export function useFilteredData(data, filters) {
   return useMemo(() => {
     if (!data) return null;
 
-    const { anoMin, anoMax, cadeias, tipo, tipoCategoria } = filters;
-    const allCadeias = data.filters?.cadeias || [];
+    const { anoMin, anoMax, tipo } = filters;
 
     // Determinar cadeias efetivas baseado no tipoCategoria
-    let cadeiasEfetivas = null;
-
-    // Se tipoCategoria é 'todos' ou não definido, não filtrar por cadeias (a menos que cadeias específicas sejam selecionadas)
-    if (!tipoCategoria || tipoCategoria === 'todos') {
-      // Usa cadeias selecionadas manualmente, ou null para mostrar tudo
-      cadeiasEfetivas = (cadeias && cadeias.length > 0) ? cadeias : null;
-    } else {
-      // tipoCategoria é 'produtos' ou 'insumos'
-      // Filtrar cadeias pelo tipo
-      const cadeiasDoTipo = allCadeias
-        .filter(c => c.tipo === tipoCategoria.slice(0, -1)) // 'produtos' -> 'produto', 'insumos' -> 'insumo'
-        .map(c => c.nome);
-
-      if (cadeias && cadeias.length > 0) {
-        // Se há cadeias selecionadas, manter apenas as do tipo correto
-        cadeiasEfetivas = cadeias.filter(c => cadeiasDoTipo.includes(c));
-        // Se nenhuma sobrou, usar todas do tipo
-        if (cadeiasEfetivas.length === 0) {
-          cadeiasEfetivas = cadeiasDoTipo;
-        }
-      } else {
-        // Se não há cadeias selecionadas, usar todas do tipo
-        cadeiasEfetivas = cadeiasDoTipo;
-      }
-    }
+    const cadeiasEfetivas = resolveCadeias(data.filters?.cadeias, filters);
 
     // Filtrar série temporal por ano e cadeia
     let timeseries = data.timeseries || [];
@@ -108,9 +432,8 @@ export function useFilteredData(data, filters) {
     // Se há filtro de cadeias, recalcular timeseries a partir de timeseriesByCadeia
     if (cadeiasEfetivas && cadeiasEfetivas.length > 0 && data.timeseriesByCadeia) {
       // Filtrar por cadeias selecionadas
-      const filteredByCadeia = data.timeseriesByCadeia.filter(item =>
-        cadeiasEfetivas.includes(item.cadeia)
-      );
+      const ids = cadeiaIds(data, cadeiasEfetivas);
+      const filteredByCadeia = data.timeseriesByCadeia.filter(item => ids.has(item.cadeia));
 
       // Agrupar por ano
       const byYear = {};
@@ -136,18 +459,18 @@ export function useFilteredData(data, filters) {
       });
     }
 
-    // Filtrar por categoria (cadeia)
-    let byCategoria = data.byCategoria || { exportacoes: [], importacoes: [] };
-    if (cadeiasEfetivas && cadeiasEfetivas.length > 0) {
-      byCategoria = {
-        exportacoes: byCategoria.exportacoes.filter(item =>
-          cadeiasEfetivas.includes(item.categoria)
-        ),
-        importacoes: byCategoria.importacoes.filter(item =>
-          cadeiasEfetivas.includes(item.categoria)
-        )
-      };
-    }
+    // Filtrar por categoria (cadeia); byCategoria e topProdutos trazem ids em
+    // dimensoes.cadeias, trocados pelos nomes na saída
+    const idsCadeias = cadeiasEfetivas && cadeiasEfetivas.length > 0 ? cadeiaIds(data, cadeiasEfetivas) : null;
+    const nomeCadeia = id => data.dimensoes.cadeias[id]?.nome ?? null;
+    const porCadeia = (registros, campo) => (registros || [])
+      .filter(item => !idsCadeias || idsCadeias.has(item[campo]))
+      .map(item => ({ ...item, [campo]: nomeCadeia(item[campo]) }));
+
+    const byCategoria = {
+      exportacoes: porCadeia(data.byCategoria?.exportacoes, 'categoria'),
+      importacoes: porCadeia(data.byCategoria?.importacoes, 'categoria')
+    };
 
     // Filtrar por país (com suporte a filtro por cadeia)
     let byPais = data.byPais || { exportacoes: [], importacoes: [] };
@@ -155,33 +478,26 @@ export function useFilteredData(data, filters) {
     // Se há filtro de cadeias E temos dados por país-cadeia, recalcular byPais
     if (cadeiasEfetivas && cadeiasEfetivas.length > 0 && data.byPaisByCadeia) {
       // Filtrar por cadeias selecionadas
-      const expFiltered = data.byPaisByCadeia.exportacoes.filter(item =>
-        cadeiasEfetivas.includes(item.cadeia)
-      );
-      const impFiltered = data.byPaisByCadeia.importacoes.filter(item =>
-        cadeiasEfetivas.includes(item.cadeia)
-      );
-
-      // Reagregar por país
-      const expByPais = {};
-      expFiltered.forEach(item => {
-        const key = `${item.codigo}|${item.pais}`;
-        if (!expByPais[key]) {
-          expByPais[key] = { codigo: item.codigo, pais: item.pais, valor: 0, peso: 0 };
-        }
-        expByPais[key].valor += item.valor || 0;
-        expByPais[key].peso += item.peso || 0;
-      });
-
-      const impByPais = {};
-      impFiltered.forEach(item => {
-        const key = `${item.codigo}|${item.pais}`;
-        if (!impByPais[key]) {
-          impByPais[key] = { codigo: item.codigo, pais: item.pais, valor: 0, peso: 0 };
-        }
-        impByPais[key].valor += item.valor || 0;
-        impByPais[key].peso += item.peso || 0;
-      });
+      const ids = cadeiaIds(data, cadeiasEfetivas);
+      const expFiltered = data.byPaisByCadeia.exportacoes.filter(item => ids.has(item.cadeia));
+      const impFiltered = data.byPaisByCadeia.importacoes.filter(item => ids.has(item.cadeia));
+
+      // Reagregar por país (id em dimensoes.paises)
+      const paises = data.dimensoes.paises;
+      const reagregar = registros => {
+        const porPais = {};
+        registros.forEach(item => {
+          if (!porPais[item.pais]) {
+            const pais = paises[item.pais];
+            porPais[item.pais] = { codigo: pais?.codigo ?? null, pais: pais?.nome ?? null, valor: 0, peso: 0 };
+          }
+          porPais[item.pais].valor += item.valor || 0;
+          porPais[item.pais].peso += item.peso || 0;
+        });
+        return porPais;
+      };
+      const expByPais = reagregar(expFiltered);
+      const impByPais = reagregar(impFiltered);
 
       byPais = {
         exportacoes: Object.values(expByPais).sort((a, b) => b.valor - a.valor).slice(0, 50),
@@ -189,18 +505,11 @@ export function useFilteredData(data, filters) {
       };
     }
 
-    // Filtrar top produtos
-    let topProdutos = data.topProdutos || { exportacoes: [], importacoes: [] };
-    if (cadeiasEfetivas && cadeiasEfetivas.length > 0) {
-      topProdutos = {
-        exportacoes: topProdutos.exportacoes.filter(item =>
-          cadeiasEfetivas.includes(item.cadeia)
-        ),
-        importacoes: topProdutos.importacoes.filter(item =>
-          cadeiasEfetivas.includes(item.cadeia)
-        )
-      };
-    }
+    // Filtrar top produtos (cadeia: id em dimensoes.cadeias)
+    const topProdutos = {
+      exportacoes: porCadeia(data.topProdutos?.exportacoes, 'cadeia'),
+      importacoes: porCadeia(data.topProdutos?.importacoes, 'cadeia')
+    };
 
     // Filtrar dados detalhados se disponíveis
     let detailed = null;
@@ -217,34 +526,52 @@ export function useFilteredData(data, filters) {
       detailed = { timeseriesMensal };
     }
 
-    // Filtrar dados do Sankey por cadeia
+    // Filtrar dados do Sankey por cadeia e ano
     let sankey = data.sankey || null;
     let filteredSankeyLinks = null;
+    // Layout pré-calculado (sankey.py): visão geral ou uma única cadeia, de todos os anos ou de um ano
+    let visaoSankey = 'geral';
+    let layoutsSankey = sankey?.layout?.visoes;
+
+    if (sankey) {
+      let filteredLinks = null;
+      let cadeiasValidas = null;
+
+      if (cadeiasEfetivas && cadeiasEfetivas.length > 0 && sankey.linksByCadeia) {
+        // Verificar se há cadeias válidas nos dados do Sankey (ids, ver sankey.py)
+        const ids = cadeiaIds(data, cadeiasEfetivas);
+        const validas = new Set(sankey.linksByCadeia.map(l => l.cadeia).filter(c => ids.has(c)));
+
+        // Só filtrar se houver cadeias válidas nos dados
+        if (validas.size > 0) {
+          cadeiasValidas = validas;
+          visaoSankey = validas.size === 1 ? String([...validas][0]) : null;
+          filteredLinks = sankey.linksByCadeia.filter(link => validas.has(link.cadeia));
+        }
+      }
 
-    if (sankey && cadeiasEfetivas && cadeiasEfetivas.length > 0 && sankey.linksByCadeia) {
-      // Verificar se há cadeias válidas nos dados do Sankey
-      const cadeiasDisponiveis = [...new Set(sankey.linksByCadeia.map(l => l.cadeia))];
-      const cadeiasValidas = cadeiasEfetivas.filter(c => cadeiasDisponiveis.includes(c));
-
-      // Só filtrar se houver cadeias válidas nos dados
-      if (cadeiasValidas.length > 0) {
-        // Filtrar links por cadeias selecionadas
-        const filteredLinks = sankey.linksByCadeia.filter(link =>
-          cadeiasValidas.includes(link.cadeia)
+      // Intervalo de anos: seleções de cada ano (um único ano já vem pronto, com layout)
+      const anos = anosSelecionados(sankey.anos, anoMin, anoMax);
+      if (anos && sankey.linksByAno) {
+        const noIntervalo = new Set(anos);
+        filteredLinks = (cadeiasValidas ? sankey.linksByAnoCadeia : sankey.linksByAno).filter(link =>
+          noIntervalo.has(link.ano) && (!cadeiasValidas || cadeiasValidas.has(link.cadeia))
         );
+        layoutsSankey = anos.length === 1 ? sankey.layout?.anos?.[anos[0]] : null;
+      }
 
-        if (filteredLinks.length > 0) {
-        // Agregar links do mesmo source-target
-        const linkMap = {};
+      if (filteredLinks && filteredLinks.length > 0) {
+        // Agregar links do mesmo source-target (ids inteiros dos nós)
+        const linkMap = new Map();
         filteredLinks.forEach(link => {
-          const key = `${link.source}|${link.target}`;
-          if (!linkMap[key]) {
-            linkMap[key] = { source: link.source, target: link.target, value: 0 };
+          const key = link.source * sankey.nodes.length + link.target;
+          if (!linkMap.has(key)) {
+            linkMap.set(key, { source: link.source, target: link.target, value: 0 });
           }
-          linkMap[key].value += link.value;
+          linkMap.get(key).value += link.value;
         });
 
-        filteredSankeyLinks = Object.values(linkMap).sort((a, b) => b.value - a.value);
+        filteredSankeyLinks = [...linkMap.values()].sort((a, b) => b.value - a.value);
 
         // Filtrar nodes para manter apenas os que têm links
         const usedNodes = new Set();
@@ -260,34 +587,80 @@ export function useFilteredData(data, filters) {
           nodes: filteredNodes,
           links: filteredSankeyLinks
         };
-        }
       }
-      // Se não há cadeias válidas, manter dados originais (sem filtro)
+      // Sem cadeias válidas nem anos carregados, manter dados originais (sem filtro)
+    }
+
+    let sankeyLayout = null;
+    const layoutSankey = layoutsSankey?.[visaoSankey];
+    if (layoutSankey) {
+      const { largura, altura, espessura } = sankey.layout;
+      sankeyLayout = { largura, altura, espessura, ...layoutSankey };
     }
 
-    // Filtrar dados de municípios por cadeia
+    // Filtrar dados de municípios por cadeia e ano
     let municipios = data.municipios || null;
 
-    if (municipios && cadeiasEfetivas && cadeiasEfetivas.length > 0 && municipios.municipiosByCadeia) {
-      // Verificar se há cadeias válidas nos dados de municípios
-      const cadeiasDisponiveis = [...new Set(municipios.municipiosByCadeia.map(m => m.cadeia))];
-      const cadeiasValidas = cadeiasEfetivas.filter(c => cadeiasDisponiveis.includes(c));
+    if (municipios) {
+      const dimMunicipios = municipios.dimensoes.municipios;
+      let cadeiasValidas = null;
+      let filteredMunCadeia = null;
 
-      // Só filtrar se houver cadeias válidas nos dados
-      if (cadeiasValidas.length > 0) {
-        // Filtrar por cadeias selecionadas
-        const filteredMunCadeia = municipios.municipiosByCadeia.filter(item =>
-          cadeiasValidas.includes(item.cadeia)
+      if (cadeiasEfetivas && cadeiasEfetivas.length > 0 && municipios.municipiosByCadeia) {
+        // Verificar se há cadeias válidas nos dados de municípios
+        const ids = cadeiaIds(data, cadeiasEfetivas);
+        const validas = new Set(municipios.municipiosByCadeia.map(m => m.cadeia).filter(c => ids.has(c)));
+
+        // Só filtrar se houver cadeias válidas nos dados
+        if (validas.size > 0) {
+          cadeiasValidas = validas;
+          filteredMunCadeia = municipios.municipiosByCadeia.filter(item => validas.has(item.cadeia));
+        }
+      }
+
+      const anos = anosSelecionados(municipios.anos, anoMin, anoMax);
+      const totalAno = anos && anos.length === 1 && !cadeiasValidas
+        ? (municipios.totaisByAno || []).find(t => t.ano === anos[0])
+        : null;
+
+      if (totalAno) {
+        // Um único ano: ranking e totais já calculados (ver update_municipios.py)
+        municipios = {
+          ...municipios,
+          totalValor: totalAno.valor,
+          totalPeso: totalAno.peso,
+          municipios: municipios.municipiosByAno
+            .filter(item => item.ano === totalAno.ano)
+            .map(({ municipio, valor, peso, percentual }) => ({
+              codigo: dimMunicipios[municipio]?.codigo ?? null,
+              nome: dimMunicipios[municipio]?.nome ?? null,
+              valor,
+              peso,
+              percentual,
+            })),
+        };
+        filteredMunCadeia = null;
+      } else if (anos && municipios.municipiosByAno) {
+        // Intervalo de anos: totais por ano e cadeia (ou os rankings de cada ano, sem cadeias)
+        const noIntervalo = new Set(anos);
+        const porAno = municipios.municipiosByAnoCadeia?.length > 0
+          ? municipios.municipiosByAnoCadeia
+          : municipios.municipiosByAno;
+        filteredMunCadeia = porAno.filter(item =>
+          noIntervalo.has(item.ano) && (!cadeiasValidas || cadeiasValidas.has(item.cadeia))
         );
+      }
 
-        // Reagregar por município
+      if (filteredMunCadeia && filteredMunCadeia.length > 0) {
+        // Reagregar por município (id em municipios.dimensoes.municipios)
         const munByCode = {};
         filteredMunCadeia.forEach(item => {
-          if (!munByCode[item.codigo]) {
-            munByCode[item.codigo] = { codigo: item.codigo, nome: item.nome, valor: 0, peso: 0 };
+          if (!munByCode[item.municipio]) {
+            const mun = dimMunicipios[item.municipio];
+            munByCode[item.municipio] = { codigo: mun?.codigo ?? null, nome: mun?.nome ?? null, valor: 0, peso: 0 };
           }
-          munByCode[item.codigo].valor += item.valor || 0;
-          munByCode[item.codigo].peso += item.peso || 0;
+          munByCode[item.municipio].valor += item.valor || 0;
+          munByCode[item.municipio].peso += item.peso || 0;
         });
 
         // Calcular totais e percentuais
@@ -310,18 +683,29 @@ export function useFilteredData(data, filters) {
           municipios: filteredMunicipios
         };
       }
-      // Se não há cadeias válidas, manter os dados originais (sem filtro)
+      // Sem cadeias válidas nem anos carregados, manter os dados originais (sem filtro)
     }
 
+    // Matrizes pré-calculadas dos gráficos (heatmap, cordas, comparativo anual)
+    const graficos = data.graficos
+      ? filtrarGraficos(data.graficos, data, cadeiasEfetivas, anoMin, anoMax)
+      : null;
+
     return {
       timeseries,
+      // Cadeias do filtro com o id em dimensoes.cadeias (null: todas)
+      cadeiasFiltro: idsCadeias
+        ? cadeiasEfetivas.map(nome => ({ nome, id: data.dimensoes.indiceCadeias.get(nome) }))
+        : null,
       byCategoria,
       byPais,
       topProdutos,
       detailed,
+      graficos,
       tipo,
       sankey,
       filteredSankeyLinks,
+      sankeyLayout,
       municipios,
     };
 
@@ -335,44 +719,18 @@ export function useAggregations(data, filters = {}) {
   return useMemo(() => {
     if (!data) return null;
 
-    const { anoMin, anoMax, cadeias, tipoCategoria } = filters;
-    const allCadeias = data.filters?.cadeias || [];
+    const { anoMin, anoMax } = filters;
 
     // Determinar cadeias efetivas baseado no tipoCategoria
-    let cadeiasEfetivas = null;
-
-    // Se tipoCategoria é 'todos' ou não definido, não filtrar por cadeias (a menos que cadeias específicas sejam selecionadas)
-    if (!tipoCategoria || tipoCategoria === 'todos') {
-      // Usa cadeias selecionadas manualmente, ou null para mostrar tudo
-      cadeiasEfetivas = (cadeias && cadeias.length > 0) ? cadeias : null;
-    } else {
-      // tipoCategoria é 'produtos' ou 'insumos'
-      // Filtrar cadeias pelo tipo
-      const cadeiasDoTipo = allCadeias
-        .filter(c => c.tipo === tipoCategoria.slice(0, -1)) // 'produtos' -> 'produto', 'insumos' -> 'insumo'
-        .map(c => c.nome);
-
-      if (cadeias && cadeias.length > 0) {
-        // Se há cadeias selecionadas, manter apenas as do tipo correto
-        cadeiasEfetivas = cadeias.filter(c => cadeiasDoTipo.includes(c));
-        // Se nenhuma sobrou, usar todas do tipo
-        if (cadeiasEfetivas.length === 0) {
-          cadeiasEfetivas = cadeiasDoTipo;
-        }
-      } else {
-        // Se não há cadeias selecionadas, usar todas do tipo
-        cadeiasEfetivas = cadeiasDoTipo;
-      }
-    }
+    const cadeiasEfetivas = resolveCadeias(data.filters?.cadeias, filters);
 
     // Calcular timeseries filtrado
     let timeseries = data.timeseries || [];
 
     // Se há filtro de cadeias, recalcular timeseries a partir de timeseriesByCadeia
     if (cadeiasEfetivas && cadeiasEfetivas.length > 0 && data.timeseriesByCadeia) {
-      const filteredByCadeia = data.timeseriesByCadeia.filter(item =>
-        cadeiasEfetivas.includes(item.cadeia)
-      );
+      const ids = cadeiaIds(data, cadeiasEfetivas);
+      const filteredByCadeia = data.timeseriesByCadeia.filter(item => ids.has(item.cadeia));
 
       const byYear = {};
       filteredByCadeia.forEach(item => {
@@ -0,0 +1,52 @@
+/**
+ * Resolução dos artefatos de dados pelo manifest.json (ver manifesto.py).
+ *
+ * O manifesto mapeia o nome lógico (ex.: "aggregated.json") para a cópia com o
+ * hash do conteúdo no nome ("aggregated.3fa9c1d2e4.json"). Só o manifesto é
+ * revalidado a cada visita; as cópias versionadas podem vir do cache. Sem
+ * manifesto, os nomes fixos são usados. O bloco "deltas" do manifesto traz a
+ * cadeia de versões dos artefatos grandes (ver deltas.js).
+ */
+
+const BASE_URL = import.meta.env.BASE_URL || '/comexstat-parana/';
+
+let manifestPromise = null;
+
+function carregarManifesto() {
+  if (!manifestPromise) {
+    manifestPromise = fetch(`${BASE_URL}data/manifest.json`, { cache: 'no-cache' })
+      .then(res => (res.ok ? res.json() : null))
+      .then(manifest => manifest || {})
+      .catch(() => ({}));
+  }
+  return manifestPromise;
+}
+
+/**
+ * Carrega o manifesto uma única vez por página ({} se indisponível).
+ */
+export async function loadManifest() {
+  return (await carregarManifesto()).arquivos || {};
+}
+
+/**
+ * Cadeia de versões de um artefato: { atual, patches: { versão: arquivo } } ou null.
+ */
+export async function loadDeltas(name) {
+  return (await carregarManifesto()).deltas?.[name] || null;
+}
+
+/**
+ * URL de um artefato pelo nome lógico (relativo a data/).
+ */
+export async function artifactUrl(name) {
+  const arquivos = await loadManifest();
+  return `${BASE_URL}data/${arquivos[name] || name}`;
+}
+
+/**
+ * fetch() de um artefato pelo nome lógico.
+ */
+export async function fetchArtifact(name, options) {
+  return fetch(await artifactUrl(name), options);
+}
@@ -0,0 +1,114 @@
+/**
+ * Atualização incremental dos artefatos grandes pelos deltas do manifesto
+ * (ver deltas.py).
+ *
+ * A última versão baixada de cada artefato com deltas (boot.json, a série
+ * mensal por ano e, sem shards, aggregated.json/detailed.json) fica no
+ * localStorage. Na visita seguinte, se o manifesto tem a cadeia de patches da
+ * versão guardada até a atual, só os patches são baixados e aplicados; caso
+ * contrário, o artefato completo é baixado.
+ */
+import { fetchArtifact, loadDeltas } from './artifacts';
+
+const PREFIXO_CACHE = 'comexstat-parana:';
+
+function lerCache(name) {
+  try {
+    const texto = localStorage.getItem(PREFIXO_CACHE + name);
+    return texto ? JSON.parse(texto) : null;
+  } catch {
+    return null;
+  }
+}
+
+function gravarCache(name, versao, dados) {
+  try {
+    localStorage.setItem(PREFIXO_CACHE + name, JSON.stringify({ versao, dados }));
+  } catch {
+    // Sem espaço ou localStorage indisponível: a próxima visita baixa o completo
+    try {
+      localStorage.removeItem(PREFIXO_CACHE + name);
+    } catch {
+      // ignorar
+    }
+  }
+}
+
+function compararChave(chave) {
+  return (a, b) => (a[chave] < b[chave] ? -1 : a[chave] > b[chave] ? 1 : 0);
+}
+
+/**
+ * Troca os grupos de período afetados de uma tabela (mesma regra de deltas.py).
+ */
+function mesclar(tabela, { chave, remover, registros }) {
+  const afetados = new Set(remover);
+  for (const registro of registros) afetados.add(registro[chave]);
+  return tabela
+    .filter(registro => !afetados.has(registro[chave]))
+    .concat(registros)
+    .sort(compararChave(chave));
+}
+
+/**
+ * Aplica um patch ({ de, para, operacoes }) e retorna os dados resultantes.
+ */
+export function applyDelta(dados, delta) {
+  for (const operacao of delta.operacoes) {
+    const { caminho } = operacao;
+    if (caminho.length === 0) {
+      dados = operacao.valor;
+      continue;
+    }
+    let alvo = dados;
+    for (const chave of caminho.slice(0, -1)) alvo = alvo[chave];
+    const ultima = caminho[caminho.length - 1];
+    alvo[ultima] = 'valor' in operacao ? operacao.valor : mesclar(alvo[ultima], operacao);
+  }
+  return dados;
+}
+
+async function atualizarPorDeltas(cadeia, cache) {
+  let { versao, dados } = cache;
+  const visitadas = new Set();
+  while (versao !== cadeia.atual) {
+    // Uma versão repetida é um ciclo na cadeia: baixar o artefato completo
+    if (visitadas.has(versao)) return null;
+    visitadas.add(versao);
+    const arquivo = cadeia.patches[versao];
+    if (!arquivo) return null;
+    const res = await fetchArtifact(arquivo);
+    if (!res.ok) return null;
+    const delta = await res.json();
+    if (delta.de !== versao) return null;
+    dados = applyDelta(dados, delta);
+    versao = delta.para;
+  }
+  return dados;
+}
+
+/**
+ * Carrega um artefato usando a versão guardada e os deltas quando possível.
+ *
+ * @param {string} name - Nome lógico do artefato (ex.: "aggregated.json", "shards/mensal/2025.json")
+ * @param {Function} decode - Conversão aplicada ao artefato completo
+ * @returns {Promise<Object|null>} dados decodificados (null se indisponível)
+ */
+export async function fetchWithDeltas(name, decode = dados => dados) {
+  const cadeia = await loadDeltas(name);
+  const cache = cadeia ? lerCache(name) : null;
+
+  if (cache) {
+    const dados = await atualizarPorDeltas(cadeia, cache).catch(() => null);
+    if (dados) {
+      if (cache.versao !== cadeia.atual) gravarCache(name, cadeia.atual, dados);
+      return dados;
+    }
+  }
+
+  const res = await fetchArtifact(name);
+  if (!res.ok) return null;
+  const dados = decode(await res.json());
+  if (cadeia) gravarCache(name, cadeia.atual, dados);
+  return dados;
+}
@@ -0,0 +1,69 @@
+/**
+ * Árvore SH/NCM (capítulo -> posição -> subposição -> NCM) carregada por nó.
+ *
+ * Cada nó com filhos tem um shard (shards/hs/<codigo>.json, "raiz" para os
+ * capítulos) com os filhos dos dois fluxos, já ordenados por valor (ver
+ * shards.py). Sem shards, o artefato completo hierarquia_hs.json é baixado
+ * uma vez e agrupado por pai.
+ */
+import { fetchArtifact } from './artifacts';
+import { decodeColunar } from '../hooks/useData';
+
+export const RAIZ_HS = 'raiz';
+
+const nosCarregados = new Map();
+let completoPromise = null;
+
+function decodificar(tabela) {
+  if (!tabela) return [];
+  return tabela._formato === 'colunar' ? decodeColunar(tabela) : tabela;
+}
+
+function carregarCompleto() {
+  if (!completoPromise) {
+    completoPromise = fetchArtifact('hierarquia_hs.json')
+      .then(res => (res.ok ? res.json() : {}))
+      .then(hierarquia => {
+        const porPai = new Map();
+        for (const fluxo of ['exportacoes', 'importacoes']) {
+          for (const { pai, ...no } of decodificar(hierarquia[fluxo])) {
+            const chave = pai || RAIZ_HS;
+            if (!porPai.has(chave)) porPai.set(chave, { exportacoes: [], importacoes: [] });
+            porPai.get(chave)[fluxo].push(no);
+          }
+        }
+        return porPai;
+      });
+  }
+  return completoPromise;
+}
+
+async function carregarNo(codigo) {
+  const res = await fetchArtifact(`shards/hs/${codigo}.json`).catch(() => null);
+  if (res?.ok) {
+    const filhos = await res.json();
+    return {
+      exportacoes: decodificar(filhos.exportacoes),
+      importacoes: decodificar(filhos.importacoes),
+    };
+  }
+  const porPai = await carregarCompleto();
+  return porPai.get(codigo) || { exportacoes: [], importacoes: [] };
+}
+
+/**
+ * Filhos de um nó da árvore (uma requisição por nó e por página).
+ *
+ * @param {string} codigo - Código do nó ("01", "0101", ...) ou RAIZ_HS
+ * @returns {Promise<{exportacoes: Array, importacoes: Array}>}
+ */
+export function loadHsChildren(codigo = RAIZ_HS) {
+  if (!nosCarregados.has(codigo)) {
+    const promessa = carregarNo(codigo).catch(err => {
+      nosCarregados.delete(codigo);
+      throw err;
+    });
+    nosCarregados.set(codigo, promessa);
+  }
+  return nosCarregados.get(codigo);
+}
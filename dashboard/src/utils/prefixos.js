@@ -0,0 +1,159 @@
+/**
+ * Totais de intervalos de meses pelo índice de somas acumuladas (prefixos.json,
+ * ver preparar_prefixos e analise.IndicePrefixos).
+ *
+ * Cada série guarda acumulado[k] = soma dos k primeiros meses a partir de
+ * "inicio"; o total de [de, ate] custa duas leituras, qualquer que seja o
+ * tamanho do intervalo.
+ *
+ * O índice vem fatiado (ver shards.py): shards/prefixos.json traz o total e
+ * as séries por cadeia e por país; as séries cadeia x país de cada cadeia
+ * ficam em um shard próprio, baixado só quando a cadeia é filtrada. Sem
+ * shards, o artefato completo prefixos.json é baixado uma vez.
+ */
+import { fetchArtifact } from './artifacts';
+
+const FLUXOS = ['exportacoes', 'importacoes'];
+
+let indicePromise = null;
+let basePromise = null;
+let completoPromise = null;
+const cadeiasCarregadas = new Map();
+
+async function carregarJson(nome) {
+  const res = await fetchArtifact(nome).catch(() => null);
+  return res?.ok ? res.json() : null;
+}
+
+function carregarIndice() {
+  if (!indicePromise) {
+    indicePromise = carregarJson('shards/index.json').catch(() => null);
+  }
+  return indicePromise;
+}
+
+function carregarCompleto() {
+  if (!completoPromise) {
+    completoPromise = carregarJson('prefixos.json').catch(() => null);
+  }
+  return completoPromise;
+}
+
+/**
+ * Carrega o índice base uma única vez por página (null se indisponível):
+ * inicio, meses, dimensões e, por fluxo, total, porCadeia e porPais.
+ */
+export function loadPrefixos() {
+  if (!basePromise) {
+    basePromise = carregarIndice()
+      .then(async indice => {
+        const caminho = indice?.visoes?.prefixos;
+        const shard = caminho ? await carregarJson(caminho) : null;
+        return shard?.prefixos || carregarCompleto();
+      })
+      .catch(() => null);
+  }
+  return basePromise;
+}
+
+/**
+ * Séries cadeia x país de uma cadeia: { exportacoes: { porCadeiaPais }, importacoes: {...} }.
+ *
+ * @param {string} nome - Nome da cadeia (chave do shard no índice)
+ * @param {number} id - Id da cadeia em dimensoes.cadeias (filtro do artefato completo)
+ */
+export function loadPrefixosCadeia(nome, id) {
+  if (!cadeiasCarregadas.has(nome)) {
+    cadeiasCarregadas.set(nome, carregarIndice()
+      .then(async indice => {
+        const caminho = indice?.porCadeia?.prefixos?.[nome];
+        const shard = caminho ? await carregarJson(caminho) : null;
+        if (shard) return shard.prefixos;
+
+        // Sem shards: séries da cadeia a partir do artefato completo
+        const completo = await carregarCompleto();
+        if (!completo) return null;
+        const porFluxo = {};
+        for (const fluxo of FLUXOS) {
+          const bloco = completo[fluxo]?.porCadeiaPais;
+          if (!bloco) continue;
+          const series = bloco.cadeia.flatMap((cadeia, i) => (cadeia === id ? [i] : []));
+          porFluxo[fluxo] = { porCadeiaPais: selectSeries(bloco, series) };
+        }
+        return porFluxo;
+      })
+      .catch(() => null));
+  }
+  return cadeiasCarregadas.get(nome);
+}
+
+function mesAbsoluto(periodo) {
+  const [ano, mes] = String(periodo).split('-').map(Number);
+  return ano * 12 + (mes || 1) - 1;
+}
+
+/**
+ * Posição de um mês ("AAAA-MM") no eixo do índice.
+ */
+export function monthIndex(prefixos, periodo) {
+  return mesAbsoluto(periodo) - mesAbsoluto(prefixos.inicio);
+}
+
+/**
+ * Mês ("AAAA-MM") de uma posição do eixo do índice.
+ */
+export function monthAt(prefixos, indice) {
+  const mes = mesAbsoluto(prefixos.inicio) + indice;
+  return `${Math.floor(mes / 12)}-${String((mes % 12) + 1).padStart(2, '0')}`;
+}
+
+/**
+ * Total de uma série acumulada no intervalo [de, ate] (meses inclusivos).
+ *
+ * @param {Object} prefixos - Índice base (ver loadPrefixos)
+ * @param {number[]} acumulado - Série (ex.: prefixos.exportacoes.total)
+ * @param {string} de - Primeiro mês ("AAAA-MM")
+ * @param {string} ate - Último mês ("AAAA-MM")
+ * @returns {number}
+ */
+export function rangeTotal(prefixos, acumulado, de, ate) {
+  const ultimo = acumulado.length - 1;
+  const i = Math.min(Math.max(monthIndex(prefixos, de), 0), ultimo);
+  const j = Math.min(Math.max(monthIndex(prefixos, ate) + 1, i), ultimo);
+  return acumulado[j] - acumulado[i];
+}
+
+/**
+ * Totais de todas as séries de um bloco (porCadeia, porPais, porCadeiaPais)
+ * no intervalo, com as chaves de cada série.
+ *
+ * @returns {Array<Object>} ex.: [{ cadeia: 3, pais: 12, valor: 1.2e6 }, ...]
+ */
+export function rangeTotals(prefixos, bloco, de, ate) {
+  const chaves = Object.keys(bloco).filter(chave => chave !== 'acumulado');
+  return bloco.acumulado.map((acumulado, serie) => {
+    const registro = { valor: rangeTotal(prefixos, acumulado, de, ate) };
+    for (const chave of chaves) registro[chave] = bloco[chave][serie];
+    return registro;
+  });
+}
+
+/**
+ * Bloco só com as séries indicadas (posições em bloco.acumulado).
+ */
+export function selectSeries(bloco, series) {
+  return Object.fromEntries(
+    Object.entries(bloco).map(([chave, valores]) => [chave, series.map(i => valores[i])])
+  );
+}
+
+/**
+ * Junta blocos com as mesmas chaves (ex.: porCadeiaPais de várias cadeias).
+ */
+export function mergeBlocks(blocos) {
+  const presentes = blocos.filter(Boolean);
+  if (presentes.length === 0) return null;
+  return Object.fromEntries(
+    Object.keys(presentes[0]).map(chave => [chave, presentes.flatMap(bloco => bloco[chave])])
+  );
+}
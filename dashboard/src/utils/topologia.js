@@ -0,0 +1,79 @@
+/**
+ * Mapas em TopoJSON (ver topologia.py): arcos compartilhados, quantizados e
+ * codificados por diferenças, convertidos aqui em GeoJSON para o Leaflet.
+ *
+ * Cada polígono referencia os arcos pelo índice (~i = arco i ao contrário);
+ * as coordenadas voltam da grade inteira pelo "transform" da topologia.
+ */
+import { fetchArtifact } from './artifacts';
+
+function decodificarArcos({ arcs, transform }) {
+  if (!transform) return arcs;
+  const [kx, ky] = transform.scale;
+  const [dx, dy] = transform.translate;
+  return arcs.map(arco => {
+    let x = 0;
+    let y = 0;
+    return arco.map(([px, py]) => {
+      x += px;
+      y += py;
+      return [x * kx + dx, y * ky + dy];
+    });
+  });
+}
+
+function anel(arcos, referencias) {
+  const pontos = [];
+  referencias.forEach((ref, i) => {
+    const arco = ref >= 0 ? arcos[ref] : arcos[~ref].slice().reverse();
+    // Cada arco começa no último ponto do anterior
+    for (let k = i === 0 ? 0 : 1; k < arco.length; k++) pontos.push(arco[k]);
+  });
+  return pontos;
+}
+
+function geometria(arcos, { type, arcs }) {
+  if (type === 'Polygon') {
+    return { type, coordinates: arcs.map(refs => anel(arcos, refs)) };
+  }
+  if (type === 'MultiPolygon') {
+    return { type, coordinates: arcs.map(poligono => poligono.map(refs => anel(arcos, refs))) };
+  }
+  return null;
+}
+
+/**
+ * FeatureCollection de um objeto da topologia.
+ *
+ * @param {Object} topologia - Conteúdo do .topojson
+ * @param {string} nome - Objeto em topologia.objects (padrão: o primeiro)
+ * @returns {Object} GeoJSON FeatureCollection
+ */
+export function topoFeatures(topologia, nome = Object.keys(topologia.objects)[0]) {
+  const arcos = decodificarArcos(topologia);
+  return {
+    type: 'FeatureCollection',
+    features: topologia.objects[nome].geometries.map(geo => ({
+      type: 'Feature',
+      ...(geo.id !== undefined ? { id: geo.id } : {}),
+      properties: geo.properties || {},
+      geometry: geometria(arcos, geo),
+    })),
+  };
+}
+
+/**
+ * Carrega um mapa publicado como GeoJSON: usa o .topojson quando existe e o
+ * .geojson completo como alternativa.
+ *
+ * @param {string} base - Nome sem extensão (ex.: 'mun_PR')
+ * @returns {Promise<Object>} GeoJSON FeatureCollection
+ */
+export async function loadMapa(base) {
+  const topoRes = await fetchArtifact(`${base}.topojson`).catch(() => null);
+  if (topoRes?.ok) return topoFeatures(await topoRes.json());
+
+  const res = await fetchArtifact(`${base}.geojson`);
+  if (!res.ok) throw new Error(`Erro ao carregar ${base}.geojson`);
+  return res.json();
+}
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Deltas entre versões dos artefatos grandes do dashboard.
+
+Uma atualização mensal do ComexStat muda só os últimos períodos, mas quem já
+tem os artefatos no navegador baixaria tudo de novo. Ao publicar o manifesto
+(manifesto.py), a versão anterior de cada artefato de ARTEFATOS_DELTA (a
+cópia versionada do manifesto anterior) é comparada com a atual, e o patch é
+gravado em deltas/. Além de aggregated.json/detailed.json (carregamento sem
+shards), entram boot.json e a série mensal de cada ano, que são os shards
+que mudam a cada atualização (os demais mudam por inteiro ou não mudam):
+
+    {"de": "f6c84d4def", "para": "a1b2c3d4e5", "operacoes": [
+        {"caminho": ["timeseriesMensal"], "chave": "periodo",
+         "remover": [], "registros": [{"periodo": "2025-06", ...}]},
+        {"caminho": ["metadata", "anoMax"], "valor": 2025}]}
+
+Tabelas ordenadas por período ("periodo" ou "ano") trocam apenas os grupos
+de período que mudaram; o resto é substituído por caminho. O manifesto
+guarda a cadeia de versões:
+
+    "deltas": {"aggregated.json": {"atual": "a1b2c3d4e5",
+                                   "patches": {"f6c84d4def": "deltas/aggregated.f6c84d4def-a1b2c3d4e5.json"}}}
+
+O cliente com a versão N aplica os patches N -> N+1 -> ... até "atual"
+(utils/deltas.js). Cada patch é conferido aqui: aplicá-lo à versão anterior
+tem que reproduzir exatamente a atual. O patch de uma versão é sempre o da
+última publicação a partir dela: se o artefato volta a uma versão antiga
+(A -> B -> A -> D), o patch A -> B é trocado por A -> D.
+"""
+
+import copy
+import json
+from fnmatch import fnmatch
+from pathlib import Path
+
+from serializacao import escrever_json, expandir
+
+# Nomes lógicos (padrões fnmatch) dos artefatos com deltas
+ARTEFATOS_DELTA = ["aggregated.json", "detailed.json", "boot.json", "shards/mensal/*.json"]
+DELTAS_DIR = "deltas"
+
+# Patches mantidos por artefato (versões mais antigas baixam o artefato completo)
+MAX_PATCHES = 12
+
+CHAVES_PERIODO = ("periodo", "ano")
+
+
+def _chave_periodo(tabela):
+    """Chave de período de uma lista de registros ordenada por ela (ou None)."""
+    if not isinstance(tabela, list) or not tabela:
+        return None
+    if not all(isinstance(r, dict) for r in tabela):
+        return None
+    for chave in CHAVES_PERIODO:
+        if all(chave in r for r in tabela):
+            valores = [r[chave] for r in tabela]
+            return chave if valores == sorted(valores) else None
+    return None
+
+
+def _agrupar(tabela, chave):
+    grupos = {}
+    for registro in tabela:
+        grupos.setdefault(registro[chave], []).append(registro)
+    return grupos
+
+
+def _mesclar(tabela, operacao):
+    """Troca os grupos de período afetados e reordena (ordenação estável)."""
+    chave = operacao["chave"]
+    afetados = set(operacao["remover"]) | {r[chave] for r in operacao["registros"]}
+    resultado = [r for r in tabela if r[chave] not in afetados] + operacao["registros"]
+    return sorted(resultado, key=lambda r: r[chave])
+
+
+def aplicar_delta(dados, delta):
+    """Aplica um patch (in-place quando possível) e retorna os dados resultantes."""
+    for operacao in delta["operacoes"]:
+        caminho = operacao["caminho"]
+        if not caminho:
+            dados = operacao["valor"]
+            continue
+        alvo = dados
+        for chave in caminho[:-1]:
+            alvo = alvo[chave]
+        if "valor" in operacao:
+            alvo[caminho[-1]] = operacao["valor"]
+        else:
+            alvo[caminho[-1]] = _mesclar(alvo[caminho[-1]], operacao)
+    return dados
+
+
+def calcular_operacoes(anterior, atual, caminho=()):
+    """Operações que transformam anterior em atual."""
+    if anterior == atual:
+        return []
+
+    if isinstance(anterior, dict) and isinstance(atual, dict) and anterior.keys() == atual.keys():
+        operacoes = []
+        for chave in atual:
+            operacoes += calcular_operacoes(anterior[chave], atual[chave], caminho + (chave,))
+        return operacoes
+
+    chave = _chave_periodo(atual)
+    if caminho and chave is not None and _chave_periodo(anterior) == chave:
+        grupos_anterior = _agrupar(anterior, chave)
+        grupos_atual = _agrupar(atual, chave)
+        afetados = {
+            p for p in grupos_anterior.keys() | grupos_atual.keys()
+            if grupos_anterior.get(p) != grupos_atual.get(p)
+        }
+        operacao = {
+            "caminho": list(caminho),
+            "chave": chave,
+            "remover": sorted(p for p in afetados if p not in grupos_atual),
+            "registros": [r for r in atual if r[chave] in afetados],
+        }
+        if _mesclar(anterior, operacao) == atual:
+            return [operacao]
+
+    return [{"caminho": list(caminho), "valor": atual}]
+
+
+def _carregar(caminho):
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return expandir(json.load(f))
+
+
+def _hash_versao(nome_versionado):
+    """Hash de uma cópia versionada ("aggregated.3fa9c1d2e4.json" -> "3fa9c1d2e4")."""
+    return Path(nome_versionado).suffixes[-2].lstrip('.')
+
+
+def _remover(caminho):
+    for arquivo in (caminho, Path(f"{caminho}.gz"), Path(f"{caminho}.br")):
+        if arquivo.exists():
+            arquivo.unlink()
+
+
+def publicar_deltas(output_dir, manifesto_anterior, arquivos):
+    """
+    Grava os patches da versão anterior para a atual e atualiza a cadeia.
+
+    Args:
+        output_dir: Diretório dos artefatos do dashboard
+        manifesto_anterior: manifest.json anterior ({} se não havia)
+        arquivos: {nome lógico: nome versionado} do manifesto novo
+
+    Returns:
+        dict: bloco "deltas" do manifesto
+    """
+    output_dir = Path(output_dir)
+    arquivos_anteriores = manifesto_anterior.get("arquivos", {})
+    cadeias_anteriores = manifesto_anterior.get("deltas", {})
+    deltas = {}
+
+    for nome in arquivos:
+        if not any(fnmatch(nome, padrao) for padrao in ARTEFATOS_DELTA):
+            continue
+        atual = _hash_versao(arquivos[nome])
+        patches = dict(cadeias_anteriores.get(nome, {}).get("patches", {}))
+
+        versao_anterior = arquivos_anteriores.get(nome)
+        caminho_anterior = output_dir / versao_anterior if versao_anterior else None
+        de = _hash_versao(versao_anterior) if versao_anterior else None
+
+        # Um patch antigo a partir de "de" leva a outra versão (o artefato
+        # voltou a ela): é trocado pelo desta publicação
+        if de and de != atual and de in patches:
+            _remover(output_dir / patches.pop(de))
+
+        if de and de != atual and caminho_anterior.exists():
+            dados_anteriores = _carregar(caminho_anterior)
+            dados_atuais = _carregar(output_dir / arquivos[nome])
+            delta = {
+                "de": de,
+                "para": atual,
+                "operacoes": calcular_operacoes(dados_anteriores, dados_atuais),
+            }
+
+            # Conferir o patch e publicar só se for menor que o artefato completo
+            reconstruido = aplicar_delta(copy.deepcopy(dados_anteriores), delta)
+            relativo = f"{DELTAS_DIR}/{Path(nome).with_suffix('').as_posix()}.{de}-{atual}.json"
+            if reconstruido == dados_atuais:
+                tamanho = escrever_json(output_dir / relativo, delta, comprimir=True)
+                if tamanho < (output_dir / arquivos[nome]).stat().st_size:
+                    patches[de] = relativo
+                    print(f"  Delta {nome}: {de} -> {atual} ({tamanho / 1024:.1f} KB, "
+                          f"{len(delta['operacoes'])} operacoes)")
+                else:
+                    _remover(output_dir / relativo)
+
+        # Manter só os patches mais recentes
+        antigos = list(patches)[:-MAX_PATCHES] if len(patches) > MAX_PATCHES else []
+        for de_antigo in antigos:
+            _remover(output_dir / patches.pop(de_antigo))
+
+        deltas[nome] = {"atual": atual, "patches": patches}
+
+    return deltas
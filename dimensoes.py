@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Dimensões compartilhadas dos artefatos do dashboard.
+
+As tabelas grandes referenciam cadeias, países, capítulos e municípios por
+ids inteiros, e os nomes são gravados uma única vez no bloco "dimensoes":
+
+    aggregated.json        "dimensoes": {"cadeias": [{"nome", "cor", "tipo"}],
+                                         "paises": [{"codigo", "nome"}],
+                                         "capitulos": [{"codigo", "nome"}]}
+    municipios_data.json   "dimensoes": {"municipios": [{"codigo", "nome"}]}
+
+    byPaisByCadeia:  {"pais": 12, "cadeia": 0, "valor": ..., "peso": ...}
+
+Os ids são:
+    cadeia    posição em ncm_cadeias_map.CADEIAS (a mesma em todos os artefatos
+              e execuções; useData.js resolve pelo boot/aggregated)
+    capitulo  o próprio código do capítulo NCM
+    pais      posição em dimensoes.paises do artefato (ordenada por nome)
+    municipio posição em dimensoes.municipios do artefato (ordenada por nome)
+
+-1 indica valor ausente ou fora da dimensão.
+"""
+
+import numpy as np
+import pandas as pd
+
+from ncm_cadeias_map import CADEIAS, CADEIA_CORES, TIPO_CADEIA
+
+# Nomes das cadeias na ordem dos ids
+NOMES_CADEIAS = list(CADEIAS.values())
+
+
+def dimensao_cadeias():
+    """Dimensão de cadeias (todas as cadeias das regras, na ordem dos ids)."""
+    return [
+        {
+            "nome": nome,
+            "cor": CADEIA_CORES.get(nome, "#64748b"),
+            "tipo": TIPO_CADEIA.get(nome, "produto"),  # produto ou insumo
+        }
+        for nome in NOMES_CADEIAS
+    ]
+
+
+def ids_cadeias(nomes):
+    """Ids das cadeias a partir dos nomes (-1 para nomes fora das regras)."""
+    return pd.Index(NOMES_CADEIAS).get_indexer(pd.Series(nomes, dtype=object)).astype(np.int32)
+
+
+def dimensao(*dfs, codigo, nome):
+    """
+    Dimensão (codigo, nome) ordenada por nome a partir de uma ou mais tabelas.
+
+    Args:
+        dfs: DataFrames com as colunas codigo e nome
+        codigo: Coluna com o código
+        nome: Coluna com o nome
+
+    Returns:
+        DataFrame com colunas codigo e nome, uma linha por código
+    """
+    pares = pd.concat([df[[codigo, nome]] for df in dfs], ignore_index=True)
+    pares = pares.dropna().drop_duplicates(codigo)
+    pares = pares.sort_values([nome, codigo], kind='stable').reset_index(drop=True)
+    return pares.rename(columns={codigo: 'codigo', nome: 'nome'})
+
+
+def ids(codigos, dim):
+    """Posição de cada código em uma dimensão de dimensao() (-1 se ausente)."""
+    return pd.Index(dim['codigo']).get_indexer(pd.Series(codigos)).astype(np.int32)
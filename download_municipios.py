@@ -7,10 +7,13 @@ import os
 import sys
 import io
 import requests
+import numpy as np
 import pandas as pd
 from pathlib import Path
 import urllib3
 
+import raw_cache
+
 # Desabilitar avisos de SSL
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -32,13 +35,14 @@ POSICAO_DEFENSIVOS = "3808"  # Defensivos agrícolas (cap. 38)
 
 # Importar mapeamento de cadeia
 try:
-    from ncm_cadeias_map import classificar_cadeia_sh4, CADEIAS
-    def get_cadeia_from_sh4(sh4):
-        return classificar_cadeia_sh4(sh4)
+    from ncm_cadeias_map import classificar_cadeia_sh4_array, CADEIAS
+    def get_cadeias_from_sh4(sh4_codes):
+        return classificar_cadeia_sh4_array(sh4_codes)
 except ImportError:
     CADEIAS = {}
-    def get_cadeia_from_sh4(sh4):
-        return "outros", "Outros"
+    def get_cadeias_from_sh4(sh4_codes):
+        n = len(sh4_codes)
+        return np.full(n, "outros", dtype=object), np.full(n, "Outros", dtype=object)
 
 # Colunas dos arquivos de exportação por município
 COLUNAS_EXP_MUN = [
@@ -155,43 +159,40 @@ def process_municipal_data():
         except Exception as e:
             print(f"  Erro ao carregar municípios: {e}")
 
-    # Processar exportações
+    # Processar exportações (lidas do cache colunar, já filtradas na leitura)
+    csvs = {ano: RAW_DIR / f"EXP_{ano}_MUN.csv" for ano in range(ANO_INICIO, ANO_FIM + 1)}
+    anos_cache = raw_cache.garantir_cache("exp_mun", csvs)
+
+    # Filtrar: Paraná + caps agricultura + cap 31 + posição 3808
+    filtro_agro = raw_cache.filtro_capitulos(
+        CAPITULOS_AGRICULTURA + CAPITULOS_INSUMOS, [POSICAO_DEFENSIVOS]
+    )
+
     all_exp = []
-    for ano in range(ANO_INICIO, ANO_FIM + 1):
-        filepath = RAW_DIR / f"EXP_{ano}_MUN.csv"
-        if filepath.exists():
-            print(f"  Lendo {filepath}...")
-            df = pd.read_csv(filepath, sep=';', encoding='latin-1')
-            # Filtrar Paraná
-            df = df[df['SG_UF_MUN'] == UF_PARANA]
-            # Filtrar agricultura (capítulos 01-24) e insumos (cap 31 + posição 3808)
-            df['SH4_STR'] = df['SH4'].astype(str).str.zfill(4)
-            df['CAPITULO'] = df['SH4_STR'].str[:2].astype(int)
-
-            # Filtrar: caps agricultura + cap 31 + posição 3808
-            mask_agri = df['CAPITULO'].isin(CAPITULOS_AGRICULTURA)
-            mask_fertilizantes = df['CAPITULO'].isin(CAPITULOS_INSUMOS)
-            mask_defensivos = df['SH4_STR'] == POSICAO_DEFENSIVOS
-            df = df[mask_agri | mask_fertilizantes | mask_defensivos]
-
-            # Adicionar cadeia baseada no SH4
-            df['CADEIA'] = df['SH4_STR'].apply(lambda x: get_cadeia_from_sh4(x)[1])
-
-            all_exp.append(df)
-            print(f"    {len(df)} registros agrícolas/insumos do PR")
+    for ano in anos_cache:
+        print(f"  Lendo {ano} (cache)...")
+        df = raw_cache.ler_cache("exp_mun", anos=[ano], ufs=[UF_PARANA], filtro=filtro_agro)
+        df['SH4_STR'] = df['SH4'].astype(str).str.zfill(4)
+
+        # Adicionar cadeia baseada no SH4
+        df['CADEIA'] = np.asarray(get_cadeias_from_sh4(df['SH4_STR'])[1])
+
+        all_exp.append(df)
+        print(f"    {len(df)} registros agrícolas/insumos do PR")
 
     if all_exp:
         exp_df = pd.concat(all_exp, ignore_index=True)
         print(f"\n  Total exportações por município: {len(exp_df)} registros")
 
-        # Agregar por município -> país (totais)
-        flow_exp = exp_df.groupby(['CO_MUN', 'CO_PAIS']).agg({
+        # Agregar por ano, município -> país (totais; o ano permite o Sankey e
+        # o mapa por ano, ver sankey.py)
+        flow_exp = exp_df.groupby(['CO_ANO', 'CO_MUN', 'CO_PAIS']).agg({
             'VL_FOB': 'sum',
             'KG_LIQUIDO': 'sum'
         }).reset_index()
 
-        # Agregar por município -> país -> cadeia (para filtros)
-        flow_exp_cadeia = exp_df.groupby(['CO_MUN', 'CO_PAIS', 'CADEIA']).agg({
+        # Agregar por ano, município -> país -> cadeia (para filtros)
+        flow_exp_cadeia = exp_df.groupby(['CO_ANO', 'CO_MUN', 'CO_PAIS', 'CADEIA']).agg({
             'VL_FOB': 'sum',
             'KG_LIQUIDO': 'sum'
         }).reset_index()
@@ -269,55 +270,15 @@ def process_municipal_data():
     return None, None, None
 
 
-def create_sankey_json(sankey_data, flow_exp):
-    """Cria JSON para o gráfico Sankey"""
-    import json
-    import numpy as np
-
-    class NumpyEncoder(json.JSONEncoder):
-        def default(self, obj):
-            if isinstance(obj, (np.integer, np.int64, np.int32)):
-                return int(obj)
-            if isinstance(obj, (np.floating, np.float64, np.float32)):
-                return float(obj)
-            if isinstance(obj, np.ndarray):
-                return obj.tolist()
-            return super().default(obj)
+def create_sankey_json(flow_exp):
+    """Cria JSON para o gráfico Sankey (top 15 municípios -> top 15 países, ver sankey.py)"""
+    from sankey import construir_sankey, salvar_sankey
 
-    if sankey_data is None or len(sankey_data) == 0:
+    if flow_exp is None or len(flow_exp) == 0:
         print("  Sem dados para Sankey")
         return
 
-    # Criar nodes (municípios + países)
-    municipios = sankey_data['NO_MUN'].unique().tolist()
-    paises = sankey_data['NO_PAIS'].unique().tolist()
-
-    nodes = [{"id": f"mun_{m}", "name": m} for m in municipios]
-    nodes += [{"id": f"pais_{p}", "name": p} for p in paises]
-
-    # Criar links
-    links = []
-    for _, row in sankey_data.iterrows():
-        links.append({
-            "source": f"mun_{row['NO_MUN']}",
-            "target": f"pais_{row['NO_PAIS']}",
-            "value": float(row['VL_FOB'])
-        })
-
-    # Ordenar links por valor
-    links = sorted(links, key=lambda x: x['value'], reverse=True)[:50]  # Top 50 fluxos
-
-    sankey_json = {
-        "nodes": nodes,
-        "links": links
-    }
-
-    output_path = Path("dashboard/public/data/sankey_data.json")
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(sankey_json, f, cls=NumpyEncoder, ensure_ascii=False, indent=2)
-
-    print(f"\n  Salvo: {output_path}")
-    print(f"  {len(nodes)} nodes, {len(links)} links")
+    salvar_sankey(construir_sankey(flow_exp, top_municipios=15, top_paises=15, top_links=50))
 
 
 if __name__ == "__main__":
@@ -327,6 +288,6 @@ if __name__ == "__main__":
     sankey_data, flow_exp, flow_exp_cadeia = process_municipal_data()
 
     if sankey_data is not None:
-        create_sankey_json(sankey_data, flow_exp)
+        create_sankey_json(flow_exp_cadeia)
 
     print("\n=== Concluído ===")
@@ -19,6 +19,8 @@ import io
 import time
 import urllib3
 
+import raw_cache
+
 # Desabilitar avisos de SSL para sites governamentais com certificados problemáticos
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -32,6 +34,7 @@ BASE_URL = "https://balanca.economia.gov.br/balanca/bd/comexstat-bd/mun"
 ANOS = [2020, 2021, 2022, 2023, 2024, 2025]
 OUTPUT_DIR = Path("data/raw")
 CAPITULOS_AGRO = list(range(1, 25))  # Capítulos 01-24 são agrícolas
+UFS = ["PR"]  # Estados mantidos nos parquets intermediários
 
 def download_file(url, output_path, max_retries=3):
     """Download de arquivo com retry."""
@@ -110,41 +113,34 @@ def download_auxiliary_tables():
     if not mun_path.exists():
         download_file(mun_url, mun_path)
 
-def load_and_filter_agro(filepath, tipo='exp'):
+def load_and_filter_agro(filepath, ano, tipo='exp'):
     """
-    Carrega arquivo CSV e filtra apenas capítulos agrícolas.
+    Carrega um ano do arquivo MUN filtrando UF e capítulos agrícolas.
 
-    O SH4 permite identificar o capítulo pelos 2 primeiros dígitos.
+    O CSV é convertido uma única vez para o cache colunar (raw_cache);
+    os filtros de UF (partição) e capítulo (row group) são aplicados durante
+    a leitura em streaming, então só as linhas do Paraná chegam à memória.
     """
     print(f"\nCarregando {filepath}...")
 
     # Colunas esperadas nos arquivos MUN
     # EXP: CO_ANO;CO_MES;CO_MUN;SH4;CO_PAIS;VL_FOB;KG_LIQUIDO
     # IMP: CO_ANO;CO_MES;CO_MUN;SH4;CO_PAIS;VL_FOB;VL_FRETE;VL_SEGURO;KG_LIQUIDO
+    tipo_cache = f"{tipo}_mun_unificado"
 
     try:
-        df = pd.read_csv(filepath, sep=';', encoding='latin-1', dtype={
-            'CO_ANO': int,
-            'CO_MES': int,
-            'CO_MUN': int,
-            'SH4': str,
-            'CO_PAIS': int,
-            'VL_FOB': float,
-            'KG_LIQUIDO': float
-        })
+        raw_cache.garantir_cache(tipo_cache, {ano: filepath})
+        df_agro = raw_cache.ler_cache(
+            tipo_cache,
+            anos=[ano],
+            ufs=UFS,
+            filtro=raw_cache.filtro_capitulos(CAPITULOS_AGRO),
+        )
     except Exception as e:
         print(f"  Erro ao carregar: {e}")
         return None
 
-    print(f"  Registros totais: {len(df):,}")
-
-    # Extrair capítulo do SH4 (2 primeiros dígitos)
-    df['SH4'] = df['SH4'].astype(str).str.zfill(4)
-    df['CAPITULO'] = df['SH4'].str[:2].astype(int)
-
-    # Filtrar apenas capítulos agrícolas (01-24)
-    df_agro = df[df['CAPITULO'].isin(CAPITULOS_AGRO)].copy()
-    print(f"  Registros agrícolas: {len(df_agro):,}")
+    print(f"  Registros agrícolas ({', '.join(UFS)}): {len(df_agro):,}")
 
     return df_agro
 
@@ -157,7 +153,7 @@ def combine_years():
     for ano in ANOS:
         filepath = OUTPUT_DIR / f"exp_mun_{ano}.csv"
         if filepath.exists():
-            df = load_and_filter_agro(filepath, 'exp')
+            df = load_and_filter_agro(filepath, ano, 'exp')
             if df is not None:
                 exp_dfs.append(df)
 
@@ -176,7 +172,7 @@ def combine_years():
     for ano in ANOS:
         filepath = OUTPUT_DIR / f"imp_mun_{ano}.csv"
         if filepath.exists():
-            df = load_and_filter_agro(filepath, 'imp')
+            df = load_and_filter_agro(filepath, ano, 'imp')
             if df is not None:
                 imp_dfs.append(df)
 
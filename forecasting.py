@@ -8,15 +8,16 @@ Utiliza ExponentialSmoothing do statsmodels (mais leve que Prophet).
 
 import pandas as pd
 import numpy as np
-import json
 from pathlib import Path
 from datetime import datetime
 import sys
 import io
 import warnings
 
+from serializacao import escrever_json
+
 # Configurar encoding UTF-8 para Windows
-if sys.platform == 'win32':
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
@@ -35,17 +36,6 @@ INPUT_DIR = Path("data/processed")
 OUTPUT_PATH = Path("dashboard/public/data/forecasts.json")
 
 
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if pd.isna(obj):
-            return None
-        return super().default(obj)
 
 
 def load_timeseries():
@@ -291,6 +281,13 @@ def generate_forecasts(df_exp, df_imp, n_periods=2):
     }
 
 
+def salvar_previsoes(forecasts, caminho=OUTPUT_PATH, comprimir=True):
+    """Salva as previsões (padrão: OUTPUT_PATH, lido pelo dashboard)."""
+    escrever_json(caminho, forecasts, comprimir=comprimir)
+
+    print(f"\nPrevisões salvas em: {caminho}")
+
+
 def main():
     """Função principal."""
     print("=" * 60)
@@ -316,11 +313,7 @@ def main():
         return
 
     # 3. Salvar
-    OUTPUT_PATH.parent.mkdir(parents=True, exist_ok=True)
-    with open(OUTPUT_PATH, 'w', encoding='utf-8') as f:
-        json.dump(forecasts, f, cls=NumpyEncoder, ensure_ascii=False, indent=2)
-
-    print(f"\nPrevisões salvas em: {OUTPUT_PATH}")
+    salvar_previsoes(forecasts)
 
     print("\n" + "=" * 60)
     print("PREVISÃO CONCLUÍDA")
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Nomes versionados por conteúdo para os artefatos do dashboard.
+
+Cada artefato publicado em dashboard/public/data ganha uma cópia com o hash
+do conteúdo no nome (aggregated.json -> aggregated.3fa9c1d2e4.json), com os
+mesmos irmãos .gz/.br, e manifest.json mapeia o nome lógico para a cópia:
+
+    {"arquivos": {"aggregated.json": "aggregated.3fa9c1d2e4.json",
+                  "shards/paises.json": "shards/paises.8b0e5a7c21.json", ...}}
+
+O dashboard resolve os arquivos pelo manifesto, então as cópias versionadas
+podem ser servidas com cache de longa duração (imutáveis) e apenas
+manifest.json precisa ser revalidado. Os nomes fixos continuam publicados,
+para compatibilidade. Cópias que saem do manifesto são removidas.
+
+Para os artefatos grandes, o manifesto também traz a cadeia de versões e os
+patches da versão anterior para a atual (bloco "deltas", ver deltas.py).
+
+O repositório versiona só os nomes fixos, manifest.json e deltas/: as cópias
+versionadas e os irmãos .gz/.br são derivados e ficam no .gitignore (senão
+cada atualização acumularia uma segunda cópia de cada artefato no git).
+--restaurar os recria a partir dos nomes fixos, conferindo o hash de cada um
+contra o manifesto. O workflow roda isso antes do build_artifacts.py (os
+deltas precisam da cópia da versão anterior) e antes do build do dashboard.
+
+Uso:
+    python manifesto.py               # Versiona os artefatos e grava o manifesto
+    python manifesto.py --restaurar   # Recria cópias versionadas e .gz/.br
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import shutil
+import sys
+import io
+from pathlib import Path
+
+# Fix encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+OUTPUT_DIR = Path("dashboard/public/data")
+MANIFESTO = "manifest.json"
+
+# Caracteres hexadecimais do hash no nome do arquivo
+TAMANHO_HASH = 10
+VERSIONADO = re.compile(rf'\.[0-9a-f]{{{TAMANHO_HASH}}}\.[^.]+$')
+
+
+def versionado(nome):
+    """Indica se o nome já é uma cópia versionada (aggregated.<hash>.json)."""
+    return VERSIONADO.search(str(nome)) is not None
+
+
+def hash_conteudo(caminho):
+    """Hash curto do conteúdo de um arquivo."""
+    h = hashlib.sha256()
+    with open(caminho, 'rb') as f:
+        for bloco in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(bloco)
+    return h.hexdigest()[:TAMANHO_HASH]
+
+
+def _artefatos(output_dir):
+    """Artefatos com nome fixo (relativos a output_dir), incluindo subpastas."""
+    from compressao import EXTENSOES_ARTEFATOS
+    from deltas import DELTAS_DIR
+
+    output_dir = Path(output_dir)
+    return sorted(
+        caminho.relative_to(output_dir)
+        for caminho in output_dir.rglob('*')
+        if caminho.is_file()
+        and caminho.suffix in EXTENSOES_ARTEFATOS
+        and caminho.name != MANIFESTO
+        and caminho.relative_to(output_dir).parts[0] != DELTAS_DIR
+        and not versionado(caminho.name)
+    )
+
+
+def _carregar_manifesto(output_dir):
+    caminho = Path(output_dir) / MANIFESTO
+    if not caminho.exists():
+        return {}
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def _nome_versionado(relativo, origem):
+    """Nome da cópia versionada de um artefato (aggregated.json -> aggregated.<hash>.json)."""
+    relativo = Path(relativo)
+    return relativo.with_name(f"{relativo.stem}.{hash_conteudo(origem)}{relativo.suffix}")
+
+
+def _copiar(origem, destino):
+    """
+    Copia o artefato junto com os irmãos .gz/.br já gravados por quem o gerou.
+
+    Só comprime a cópia quando falta algum irmão na origem (ex.: artefato
+    gravado sem compressão), evitando refazer o brotli 11 de cada cópia.
+    """
+    from compressao import brotli, comprimir
+
+    shutil.copyfile(origem, destino)
+    irmaos = ('.gz', '.br') if brotli is not None else ('.gz',)
+    if not all(Path(f"{origem}{ext}").exists() for ext in irmaos):
+        comprimir(destino)
+        return
+    for ext in irmaos:
+        shutil.copyfile(f"{origem}{ext}", f"{destino}{ext}")
+
+
+def publicar_manifesto(output_dir=OUTPUT_DIR):
+    """
+    Grava as cópias versionadas e o manifest.json.
+
+    Cópias já existentes (mesmo conteúdo) não são regravadas. Os deltas são
+    calculados antes de remover as cópias do manifesto anterior.
+
+    Args:
+        output_dir: Diretório dos artefatos do dashboard
+
+    Returns:
+        dict: {nome lógico: nome versionado}
+    """
+    from deltas import publicar_deltas
+    from serializacao import escrever_json
+
+    output_dir = Path(output_dir)
+    anterior = _carregar_manifesto(output_dir)
+    arquivos = {}
+    novos = 0
+    for relativo in _artefatos(output_dir):
+        origem = output_dir / relativo
+        destino = _nome_versionado(relativo, origem)
+        if not (output_dir / destino).exists():
+            _copiar(origem, output_dir / destino)
+            novos += 1
+        arquivos[relativo.as_posix()] = destino.as_posix()
+
+    deltas = publicar_deltas(output_dir, anterior, arquivos)
+
+    # Remover cópias que saíram do manifesto (e seus irmãos)
+    atuais = set(arquivos.values())
+    removidos = 0
+    for caminho in list(output_dir.rglob('*')):
+        base = caminho.name
+        for ext in ('.gz', '.br'):
+            base = base.removesuffix(ext)
+        if not caminho.is_file() or not versionado(base):
+            continue
+        if caminho.with_name(base).relative_to(output_dir).as_posix() not in atuais:
+            caminho.unlink()
+            removidos += 1
+
+    escrever_json(output_dir / MANIFESTO, {"arquivos": arquivos, "deltas": deltas}, comprimir=True)
+    print(f"  {MANIFESTO}: {len(arquivos)} artefatos ({novos} novos, {removidos} arquivos antigos removidos)")
+    return arquivos
+
+
+def restaurar_copias(output_dir=OUTPUT_DIR):
+    """
+    Recria os irmãos .gz/.br e as cópias versionadas do manifest.json atual.
+
+    Cada cópia só é recriada se o artefato de nome fixo ainda tem o conteúdo
+    registrado no manifesto; os demais são devolvidos como divergentes.
+
+    Args:
+        output_dir: Diretório dos artefatos do dashboard
+
+    Returns:
+        list: Nomes lógicos cujo conteúdo não corresponde ao manifesto
+    """
+    from compressao import EXTENSOES_ARTEFATOS, comprimir
+
+    output_dir = Path(output_dir)
+    for caminho in sorted(output_dir.rglob('*')):
+        if caminho.is_file() and caminho.suffix in EXTENSOES_ARTEFATOS and not versionado(caminho.name):
+            comprimir(caminho)
+
+    arquivos = _carregar_manifesto(output_dir).get("arquivos", {})
+    divergentes = []
+    restauradas = 0
+    for relativo, versao in arquivos.items():
+        origem = output_dir / relativo
+        if not origem.exists() or _nome_versionado(relativo, origem).as_posix() != versao:
+            divergentes.append(relativo)
+            continue
+        if not (output_dir / versao).exists():
+            _copiar(origem, output_dir / versao)
+            restauradas += 1
+
+    print(f"  {MANIFESTO}: {restauradas} cópias versionadas restauradas, "
+          f"{len(divergentes)} divergentes")
+    for relativo in divergentes:
+        print(f"    AVISO: {relativo} não corresponde a {arquivos[relativo]}")
+    return divergentes
+
+
+def main():
+    """Versiona os artefatos atuais e grava o manifesto (ou restaura as cópias)."""
+    parser = argparse.ArgumentParser(description="Cópias versionadas e manifest.json do dashboard")
+    parser.add_argument('--restaurar', action='store_true',
+                        help='Recria as cópias versionadas e os .gz/.br do manifesto atual')
+    args = parser.parse_args()
+
+    if args.restaurar:
+        sys.exit(1 if restaurar_copias() else 0)
+    publicar_manifesto()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,10 @@ import json
 from pathlib import Path
 from collections import defaultdict
 
+from compressao import comprimir
+from serializacao import gravar_se_mudou
+from topologia import MAPAS, imprimir_relatorio, salvar_topojson
+
 def merge_countries():
     input_file = Path("dashboard/public/data/countries.geojson")
     output_file = Path("dashboard/public/data/countries_merged.geojson")
@@ -82,12 +86,22 @@ def merge_countries():
     }
 
     # Write output
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f)
+    gravar_se_mudou(output_file, json.dumps(output_data).encode('utf-8'))
+    _, size_gz, size_br = comprimir(output_file)
 
     # Get file size
     size_mb = output_file.stat().st_size / (1024 * 1024)
     print(f"Output file: {output_file} ({size_mb:.2f} MB)")
+    print(f"  gzip: {size_gz / (1024 * 1024):.2f} MB")
+    if size_br is not None:
+        print(f"  brotli: {size_br / (1024 * 1024):.2f} MB")
+
+    # TopoJSON (arcos compartilhados e quantizados, ver topologia.py)
+    nome, propriedades = MAPAS[output_file.name]
+    topo_file = output_file.with_suffix('.topojson')
+    imprimir_relatorio({
+        output_file.name: (comprimir(output_file), salvar_topojson(output_data, topo_file, nome, propriedades))
+    })
 
     # List some countries
     print("\nSample countries:")
@@ -3,6 +3,11 @@
 Mapeamento de produtos NCM para Cadeias produtivas (estilo VBP)
 """
 
+import re
+
+import numpy as np
+import pandas as pd
+
 # Cadeias principais (baseadas no VBP)
 CADEIAS = {
     "sojicultura": "Sojicultura",
@@ -33,6 +38,42 @@ CADEIAS = {
     "outros_insumos": "Outros Insumos",
 }
 
+# Mapeamento de cadeias para tipo (produto agrícola vs insumo)
+TIPO_CADEIA = {
+    # Produtos agrícolas (outputs - exportação)
+    "Sojicultura": "produto",
+    "Avicultura": "produto",
+    "Bovinocultura": "produto",
+    "Suinocultura": "produto",
+    "Cafeicultura": "produto",
+    "Cerealicultura": "produto",
+    "Canavicultura": "produto",
+    "Fruticultura": "produto",
+    "Olericultura": "produto",
+    "Aquicultura": "produto",
+    "Florestal": "produto",
+    "Floricultura": "produto",
+    "Apicultura": "produto",
+    "Laticínios": "produto",
+    "Oleaginosas": "produto",
+    "Agroind. Carnes": "produto",
+    "Agroind. Grãos": "produto",
+    "Bebidas": "produto",
+    "Tabaco": "produto",
+    "Outros": "produto",
+    # Insumos agrícolas (inputs - importação)
+    "Fertilizantes": "insumo",
+    "Herbicidas": "insumo",
+    "Fungicidas": "insumo",
+    "Inseticidas": "insumo",
+    "Outros Insumos": "insumo",
+}
+
+# Ordem fixa das cadeias usada nos arrays categóricos
+_CADEIA_KEYS = list(CADEIAS.keys())
+_CADEIA_NOMES = [CADEIAS[k] for k in _CADEIA_KEYS]
+
+
 # Mapeamento por capítulo NCM (default)
 CAPITULO_TO_CADEIA = {
     1: "outros",        # Animais vivos - será refinado por descrição
@@ -354,6 +395,52 @@ NCM_ESPECIFICO = {
 }
 
 
+def _compilar_keywords():
+    """
+    Compila KEYWORDS_CADEIA em uma única regex de alternância.
+
+    As alternativas seguem a ordem de prioridade das cadeias e ficam dentro
+    de um lookahead, então a busca encontra todas as palavras-chave em
+    qualquer posição (inclusive sobrepostas, como "mel" em "melão").
+
+    Returns:
+        tuple: (regex, lista com a ordem da cadeia de cada palavra-chave, chaves das cadeias)
+    """
+    cadeias = list(KEYWORDS_CADEIA.keys())
+    ordem_keyword = {}
+    for ordem, cadeia_key in enumerate(cadeias):
+        for keyword in KEYWORDS_CADEIA[cadeia_key]:
+            ordem_keyword.setdefault(keyword.lower(), ordem)
+
+    alternativas = sorted(ordem_keyword, key=lambda k: ordem_keyword[k])
+    regex = re.compile("(?=(" + "|".join(re.escape(k) for k in alternativas) + "))")
+    return regex, ordem_keyword, cadeias
+
+
+_KEYWORDS_REGEX, _KEYWORD_ORDEM, _KEYWORD_CADEIAS = _compilar_keywords()
+
+
+def buscar_cadeia_keyword(descricao_lower):
+    """
+    Retorna a cadeia da primeira palavra-chave (na ordem de KEYWORDS_CADEIA)
+    presente na descrição, ou None.
+
+    Equivale ao laço cadeia -> palavra-chave com busca de substring, mas
+    percorre a descrição uma única vez.
+
+    Args:
+        descricao_lower: Descrição do produto em minúsculas
+    """
+    melhor = None
+    for match in _KEYWORDS_REGEX.finditer(descricao_lower):
+        ordem = _KEYWORD_ORDEM[match.group(1)]
+        if melhor is None or ordem < melhor:
+            melhor = ordem
+            if melhor == 0:
+                break
+    return None if melhor is None else _KEYWORD_CADEIAS[melhor]
+
+
 def classificar_cadeia(ncm, descricao, capitulo):
     """
     Classifica um produto NCM em uma cadeia produtiva.
@@ -375,16 +462,57 @@ def classificar_cadeia(ncm, descricao, capitulo):
         return cadeia_key, CADEIAS[cadeia_key]
 
     # 2. Verificar por palavras-chave na descrição
-    for cadeia_key, keywords in KEYWORDS_CADEIA.items():
-        for keyword in keywords:
-            if keyword.lower() in descricao_lower:
-                return cadeia_key, CADEIAS[cadeia_key]
+    cadeia_key = buscar_cadeia_keyword(descricao_lower)
+    if cadeia_key is not None:
+        return cadeia_key, CADEIAS[cadeia_key]
 
     # 3. Usar mapeamento por capítulo como fallback
     cadeia_key = CAPITULO_TO_CADEIA.get(capitulo, "outros")
     return cadeia_key, CADEIAS[cadeia_key]
 
 
+def classificar_cadeia_array(ncms, descricoes, capitulos):
+    """
+    Versão vetorizada de classificar_cadeia.
+
+    A classificação roda uma vez por combinação única de (NCM, descrição,
+    capítulo) e o resultado é propagado para todas as linhas.
+
+    Args:
+        ncms: Array/Series de códigos NCM
+        descricoes: Array/Series de descrições (ou None se indisponível)
+        capitulos: Array/Series de capítulos NCM
+
+    Returns:
+        tuple: (chaves, nomes) como pd.Categorical
+    """
+    n = len(ncms)
+    if descricoes is None:
+        descricoes = np.full(n, "", dtype=object)
+
+    produtos = pd.DataFrame({
+        'ncm': np.asarray(ncms),
+        'descricao': pd.Series(np.asarray(descricoes, dtype=object)).fillna("").to_numpy(),
+        'capitulo': np.asarray(capitulos),
+    })
+
+    grupos = produtos.groupby(['ncm', 'descricao', 'capitulo'], sort=False, dropna=False).ngroup()
+    unicos = produtos.drop_duplicates()
+
+    indice = {k: i for i, k in enumerate(_CADEIA_KEYS)}
+    indices_unicos = np.fromiter(
+        (indice[classificar_cadeia(ncm, desc, cap)[0]]
+         for ncm, desc, cap in unicos.itertuples(index=False, name=None)),
+        dtype=np.int8,
+        count=len(unicos),
+    )
+    indices = indices_unicos[grupos.to_numpy()]
+
+    chaves = pd.Categorical.from_codes(indices, categories=_CADEIA_KEYS)
+    nomes = pd.Categorical.from_codes(indices, categories=_CADEIA_NOMES)
+    return chaves, nomes
+
+
 def get_all_cadeias():
     """Retorna lista de todas as cadeias disponíveis."""
     return list(CADEIAS.values())
@@ -682,6 +810,84 @@ def classificar_cadeia_sh4(sh4_code):
         return "outros", CADEIAS["outros"]
 
 
+def _construir_lookup_sh4():
+    """
+    Pré-calcula a cadeia de cada um dos 10.000 códigos SH4 possíveis.
+
+    Returns:
+        np.ndarray (int8) com o índice em _CADEIA_KEYS para cada SH4 0000-9999
+    """
+    indice = {k: i for i, k in enumerate(_CADEIA_KEYS)}
+    lookup = np.empty(10000, dtype=np.int8)
+    for codigo in range(10000):
+        lookup[codigo] = indice[classificar_cadeia_sh4(f"{codigo:04d}")[0]]
+    return lookup
+
+
+SH4_LOOKUP = _construir_lookup_sh4()
+
+
+def classificar_cadeia_sh4_array(sh4_codes):
+    """
+    Versão vetorizada de classificar_cadeia_sh4 para arrays de códigos SH4.
+
+    Cada código é resolvido por indexação em SH4_LOOKUP, sem laço Python
+    por linha. Códigos inválidos ou fora de 0000-9999 caem em "outros".
+
+    Args:
+        sh4_codes: Array/Series de códigos SH4 (strings ou inteiros)
+
+    Returns:
+        tuple: (chaves, nomes) como pd.Categorical
+    """
+    codigos = pd.to_numeric(pd.Series(np.asarray(sh4_codes)), errors='coerce').to_numpy()
+    validos = ~np.isnan(codigos) & (codigos >= 0) & (codigos < 10000)
+
+    indices = np.full(len(codigos), _CADEIA_KEYS.index("outros"), dtype=np.int8)
+    indices[validos] = SH4_LOOKUP[codigos[validos].astype(np.int64)]
+
+    chaves = pd.Categorical.from_codes(indices, categories=_CADEIA_KEYS)
+    nomes = pd.Categorical.from_codes(indices, categories=_CADEIA_NOMES)
+    return chaves, nomes
+
+
+def mapa_cadeias_sh4(sh4_codes):
+    """
+    Retorna a cadeia atribuída pelas regras atuais a cada código SH4.
+
+    Usado para registrar o estado das regras junto aos dados processados
+    e, depois, detectar o que mudou (ver diff_cadeias).
+
+    Args:
+        sh4_codes: Códigos SH4 (strings de 4 dígitos)
+
+    Returns:
+        dict: {sh4: codigo_cadeia}
+    """
+    codigos = sorted({str(c).zfill(4) for c in sh4_codes})
+    chaves, _ = classificar_cadeia_sh4_array(codigos)
+    return dict(zip(codigos, np.asarray(chaves).tolist()))
+
+
+def diff_cadeias(anterior, atual):
+    """
+    Compara dois mapeamentos código -> cadeia.
+
+    Args:
+        anterior: dict {codigo: codigo_cadeia} do último processamento
+        atual: dict {codigo: codigo_cadeia} das regras atuais
+
+    Returns:
+        dict: {codigo: (cadeia_anterior, cadeia_atual)} apenas para os códigos
+        que mudaram de cadeia (códigos novos têm cadeia_anterior None)
+    """
+    return {
+        codigo: (anterior.get(codigo), cadeia)
+        for codigo, cadeia in atual.items()
+        if anterior.get(codigo) != cadeia
+    }
+
+
 # Cores para cadeias (seguindo padrão rainbow do VBP)
 CADEIA_CORES = {
     "Sojicultura": "#22c55e",      # Green
@@ -21,6 +21,14 @@ if sys.stdout.encoding != 'utf-8':
 DATA_DIR = "data/processed"
 OUTPUT_DIR = "dashboard/public/data"
 SHAPEFILE_PATH = "assets/mapa_mundi/level4.shp"
+MUNICIPIOS_GEOJSON_PATH = "assets/mun_PR.json"
+
+# Tabelas publicadas também em Arrow IPC quando config.ARTEFATOS_ARROW
+# (crescem com o histórico: por mês e por cadeia)
+TABELAS_ARROW = {
+    "aggregated.json": ["byPaisByCadeia.exportacoes", "byPaisByCadeia.importacoes"],
+    "detailed.json": ["exportacoesPorPeriodo", "importacoesPorPeriodo", "timeseriesMensal"],
+}
 
 # Mapeamento de capitulos NCM para categorias (legado)
 CATEGORIAS_NCM = {
@@ -53,39 +61,16 @@ CATEGORIAS_NCM = {
     38: "Defensivos Agricolas",
 }
 
-# Mapeamento de cadeias para tipo (produto agrícola vs insumo)
-TIPO_CADEIA = {
-    # Produtos agrícolas (outputs - exportação)
-    "Sojicultura": "produto",
-    "Avicultura": "produto",
-    "Bovinocultura": "produto",
-    "Suinocultura": "produto",
-    "Cafeicultura": "produto",
-    "Cerealicultura": "produto",
-    "Canavicultura": "produto",
-    "Fruticultura": "produto",
-    "Olericultura": "produto",
-    "Aquicultura": "produto",
-    "Florestal": "produto",
-    "Floricultura": "produto",
-    "Apicultura": "produto",
-    "Laticínios": "produto",
-    "Oleaginosas": "produto",
-    "Agroind. Carnes": "produto",
-    "Agroind. Grãos": "produto",
-    "Bebidas": "produto",
-    "Tabaco": "produto",
-    "Outros": "produto",
-    # Insumos agrícolas (inputs - importação)
-    "Fertilizantes": "insumo",
-    "Herbicidas": "insumo",
-    "Fungicidas": "insumo",
-    "Inseticidas": "insumo",
-    "Outros Insumos": "insumo",
-}
-
 # Importar mapeamento de cadeias e descrições
-from ncm_cadeias_map import classificar_cadeia, CADEIAS, CADEIA_CORES, SH4_DESCRICAO
+from ncm_cadeias_map import classificar_cadeia_sh4_array, CADEIAS, CADEIA_CORES, SH4_DESCRICAO
+from cadeia_lookup import carregar_lookup, classificar_ncm
+import config
+from dimensoes import NOMES_CADEIAS, dimensao, dimensao_cadeias, ids, ids_cadeias
+from serializacao import (registros, tabela, lotes, escrever_json, escrever_arrow, expandir,
+                          gravar_se_mudou, substituir_se_mudou)
+from compressao import comprimir, imprimir_tamanhos
+from analise import IndicePrefixos, periodo_mensal
+from topologia import MAPAS, salvar_topojson
 
 
 def carregar_dados():
@@ -108,10 +93,8 @@ def carregar_dados():
 
         # Dados unificados já têm CADEIA classificada
         if 'CADEIA' not in df_exp.columns:
-            from ncm_cadeias_map import classificar_cadeia_sh4
             print("  Classificando por cadeia (SH4)...")
-            cadeias = df_exp['SH4'].apply(lambda x: classificar_cadeia_sh4(x))
-            df_exp['CADEIA'] = cadeias.apply(lambda x: x[1])
+            df_exp['CADEIA'] = np.asarray(classificar_cadeia_sh4_array(df_exp['SH4'])[1])
 
         # Criar colunas compatíveis com formato antigo se necessário
         if 'CO_NCM' not in df_exp.columns and 'SH4' in df_exp.columns:
@@ -128,9 +111,7 @@ def carregar_dados():
 
         if df_imp is not None:
             if 'CADEIA' not in df_imp.columns:
-                from ncm_cadeias_map import classificar_cadeia_sh4
-                cadeias = df_imp['SH4'].apply(lambda x: classificar_cadeia_sh4(x))
-                df_imp['CADEIA'] = cadeias.apply(lambda x: x[1])
+                df_imp['CADEIA'] = np.asarray(classificar_cadeia_sh4_array(df_imp['SH4'])[1])
 
             if 'CO_NCM' not in df_imp.columns and 'SH4' in df_imp.columns:
                 df_imp['CO_NCM'] = df_imp['SH4']
@@ -155,12 +136,11 @@ def carregar_dados():
         # Classificar por cadeia produtiva
         print("  Classificando por cadeia produtiva...")
 
-        def aplicar_cadeia(row):
-            _, nome = classificar_cadeia(row['CO_NCM'], row.get('DESC_NCM', ''), row['CAPITULO_NCM'])
-            return nome
-
-        df_exp['CADEIA'] = df_exp.apply(aplicar_cadeia, axis=1)
-        df_imp['CADEIA'] = df_imp.apply(aplicar_cadeia, axis=1)
+        # Join com a tabela NCM -> cadeia pré-compilada (cadeia_lookup.py)
+        lookup = carregar_lookup()
+        for df in (df_exp, df_imp):
+            _, nomes = classificar_ncm(df['CO_NCM'], df.get('DESC_NCM'), df['CAPITULO_NCM'], lookup=lookup)
+            df['CADEIA'] = np.asarray(nomes)
 
     print(f"  Exportacoes: {len(df_exp):,} registros")
     print(f"  Importacoes: {len(df_imp):,} registros")
@@ -173,63 +153,99 @@ def carregar_dados():
     return df_exp, df_imp
 
 
-def preparar_aggregated(df_exp, df_imp):
+# Granularidade do cubo base: todas as visões publicadas são agregações dele
+DIMENSOES_CUBO = ['CO_ANO', 'CO_MES', 'CAPITULO_NCM', 'CO_NCM', 'DESC_NCM', 'CO_PAIS', 'PAIS', 'CADEIA']
+
+
+def construir_cubo(df):
+    """
+    Agrega os registros na granularidade mais fina usada pelo dashboard.
+
+    Args:
+        df: DataFrame de exportacoes ou importacoes
+
+    Returns:
+        DataFrame com DIMENSOES_CUBO + VL_FOB, KG_LIQUIDO e REGISTROS
+    """
+    cubo = df.groupby(DIMENSOES_CUBO, dropna=False, sort=False).agg(
+        VL_FOB=('VL_FOB', 'sum'),
+        KG_LIQUIDO=('KG_LIQUIDO', 'sum'),
+        REGISTROS=('VL_FOB', 'size'),
+    ).reset_index()
+    return cubo
+
+
+def agregar_cubo(cubo, chaves, produtos=False):
+    """
+    Agrega o cubo base por um subconjunto de dimensões.
+
+    Args:
+        cubo: Cubo gerado por construir_cubo
+        chaves: Dimensões do agrupamento
+        produtos: Inclui a contagem de NCMs distintos (CO_NCM)
+
+    Returns:
+        DataFrame com chaves + VL_FOB, KG_LIQUIDO (e CO_NCM)
+    """
+    agg = {'VL_FOB': 'sum', 'KG_LIQUIDO': 'sum'}
+    if produtos:
+        agg['CO_NCM'] = 'nunique'
+    return cubo.groupby(chaves).agg(agg).reset_index()
+
+
+def preparar_aggregated(cubo_exp, cubo_imp):
     """Prepara dados agregados para o dashboard."""
     print("Preparando dados agregados...")
 
     # Metadados
     metadata = {
-        "anoMin": int(min(df_exp['CO_ANO'].min(), df_imp['CO_ANO'].min())),
-        "anoMax": int(max(df_exp['CO_ANO'].max(), df_imp['CO_ANO'].max())),
-        "anos": sorted(list(set(df_exp['CO_ANO'].unique()) | set(df_imp['CO_ANO'].unique()))),
-        "totalExportacoes": int(len(df_exp)),
-        "totalImportacoes": int(len(df_imp)),
-        "produtosExp": int(df_exp['CO_NCM'].nunique()),
-        "produtosImp": int(df_imp['CO_NCM'].nunique()),
-        "paisesDestino": int(df_exp['CO_PAIS'].nunique()),
-        "paisesOrigem": int(df_imp['CO_PAIS'].nunique()),
-        "valorTotalExp": float(df_exp['VL_FOB'].sum()),
-        "valorTotalImp": float(df_imp['VL_FOB'].sum()),
-        "pesoTotalExp": float(df_exp['KG_LIQUIDO'].sum()),
-        "pesoTotalImp": float(df_imp['KG_LIQUIDO'].sum()),
+        "anoMin": int(min(cubo_exp['CO_ANO'].min(), cubo_imp['CO_ANO'].min())),
+        "anoMax": int(max(cubo_exp['CO_ANO'].max(), cubo_imp['CO_ANO'].max())),
+        "anos": sorted(list(set(cubo_exp['CO_ANO'].unique()) | set(cubo_imp['CO_ANO'].unique()))),
+        "totalExportacoes": int(cubo_exp['REGISTROS'].sum()),
+        "totalImportacoes": int(cubo_imp['REGISTROS'].sum()),
+        "produtosExp": int(cubo_exp['CO_NCM'].nunique()),
+        "produtosImp": int(cubo_imp['CO_NCM'].nunique()),
+        "paisesDestino": int(cubo_exp['CO_PAIS'].nunique()),
+        "paisesOrigem": int(cubo_imp['CO_PAIS'].nunique()),
+        "valorTotalExp": float(cubo_exp['VL_FOB'].sum()),
+        "valorTotalImp": float(cubo_imp['VL_FOB'].sum()),
+        "pesoTotalExp": float(cubo_exp['KG_LIQUIDO'].sum()),
+        "pesoTotalImp": float(cubo_imp['KG_LIQUIDO'].sum()),
     }
 
-    # Filtros disponiveis
-    capitulos = sorted(list(set(df_exp['CAPITULO_NCM'].unique()) | set(df_imp['CAPITULO_NCM'].unique())))
-    cadeias = sorted(list(set(df_exp['CADEIA'].unique()) | set(df_imp['CADEIA'].unique())))
-    filters = {
+    # Dimensoes (nomes gravados uma vez; as tabelas usam ids - ver dimensoes.py)
+    capitulos = sorted(list(set(cubo_exp['CAPITULO_NCM'].unique()) | set(cubo_imp['CAPITULO_NCM'].unique())))
+    cadeias = sorted(list(set(cubo_exp['CADEIA'].unique()) | set(cubo_imp['CADEIA'].unique())))
+    dim_paises = dimensao(cubo_exp, cubo_imp, codigo='CO_PAIS', nome='PAIS')
+    dimensoes = {
+        "cadeias": dimensao_cadeias(),
+        "paises": registros(dim_paises),
         "capitulos": [{"codigo": int(c), "nome": CATEGORIAS_NCM.get(c, f"Cap. {c}")} for c in capitulos],
-        "cadeias": [
-            {
-                "nome": c,
-                "cor": CADEIA_CORES.get(c, "#64748b"),
-                "tipo": TIPO_CADEIA.get(c, "produto")  # produto ou insumo
-            }
-            for c in cadeias
-        ],
-        "paisesExp": sorted(df_exp['PAIS'].dropna().unique().tolist()),
-        "paisesImp": sorted(df_imp['PAIS'].dropna().unique().tolist()),
+    }
+
+    def ids_paises(cubo):
+        return sorted(int(i) for i in set(ids(cubo['CO_PAIS'].unique(), dim_paises)) if i >= 0)
+
+    # Filtros disponiveis (ids nas dimensoes)
+    filters = {
+        "capitulos": [int(c) for c in capitulos],
+        "cadeias": [int(i) for i in ids_cadeias(cadeias) if i >= 0],
+        "paisesExp": ids_paises(cubo_exp),
+        "paisesImp": ids_paises(cubo_imp),
     }
 
     # Serie temporal por ano
-    exp_ano = df_exp.groupby('CO_ANO').agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum',
-        'CO_NCM': 'nunique'
-    }).reset_index()
+    exp_ano = agregar_cubo(cubo_exp, 'CO_ANO', produtos=True)
     exp_ano.columns = ['ano', 'valorExp', 'pesoExp', 'produtosExp']
 
-    imp_ano = df_imp.groupby('CO_ANO').agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum',
-        'CO_NCM': 'nunique'
-    }).reset_index()
+    imp_ano = agregar_cubo(cubo_imp, 'CO_ANO', produtos=True)
     imp_ano.columns = ['ano', 'valorImp', 'pesoImp', 'produtosImp']
 
     timeseries = exp_ano.merge(imp_ano, on='ano', how='outer').fillna(0)
     timeseries['saldo'] = timeseries['valorExp'] - timeseries['valorImp']
     timeseries['corrente'] = timeseries['valorExp'] + timeseries['valorImp']
-    timeseries = timeseries.to_dict('records')
+    timeseries = registros(timeseries)
 
     # Serie temporal por ano E por cadeia (para filtros)
     # Verificar se existe arquivo pré-processado
@@ -237,19 +253,13 @@ def preparar_aggregated(df_exp, df_imp):
     if os.path.exists(timeseries_cadeia_path):
         print("  Usando timeseriesByCadeia do processo unificado...")
         with open(timeseries_cadeia_path, 'r', encoding='utf-8') as f:
-            timeseries_by_cadeia = json.load(f)
+            timeseries_by_cadeia = pd.DataFrame(expandir(json.load(f)))
     else:
-        exp_ano_cadeia = df_exp.groupby(['CO_ANO', 'CADEIA']).agg({
-            'VL_FOB': 'sum',
-            'KG_LIQUIDO': 'sum'
-        }).reset_index()
+        exp_ano_cadeia = agregar_cubo(cubo_exp, ['CO_ANO', 'CADEIA'])
         exp_ano_cadeia.columns = ['ano', 'cadeia', 'valorExp', 'pesoExp']
 
-        if len(df_imp) > 0:
-            imp_ano_cadeia = df_imp.groupby(['CO_ANO', 'CADEIA']).agg({
-                'VL_FOB': 'sum',
-                'KG_LIQUIDO': 'sum'
-            }).reset_index()
+        if len(cubo_imp) > 0:
+            imp_ano_cadeia = agregar_cubo(cubo_imp, ['CO_ANO', 'CADEIA'])
             imp_ano_cadeia.columns = ['ano', 'cadeia', 'valorImp', 'pesoImp']
 
             timeseries_by_cadeia = exp_ano_cadeia.merge(
@@ -262,116 +272,87 @@ def preparar_aggregated(df_exp, df_imp):
             timeseries_by_cadeia['valorImp'] = 0
             timeseries_by_cadeia['pesoImp'] = 0
 
-        timeseries_by_cadeia = timeseries_by_cadeia.to_dict('records')
+    timeseries_by_cadeia['cadeia'] = ids_cadeias(timeseries_by_cadeia['cadeia'])
+    timeseries_by_cadeia = registros(timeseries_by_cadeia)
 
-    # Por cadeia produtiva (estilo VBP)
-    exp_cadeia = df_exp.groupby('CADEIA').agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum',
-        'CO_NCM': 'nunique'
-    }).reset_index()
+    # Por cadeia produtiva (estilo VBP); categoria é o id em dimensoes.cadeias
+    exp_cadeia = agregar_cubo(cubo_exp, 'CADEIA', produtos=True)
     exp_cadeia = exp_cadeia.rename(columns={'CADEIA': 'categoria', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso', 'CO_NCM': 'produtos'})
     exp_cadeia['cor'] = exp_cadeia['categoria'].map(CADEIA_CORES)
+    exp_cadeia['categoria'] = ids_cadeias(exp_cadeia['categoria'])
 
-    imp_cadeia = df_imp.groupby('CADEIA').agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum',
-        'CO_NCM': 'nunique'
-    }).reset_index()
+    imp_cadeia = agregar_cubo(cubo_imp, 'CADEIA', produtos=True)
     imp_cadeia = imp_cadeia.rename(columns={'CADEIA': 'categoria', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso', 'CO_NCM': 'produtos'})
     imp_cadeia['cor'] = imp_cadeia['categoria'].map(CADEIA_CORES)
+    imp_cadeia['categoria'] = ids_cadeias(imp_cadeia['categoria'])
 
     # Por capitulo NCM (legado)
-    exp_cap = df_exp.groupby('CAPITULO_NCM').agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum',
-        'CO_NCM': 'nunique'
-    }).reset_index()
+    exp_cap = agregar_cubo(cubo_exp, 'CAPITULO_NCM', produtos=True)
     exp_cap['categoria'] = exp_cap['CAPITULO_NCM'].map(CATEGORIAS_NCM)
     exp_cap = exp_cap.rename(columns={'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso', 'CO_NCM': 'produtos'})
 
-    imp_cap = df_imp.groupby('CAPITULO_NCM').agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum',
-        'CO_NCM': 'nunique'
-    }).reset_index()
+    imp_cap = agregar_cubo(cubo_imp, 'CAPITULO_NCM', produtos=True)
     imp_cap['categoria'] = imp_cap['CAPITULO_NCM'].map(CATEGORIAS_NCM)
     imp_cap = imp_cap.rename(columns={'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso', 'CO_NCM': 'produtos'})
 
     byCategoria = {
-        "exportacoes": exp_cadeia.sort_values('valor', ascending=False).to_dict('records'),
-        "importacoes": imp_cadeia.sort_values('valor', ascending=False).to_dict('records')
+        "exportacoes": registros(exp_cadeia.sort_values('valor', ascending=False)),
+        "importacoes": registros(imp_cadeia.sort_values('valor', ascending=False))
     }
 
     byCapitulo = {
-        "exportacoes": exp_cap.sort_values('valor', ascending=False).to_dict('records'),
-        "importacoes": imp_cap.sort_values('valor', ascending=False).to_dict('records')
+        "exportacoes": registros(exp_cap.sort_values('valor', ascending=False)),
+        "importacoes": registros(imp_cap.sort_values('valor', ascending=False))
     }
 
+    # Por país E cadeia (para filtros por cadeia funcionarem)
+    exp_pais_cadeia = agregar_cubo(cubo_exp, ['CO_PAIS', 'PAIS', 'CADEIA'])
+    imp_pais_cadeia = agregar_cubo(cubo_imp, ['CO_PAIS', 'PAIS', 'CADEIA'])
+
     # Por pais (agregado - sem cadeia, para compatibilidade)
-    exp_pais = df_exp.groupby(['CO_PAIS', 'PAIS']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    exp_pais = agregar_cubo(exp_pais_cadeia, ['CO_PAIS', 'PAIS'])
     exp_pais = exp_pais.rename(columns={'CO_PAIS': 'codigo', 'PAIS': 'pais', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
 
-    imp_pais = df_imp.groupby(['CO_PAIS', 'PAIS']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    imp_pais = agregar_cubo(imp_pais_cadeia, ['CO_PAIS', 'PAIS'])
     imp_pais = imp_pais.rename(columns={'CO_PAIS': 'codigo', 'PAIS': 'pais', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
 
     byPais = {
-        "exportacoes": exp_pais.sort_values('valor', ascending=False).head(50).to_dict('records'),
-        "importacoes": imp_pais.sort_values('valor', ascending=False).head(50).to_dict('records')
+        "exportacoes": registros(exp_pais.sort_values('valor', ascending=False).head(50)),
+        "importacoes": registros(imp_pais.sort_values('valor', ascending=False).head(50))
     }
 
-    # Por país E cadeia (para filtros por cadeia funcionarem)
-    exp_pais_cadeia = df_exp.groupby(['CO_PAIS', 'PAIS', 'CADEIA']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
-    exp_pais_cadeia = exp_pais_cadeia.rename(columns={
-        'CO_PAIS': 'codigo', 'PAIS': 'pais', 'CADEIA': 'cadeia',
-        'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'
-    })
-
-    imp_pais_cadeia = df_imp.groupby(['CO_PAIS', 'PAIS', 'CADEIA']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
-    imp_pais_cadeia = imp_pais_cadeia.rename(columns={
-        'CO_PAIS': 'codigo', 'PAIS': 'pais', 'CADEIA': 'cadeia',
-        'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'
-    })
+    def por_pais_cadeia(pais_cadeia):
+        return pd.DataFrame({
+            'pais': ids(pais_cadeia['CO_PAIS'], dim_paises),
+            'cadeia': ids_cadeias(pais_cadeia['CADEIA']),
+            'valor': pais_cadeia['VL_FOB'].to_numpy(),
+            'peso': pais_cadeia['KG_LIQUIDO'].to_numpy(),
+        })
 
     byPaisByCadeia = {
-        "exportacoes": exp_pais_cadeia.to_dict('records'),
-        "importacoes": imp_pais_cadeia.to_dict('records')
+        "exportacoes": tabela(por_pais_cadeia(exp_pais_cadeia)),
+        "importacoes": tabela(por_pais_cadeia(imp_pais_cadeia))
     }
 
-    # Top produtos
-    exp_prod = df_exp.groupby(['CO_NCM', 'DESC_NCM', 'CAPITULO_NCM', 'CADEIA']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    # Top produtos (cadeia: id em dimensoes.cadeias)
+    exp_prod = agregar_cubo(cubo_exp, ['CO_NCM', 'DESC_NCM', 'CAPITULO_NCM', 'CADEIA'])
     exp_prod['capitulo'] = exp_prod['CAPITULO_NCM'].map(CATEGORIAS_NCM)
     exp_prod = exp_prod.rename(columns={'CO_NCM': 'ncm', 'DESC_NCM': 'descricao', 'CADEIA': 'cadeia', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
+    exp_prod['cadeia'] = ids_cadeias(exp_prod['cadeia'])
 
-    imp_prod = df_imp.groupby(['CO_NCM', 'DESC_NCM', 'CAPITULO_NCM', 'CADEIA']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    imp_prod = agregar_cubo(cubo_imp, ['CO_NCM', 'DESC_NCM', 'CAPITULO_NCM', 'CADEIA'])
     imp_prod['capitulo'] = imp_prod['CAPITULO_NCM'].map(CATEGORIAS_NCM)
     imp_prod = imp_prod.rename(columns={'CO_NCM': 'ncm', 'DESC_NCM': 'descricao', 'CADEIA': 'cadeia', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
+    imp_prod['cadeia'] = ids_cadeias(imp_prod['cadeia'])
 
     topProdutos = {
-        "exportacoes": exp_prod.sort_values('valor', ascending=False).head(100).to_dict('records'),
-        "importacoes": imp_prod.sort_values('valor', ascending=False).head(100).to_dict('records')
+        "exportacoes": registros(exp_prod.sort_values('valor', ascending=False).head(100)),
+        "importacoes": registros(imp_prod.sort_values('valor', ascending=False).head(100))
     }
 
     return {
         "metadata": metadata,
+        "dimensoes": dimensoes,
         "filters": filters,
         "timeseries": timeseries,
         "timeseriesByCadeia": timeseries_by_cadeia,
@@ -383,39 +364,27 @@ def preparar_aggregated(df_exp, df_imp):
     }
 
 
-def preparar_detailed(df_exp, df_imp):
+def _por_periodo(cubo):
+    """Agregado por ano/mes e capitulo, um DataFrame por ano."""
+    for _, cubo_ano in cubo.groupby('CO_ANO', sort=True):
+        periodo = agregar_cubo(cubo_ano, ['CO_ANO', 'CO_MES', 'CAPITULO_NCM'])
+        periodo['periodo'] = periodo['CO_ANO'].astype(str) + '-' + periodo['CO_MES'].astype(str).str.zfill(2)
+        yield periodo.rename(columns={'CAPITULO_NCM': 'capitulo', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
+
+
+def preparar_detailed(cubo_exp, cubo_imp):
     """Prepara dados detalhados por periodo para graficos."""
     print("Preparando dados detalhados...")
 
-    # Exportacoes por ano/mes
-    exp_periodo = df_exp.groupby(['CO_ANO', 'CO_MES', 'CAPITULO_NCM']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
-    exp_periodo['periodo'] = exp_periodo['CO_ANO'].astype(str) + '-' + exp_periodo['CO_MES'].astype(str).str.zfill(2)
-    exp_periodo['categoria'] = exp_periodo['CAPITULO_NCM'].map(CATEGORIAS_NCM)
-    exp_periodo = exp_periodo.rename(columns={'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
-
-    # Importacoes por ano/mes
-    imp_periodo = df_imp.groupby(['CO_ANO', 'CO_MES', 'CAPITULO_NCM']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
-    imp_periodo['periodo'] = imp_periodo['CO_ANO'].astype(str) + '-' + imp_periodo['CO_MES'].astype(str).str.zfill(2)
-    imp_periodo['categoria'] = imp_periodo['CAPITULO_NCM'].map(CATEGORIAS_NCM)
-    imp_periodo = imp_periodo.rename(columns={'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
+    # Exportacoes e importacoes por ano/mes (geradas ano a ano durante a gravacao)
+    exp_periodo = lotes(lambda: _por_periodo(cubo_exp))
+    imp_periodo = lotes(lambda: _por_periodo(cubo_imp))
 
     # Serie temporal mensal agregada
-    exp_mensal = df_exp.groupby(['CO_ANO', 'CO_MES']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    exp_mensal = agregar_cubo(cubo_exp, ['CO_ANO', 'CO_MES'])
     exp_mensal['periodo'] = exp_mensal['CO_ANO'].astype(str) + '-' + exp_mensal['CO_MES'].astype(str).str.zfill(2)
 
-    imp_mensal = df_imp.groupby(['CO_ANO', 'CO_MES']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    imp_mensal = agregar_cubo(cubo_imp, ['CO_ANO', 'CO_MES'])
     imp_mensal['periodo'] = imp_mensal['CO_ANO'].astype(str) + '-' + imp_mensal['CO_MES'].astype(str).str.zfill(2)
 
     mensal = exp_mensal[['periodo', 'VL_FOB', 'KG_LIQUIDO']].merge(
@@ -434,18 +403,24 @@ def preparar_detailed(df_exp, df_imp):
     mensal = mensal.sort_values('periodo')
 
     return {
-        "exportacoesPorPeriodo": exp_periodo[['periodo', 'categoria', 'valor', 'peso']].to_dict('records'),
-        "importacoesPorPeriodo": imp_periodo[['periodo', 'categoria', 'valor', 'peso']].to_dict('records'),
-        "timeseriesMensal": mensal.to_dict('records')
+        # capitulo: código do capítulo NCM (nomes em aggregated.json dimensoes.capitulos)
+        "exportacoesPorPeriodo": tabela(exp_periodo, ['periodo', 'capitulo', 'valor', 'peso']),
+        "importacoesPorPeriodo": tabela(imp_periodo, ['periodo', 'capitulo', 'valor', 'peso']),
+        "timeseriesMensal": registros(mensal)
     }
 
 
-def preparar_forecasts(df_exp, df_imp):
-    """Prepara previsoes - usa arquivo gerado pelo forecasting.py se disponível."""
+def preparar_forecasts(cubo_exp, cubo_imp, forecasts_path=None):
+    """
+    Prepara previsoes - usa arquivo gerado pelo forecasting.py se disponível.
+
+    forecasts_path: saída do forecasting.py (padrão: forecasts.json do dashboard)
+    """
     print("Preparando previsoes...")
 
     # Verificar se existe arquivo de previsões gerado pelo forecasting.py
-    forecasts_path = os.path.join(OUTPUT_DIR, "forecasts.json")
+    if forecasts_path is None:
+        forecasts_path = os.path.join(OUTPUT_DIR, "forecasts.json")
     if os.path.exists(forecasts_path):
         print("  Usando previsoes do forecasting.py...")
         with open(forecasts_path, 'r', encoding='utf-8') as f:
@@ -505,10 +480,10 @@ def preparar_forecasts(df_exp, df_imp):
     print("  Gerando previsoes simples (fallback)...")
 
     # Agregacao anual
-    exp_ano = df_exp.groupby('CO_ANO')['VL_FOB'].sum().reset_index()
+    exp_ano = cubo_exp.groupby('CO_ANO')['VL_FOB'].sum().reset_index()
     exp_ano.columns = ['ano', 'valor']
 
-    imp_ano = df_imp.groupby('CO_ANO')['VL_FOB'].sum().reset_index() if len(df_imp) > 0 else pd.DataFrame({'ano': [], 'valor': []})
+    imp_ano = cubo_imp.groupby('CO_ANO')['VL_FOB'].sum().reset_index() if len(cubo_imp) > 0 else pd.DataFrame({'ano': [], 'valor': []})
     imp_ano.columns = ['ano', 'valor']
 
     # Previsao simples: media movel + tendencia linear
@@ -550,34 +525,287 @@ def preparar_forecasts(df_exp, df_imp):
     }
 
 
-def preparar_mapa_paises(df_exp, df_imp):
+def preparar_mapa_paises(cubo_exp, cubo_imp):
     """Prepara dados para o mapa de paises."""
     print("Preparando dados do mapa...")
 
     # Exportacoes por pais
-    exp_pais = df_exp.groupby(['CO_PAIS', 'PAIS']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    exp_pais = agregar_cubo(cubo_exp, ['CO_PAIS', 'PAIS'])
     exp_pais = exp_pais.rename(columns={'CO_PAIS': 'codigo', 'PAIS': 'pais', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
     exp_pais['percentual'] = (exp_pais['valor'] / exp_pais['valor'].sum() * 100).round(2)
 
     # Importacoes por pais
-    imp_pais = df_imp.groupby(['CO_PAIS', 'PAIS']).agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum'
-    }).reset_index()
+    imp_pais = agregar_cubo(cubo_imp, ['CO_PAIS', 'PAIS'])
     imp_pais = imp_pais.rename(columns={'CO_PAIS': 'codigo', 'PAIS': 'pais', 'VL_FOB': 'valor', 'KG_LIQUIDO': 'peso'})
     imp_pais['percentual'] = (imp_pais['valor'] / imp_pais['valor'].sum() * 100).round(2)
 
     return {
-        "exportacoes": exp_pais.to_dict('records'),
-        "importacoes": imp_pais.to_dict('records')
+        "exportacoes": registros(exp_pais),
+        "importacoes": registros(imp_pais)
+    }
+
+
+# Países (colunas) das matrizes de cordas cadeia x país
+TOP_PAISES_CORDAS = 12
+
+
+def _eixos(cubo, anos):
+    """Posições de cadeia (id) e ano de cada linha, e a máscara das válidas."""
+    cadeia = ids_cadeias(cubo['CADEIA'])
+    ano = pd.Index(anos).get_indexer(cubo['CO_ANO'])
+    return cadeia, ano, (cadeia >= 0) & (ano >= 0)
+
+
+def _inteiros(matriz):
+    """Valores FOB (US$ inteiros) como listas aninhadas de int."""
+    return np.rint(matriz).astype(np.int64).tolist()
+
+
+def _heatmap(cubo, anos):
+    """Grade ano x mês (12) de cada cadeia presente."""
+    grupo = agregar_cubo(cubo, ['CADEIA', 'CO_ANO', 'CO_MES'])
+    cadeia, ano, validas = _eixos(grupo, anos)
+    mes = grupo['CO_MES'].to_numpy().astype(np.int64) - 1
+
+    grade = np.zeros((len(NOMES_CADEIAS), len(anos), 12))
+    np.add.at(grade, (cadeia[validas], ano[validas], mes[validas]), grupo['VL_FOB'].to_numpy()[validas])
+    return [
+        {"cadeia": int(c), "grade": _inteiros(grade[c])}
+        for c in np.unique(cadeia[validas])
+    ]
+
+
+def _cordas(cubo, anos):
+    """Matriz ano x cadeia x país (principais países do fluxo)."""
+    grupo = agregar_cubo(cubo, ['CADEIA', 'CO_ANO', 'CO_PAIS', 'PAIS'])
+    topo = agregar_cubo(grupo, ['CO_PAIS', 'PAIS']).nlargest(TOP_PAISES_CORDAS, 'VL_FOB')
+    paises = pd.Index(topo['CO_PAIS'])
+
+    cadeia, ano, validas = _eixos(grupo, anos)
+    pais = paises.get_indexer(grupo['CO_PAIS'])
+    validas &= pais >= 0
+    cadeias = np.unique(cadeia[validas])
+
+    matriz = np.zeros((len(anos), len(cadeias), len(paises)))
+    linha = np.searchsorted(cadeias, cadeia[validas])
+    np.add.at(matriz, (ano[validas], linha, pais[validas]), grupo['VL_FOB'].to_numpy()[validas])
+    return {
+        "paises": [{"codigo": int(c), "nome": n} for c, n in zip(topo['CO_PAIS'], topo['PAIS'])],
+        "cadeias": [int(c) for c in cadeias],
+        "matriz": _inteiros(matriz),
     }
 
 
+def _variacao(valores):
+    """Variação % de cada ano sobre o anterior (None sem ano anterior positivo)."""
+    return [None] + [
+        round((atual - anterior) / anterior * 100, 4) if anterior > 0 else None
+        for anterior, atual in zip(valores, valores[1:])
+    ]
+
+
+def _comparativo(cubo, anos):
+    """Valor anual e variação sobre o ano anterior, total e por cadeia."""
+    grupo = agregar_cubo(cubo, ['CADEIA', 'CO_ANO'])
+    cadeia, ano, validas = _eixos(grupo, anos)
+
+    valores = np.zeros((len(NOMES_CADEIAS), len(anos)))
+    np.add.at(valores, (cadeia[validas], ano[validas]), grupo['VL_FOB'].to_numpy()[validas])
+    total = np.zeros(len(anos))
+    np.add.at(total, ano[ano >= 0], grupo['VL_FOB'].to_numpy()[ano >= 0])
+
+    def serie(linha):
+        linha = _inteiros(linha)
+        return {"valores": linha, "variacao": _variacao(linha)}
+
+    return {
+        "total": serie(total),
+        "porCadeia": [{"cadeia": int(c), **serie(valores[c])} for c in np.unique(cadeia[validas])],
+    }
+
+
+def preparar_graficos(cubo_exp, cubo_imp):
+    """
+    Estruturas prontas para os gráficos do dashboard, por fluxo.
+
+    Todas usam o eixo "anos"; com filtros, o dashboard só soma as linhas dos
+    anos e cadeias selecionados (ids de cadeia, ver dimensoes.py):
+
+        heatmap      [{cadeia, grade: [ano][mês]}]            (HeatmapChart)
+        cordas       {paises, cadeias, matriz: [ano][cadeia][país]}  (ChordDiagram)
+        comparativo  {total, porCadeia}: {valores: [ano], variacao: [ano]}
+                     (YoYComparisonChart)
+    """
+    print("Preparando matrizes dos graficos...")
+
+    anos = sorted(int(a) for a in set(cubo_exp['CO_ANO'].unique()) | set(cubo_imp['CO_ANO'].unique()))
+    graficos = {"anos": anos, "heatmap": {}, "cordas": {}, "comparativo": {}}
+    for fluxo, cubo in (("exportacoes", cubo_exp), ("importacoes", cubo_imp)):
+        graficos["heatmap"][fluxo] = _heatmap(cubo, anos)
+        graficos["cordas"][fluxo] = _cordas(cubo, anos)
+        graficos["comparativo"][fluxo] = _comparativo(cubo, anos)
+    return graficos
+
+
+def _bloco_prefixos(base, chaves, eixo):
+    """Somas acumuladas das séries de um agrupamento (ids nas colunas chave)."""
+    indice = IndicePrefixos(base, chaves, eixo=eixo)
+    bloco = {c: [int(v) for v in indice.series.get_level_values(c)] for c in chaves}
+    bloco["acumulado"] = _inteiros(indice.acumulado)
+    return bloco
+
+
+def preparar_prefixos(cubo_exp, cubo_imp):
+    """
+    Índice de somas acumuladas mensais (analise.IndicePrefixos) por fluxo.
+
+    O total de qualquer intervalo de meses [i, j] de uma série é
+    acumulado[j + 1] - acumulado[i], com i e j contados a partir de "inicio"
+    (ver dashboard/src/utils/prefixos.js):
+
+        {"inicio": "2020-01", "meses": 72,
+         "dimensoes": {"paises": [{"codigo", "nome"}]},
+         "exportacoes": {"total": [...],
+                         "porCadeia": {"cadeia": [...], "acumulado": [[...]]},
+                         "porPais": {"pais": [...], "acumulado": [[...]]},
+                         "porCadeiaPais": {"cadeia": [...], "pais": [...], "acumulado": [[...]]}},
+         "importacoes": {...}}
+
+    O artefato completo é grande por causa de porCadeiaPais: shards.py o
+    fatia em uma visão base (sem porCadeiaPais) e um shard por cadeia.
+    """
+    print("Preparando indice de somas acumuladas...")
+
+    meses = pd.concat([c['CO_ANO'] * 12 + c['CO_MES'] - 1 for c in (cubo_exp, cubo_imp)])
+    eixo = tuple((int(m) // 12, int(m) % 12 + 1) for m in (meses.min(), meses.max()))
+    dim_paises = dimensao(cubo_exp, cubo_imp, codigo='CO_PAIS', nome='PAIS')
+
+    prefixos = {
+        "inicio": periodo_mensal(*eixo[0]),
+        "meses": int(meses.max() - meses.min() + 1),
+        "dimensoes": {"paises": registros(dim_paises)},
+    }
+    for fluxo, cubo in (("exportacoes", cubo_exp), ("importacoes", cubo_imp)):
+        base = pd.DataFrame({
+            'CO_ANO': cubo['CO_ANO'],
+            'CO_MES': cubo['CO_MES'],
+            'cadeia': ids_cadeias(cubo['CADEIA']),
+            'pais': ids(cubo['CO_PAIS'], dim_paises),
+            'VL_FOB': cubo['VL_FOB'],
+        })
+        prefixos[fluxo] = {
+            "total": _inteiros(IndicePrefixos(base, eixo=eixo).acumulado[0]),
+            "porCadeia": _bloco_prefixos(base, ['cadeia'], eixo),
+            "porPais": _bloco_prefixos(base, ['pais'], eixo),
+            "porCadeiaPais": _bloco_prefixos(base, ['cadeia', 'pais'], eixo),
+        }
+    return prefixos
+
+
+# Níveis da árvore do Sistema Harmonizado (dígitos do prefixo do código)
+NIVEIS_HS = (("capitulo", 2), ("posicao", 4), ("subposicao", 6), ("ncm", 8))
+
+
+def _codigos_hs(codigos):
+    """Códigos NCM/SH como texto, recompondo o zero à esquerda perdido (101 -> "0101")."""
+    texto = pd.Series(codigos).astype(str).str.replace(r'\D', '', regex=True)
+    return pd.Series([c.zfill(len(c) + len(c) % 2) for c in texto], index=texto.index, dtype=object)
+
+
+def _hierarquia_hs(cubo):
+    """
+    Nós da árvore capítulo -> posição (SH4) -> subposição -> NCM de um fluxo.
+
+    Uma ordenação pelo código e uma varredura por nível: com os códigos
+    ordenados, cada prefixo é um trecho contíguo, somado com np.add.reduceat.
+    Códigos mais curtos que o nível (SH4 na pipeline unificada) são folhas do
+    nível anterior.
+    """
+    prod = cubo.groupby('CO_NCM', sort=False).agg(
+        VL_FOB=('VL_FOB', 'sum'),
+        KG_LIQUIDO=('KG_LIQUIDO', 'sum'),
+        DESC_NCM=('DESC_NCM', 'first'),
+        CADEIA=('CADEIA', 'first'),
+    ).reset_index()
+    prod['codigo'] = _codigos_hs(prod['CO_NCM']).to_numpy()
+    prod = prod.sort_values('codigo', kind='stable', ignore_index=True)
+
+    codigos = prod['codigo'].to_numpy(dtype=object)
+    tamanhos = prod['codigo'].str.len().to_numpy()
+    valores = prod['VL_FOB'].to_numpy(dtype=np.float64)
+    pesos = prod['KG_LIQUIDO'].to_numpy(dtype=np.float64)
+    cadeias = ids_cadeias(prod['CADEIA'])
+    descricoes = prod['DESC_NCM'].to_numpy(dtype=object)
+
+    niveis = []
+    for nivel, (_, digitos) in enumerate(NIVEIS_HS):
+        linhas = np.flatnonzero(tamanhos >= digitos)
+        if len(linhas) == 0:
+            break
+        prefixos = np.array([c[:digitos] for c in codigos[linhas]], dtype=object)
+        inicios = np.flatnonzero(np.r_[True, prefixos[1:] != prefixos[:-1]])
+        fins = np.r_[inicios[1:], len(linhas)]
+        primeiras = linhas[inicios]
+        folhas = (fins - inicios == 1) & (tamanhos[primeiras] == digitos)
+
+        if nivel == 0:
+            rotulos = [CATEGORIAS_NCM.get(int(p), '') for p in prefixos[inicios]]
+        elif digitos == 4:
+            rotulos = [SH4_DESCRICAO.get(p, '') for p in prefixos[inicios]]
+        else:
+            rotulos = [''] * len(inicios)
+
+        cadeia_nivel = cadeias[linhas]
+        mesma = np.minimum.reduceat(cadeia_nivel, inicios) == np.maximum.reduceat(cadeia_nivel, inicios)
+        niveis.append(pd.DataFrame({
+            'codigo': prefixos[inicios],
+            'pai': [p[:digitos - 2] for p in prefixos[inicios]] if nivel else '',
+            'nivel': np.int8(nivel),
+            'descricao': np.where(folhas & pd.notna(descricoes[primeiras]), descricoes[primeiras], rotulos),
+            'cadeia': np.where(mesma, cadeias[primeiras], -1).astype(np.int32),
+            'valor': np.add.reduceat(valores[linhas], inicios),
+            'peso': np.add.reduceat(pesos[linhas], inicios),
+            'produtos': (fins - inicios).astype(np.int32),
+        }))
+
+    nos = pd.concat(niveis, ignore_index=True)
+    filhos = nos['pai'].value_counts()
+    nos['filhos'] = nos['codigo'].map(filhos).fillna(0).astype(np.int32)
+    # Filhos de cada nó contíguos e já ordenados por valor
+    return nos.sort_values(['nivel', 'pai', 'valor'], ascending=[True, True, False], ignore_index=True)
+
+
+def preparar_hierarquia_hs(cubo_exp, cubo_imp):
+    """
+    Agregados por prefixo do código (capítulo, posição, subposição, NCM).
+
+    Complementa topProdutos (cortado em 100 linhas) e byCapitulo: cada fluxo é
+    uma tabela de nós com o código do pai ("" no nível de capítulo), já
+    agrupada por pai e ordenada por valor. shards.py grava os filhos de cada
+    nó em um shard próprio, para a tabela de produtos expandir sob demanda.
+    """
+    print("Preparando hierarquia SH/NCM...")
+
+    hierarquia = {"niveis": [nome for nome, _ in NIVEIS_HS]}
+    for fluxo, cubo in (("exportacoes", cubo_exp), ("importacoes", cubo_imp)):
+        nos = _hierarquia_hs(cubo)
+        hierarquia[fluxo] = tabela(nos)
+        print(f"  {fluxo}: {len(nos):,} nos")
+    return hierarquia
+
+
+def _publicar_topojson(geojson_path, geojson):
+    """Grava o .topojson ao lado do GeoJSON publicado (ver topologia.py)."""
+    nome, propriedades = MAPAS[os.path.basename(geojson_path)]
+    topojson_path = os.path.splitext(geojson_path)[0] + ".topojson"
+    bruto, _, br = salvar_topojson(geojson, topojson_path, nome, propriedades)
+    bruto_geo, _, br_geo = comprimir(geojson_path)
+    brotli_kb = f", brotli {br_geo / 1024:.1f} -> {br / 1024:.1f} KB" if br is not None else ""
+    print(f"  {os.path.basename(geojson_path)}: {bruto_geo / 1024:.1f} -> {bruto / 1024:.1f} KB{brotli_kb}")
+
+
 def converter_shapefile_geojson():
-    """Converte o shapefile do mapa mundi para GeoJSON."""
+    """Converte o shapefile do mapa mundi para GeoJSON (fonte de merge_countries.py)."""
     print("Convertendo shapefile para GeoJSON...")
 
     try:
@@ -590,7 +818,10 @@ def converter_shapefile_geojson():
 
         # Converter para GeoJSON
         geojson_path = os.path.join(OUTPUT_DIR, "countries.geojson")
-        gdf.to_file(geojson_path, driver='GeoJSON')
+        temporario = geojson_path + ".tmp"
+        gdf.to_file(temporario, driver='GeoJSON')
+        substituir_se_mudou(temporario, geojson_path)
+        comprimir(geojson_path)
 
         print(f"  GeoJSON salvo: {geojson_path}")
         print(f"  Paises: {len(gdf)}")
@@ -606,29 +837,64 @@ def converter_shapefile_geojson():
         return False
 
 
-class NumpyEncoder(json.JSONEncoder):
-    """Encoder para converter tipos numpy para tipos nativos Python."""
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        if pd.isna(obj):
-            return None
-        return super().default(obj)
+
+
+def publicar_mapa_paises():
+    """Publica o TopoJSON do mapa mundi a partir do countries_merged.geojson versionado."""
+    geojson_path = os.path.join(OUTPUT_DIR, "countries_merged.geojson")
+    if not os.path.exists(geojson_path):
+        print(f"  AVISO: {geojson_path} nao encontrado (execute merge_countries.py)")
+        return False
+
+    with open(geojson_path, 'r', encoding='utf-8') as f:
+        _publicar_topojson(geojson_path, json.load(f))
+    return True
+
+
+def publicar_mapa_municipios():
+    """Publica o GeoJSON dos municípios do PR (assets/mun_PR.json) no dashboard, e o TopoJSON."""
+    if not os.path.exists(MUNICIPIOS_GEOJSON_PATH):
+        print(f"  AVISO: {MUNICIPIOS_GEOJSON_PATH} nao encontrado")
+        return False
+
+    destino = os.path.join(OUTPUT_DIR, "mun_PR.geojson")
+    gravar_se_mudou(destino, Path(MUNICIPIOS_GEOJSON_PATH).read_bytes())
+    comprimir(destino)
+    print(f"  GeoJSON salvo: {destino}")
+
+    with open(destino, 'r', encoding='utf-8') as f:
+        _publicar_topojson(destino, json.load(f))
+    return True
 
 
 def salvar_json(data, filename):
-    """Salva dados como JSON compacto."""
+    """
+    Salva dados como JSON compacto, em streaming (ver serializacao.escrever_json).
+
+    Tabelas podem vir como lotes(), gerados durante a gravação.
+    """
     filepath = os.path.join(OUTPUT_DIR, filename)
 
-    with open(filepath, 'w', encoding='utf-8') as f:
-        json.dump(data, f, ensure_ascii=False, separators=(',', ':'), cls=NumpyEncoder)
+    escrever_json(filepath, data)
+    bruto, gz, br = comprimir(filepath)
+    brotli_kb = f", brotli {br / 1024:.1f} KB" if br is not None else ""
+    print(f"  {filename}: {bruto / 1024:.1f} KB (gzip {gz / 1024:.1f} KB{brotli_kb})")
+
+    if config.ARTEFATOS_ARROW:
+        salvar_arrow(data, filename)
+
 
-    size_kb = os.path.getsize(filepath) / 1024
-    print(f"  {filename}: {size_kb:.1f} KB")
+def salvar_arrow(data, filename):
+    """Salva as tabelas de TABELAS_ARROW do artefato em Arrow IPC."""
+    base = os.path.splitext(filename)[0]
+    for chave in TABELAS_ARROW.get(filename, []):
+        tabela_artefato = data
+        for parte in chave.split('.'):
+            tabela_artefato = tabela_artefato[parte]
+
+        arrow_path = os.path.join(OUTPUT_DIR, f"{base}.{chave}.arrow")
+        size_kb = escrever_arrow(arrow_path, tabela_artefato, comprimir=True) / 1024
+        print(f"  {os.path.basename(arrow_path)}: {size_kb:.1f} KB")
 
 
 def main():
@@ -643,24 +909,46 @@ def main():
     # Carregar dados
     df_exp, df_imp = carregar_dados()
 
+    # Cubo base: uma única passada sobre os registros
+    print("\nAgregando cubo base...")
+    cubo_exp = construir_cubo(df_exp)
+    cubo_imp = construir_cubo(df_imp)
+    print(f"  Exportacoes: {len(df_exp):,} registros -> {len(cubo_exp):,} linhas")
+    print(f"  Importacoes: {len(df_imp):,} registros -> {len(cubo_imp):,} linhas")
+    del df_exp, df_imp
+
     # Preparar e salvar dados
     print("\nPreparando arquivos JSON...")
 
-    aggregated = preparar_aggregated(df_exp, df_imp)
+    aggregated = preparar_aggregated(cubo_exp, cubo_imp)
     salvar_json(aggregated, "aggregated.json")
 
-    detailed = preparar_detailed(df_exp, df_imp)
+    detailed = preparar_detailed(cubo_exp, cubo_imp)
     salvar_json(detailed, "detailed.json")
 
-    forecasts = preparar_forecasts(df_exp, df_imp)
+    forecasts = preparar_forecasts(cubo_exp, cubo_imp)
     salvar_json(forecasts, "forecasts.json")
 
-    mapData = preparar_mapa_paises(df_exp, df_imp)
+    mapData = preparar_mapa_paises(cubo_exp, cubo_imp)
     salvar_json(mapData, "map_data.json")
 
+    graficos = preparar_graficos(cubo_exp, cubo_imp)
+    salvar_json(graficos, "graficos.json")
+
+    prefixos = preparar_prefixos(cubo_exp, cubo_imp)
+    salvar_json(prefixos, "prefixos.json")
+
+    hierarquia = preparar_hierarquia_hs(cubo_exp, cubo_imp)
+    salvar_json(hierarquia, "hierarquia_hs.json")
+
     # Converter shapefile
     print()
     converter_shapefile_geojson()
+    publicar_mapa_paises()
+    publicar_mapa_municipios()
+
+    # Tamanhos publicados (bruto / gzip / brotli)
+    imprimir_tamanhos(OUTPUT_DIR)
 
     print("\n" + "="*60)
     print("PREPARACAO CONCLUIDA!")
@@ -10,7 +10,9 @@ import io
 import pandas as pd
 from pathlib import Path
 from typing import Optional
+import pyarrow.compute as pc
 import config
+import raw_cache
 
 # Fix encoding for Windows
 if sys.stdout.encoding != 'utf-8':
@@ -101,57 +103,68 @@ def eh_produto_agricola(ncm: str, incluir_insumos: bool = None) -> bool:
         return False
 
 
-def processar_arquivo_exportacao(ano: int) -> Optional[pd.DataFrame]:
+def filtro_produto_agricola(incluir_insumos: bool = None) -> pc.Expression:
     """
-    Processa arquivo de exportação, filtrando para Paraná e agricultura.
+    Versão em expressão pyarrow de eh_produto_agricola, para leitura do cache.
 
     Args:
-        ano: Ano dos dados
+        incluir_insumos: Se deve incluir insumos agrícolas (fertilizantes, defensivos).
+                        Se None, usa config.INCLUIR_INSUMOS.
 
     Returns:
-        DataFrame filtrado ou None se arquivo não existe
+        Expressão aplicada durante a leitura do cache colunar
     """
-    arquivo = os.path.join(config.RAW_DIR, f"EXP_{ano}.csv")
+    if incluir_insumos is None:
+        incluir_insumos = getattr(config, 'INCLUIR_INSUMOS', True)
 
-    if not os.path.exists(arquivo):
-        print(f"Arquivo não encontrado: {arquivo}")
-        return None
+    capitulos = list(config.CAPITULOS_AGRICULTURA)
+    posicoes = None
+    if incluir_insumos:
+        capitulos.append(31)
+        posicoes = [getattr(config, 'POSICAO_DEFENSIVOS', '3808')]
 
-    print(f"\nProcessando exportações {ano}...")
+    return raw_cache.filtro_capitulos(capitulos, posicoes)
 
-    # Ler CSV em chunks para economizar memória
-    chunks = []
-    chunk_size = 500000
 
-    for chunk in pd.read_csv(arquivo, sep=";", dtype=str, chunksize=chunk_size):
-        # Filtrar por Paraná
-        chunk_pr = chunk[chunk['SG_UF_NCM'] == config.UF_PARANA]
+def carregar_ano_cache(tipo: str, ano: int, colunas: list) -> Optional[pd.DataFrame]:
+    """
+    Lê um ano do cache colunar, filtrando Paraná e produtos agrícolas na leitura.
 
-        # Filtrar por produtos agrícolas
-        chunk_agro = chunk_pr[chunk_pr['CO_NCM'].apply(eh_produto_agricola)]
+    O CSV é convertido para o cache apenas na primeira execução
+    (ou quando o arquivo baixado muda).
 
-        if len(chunk_agro) > 0:
-            chunks.append(chunk_agro)
+    Args:
+        tipo: "exp" ou "imp"
+        ano: Ano dos dados
+        colunas: Colunas do arquivo original a retornar
 
-    if not chunks:
-        print(f"  Nenhum dado encontrado para Paraná/Agricultura em {ano}")
+    Returns:
+        DataFrame filtrado ou None se arquivo não existe
+    """
+    arquivo = os.path.join(config.RAW_DIR, f"{tipo.upper()}_{ano}.csv")
+
+    if not raw_cache.garantir_cache(tipo, {ano: arquivo}):
+        print(f"Arquivo não encontrado: {arquivo}")
         return None
 
-    df = pd.concat(chunks, ignore_index=True)
+    df = raw_cache.ler_cache(
+        tipo,
+        anos=[ano],
+        ufs=[config.UF_PARANA],
+        filtro=filtro_produto_agricola(),
+        colunas=colunas,
+    )
 
-    # Converter colunas numéricas
-    colunas_numericas = ['CO_ANO', 'CO_MES', 'QT_ESTAT', 'KG_LIQUIDO', 'VL_FOB']
-    for col in colunas_numericas:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
+    if len(df) == 0:
+        print(f"  Nenhum dado encontrado para Paraná/Agricultura em {ano}")
+        return None
 
-    print(f"  {len(df)} registros filtrados")
     return df
 
 
-def processar_arquivo_importacao(ano: int) -> Optional[pd.DataFrame]:
+def processar_arquivo_exportacao(ano: int) -> Optional[pd.DataFrame]:
     """
-    Processa arquivo de importação, filtrando para Paraná e agricultura.
+    Processa arquivo de exportação, filtrando para Paraná e agricultura.
 
     Args:
         ano: Ano dos dados
@@ -159,40 +172,32 @@ def processar_arquivo_importacao(ano: int) -> Optional[pd.DataFrame]:
     Returns:
         DataFrame filtrado ou None se arquivo não existe
     """
-    arquivo = os.path.join(config.RAW_DIR, f"IMP_{ano}.csv")
+    print(f"\nProcessando exportações {ano}...")
 
-    if not os.path.exists(arquivo):
-        print(f"Arquivo não encontrado: {arquivo}")
+    df = carregar_ano_cache("exp", ano, config.COLUNAS_EXPORTACAO)
+    if df is None:
         return None
 
-    print(f"\nProcessando importações {ano}...")
+    print(f"  {len(df)} registros filtrados")
+    return df
 
-    chunks = []
-    chunk_size = 500000
 
-    for chunk in pd.read_csv(arquivo, sep=";", dtype=str, chunksize=chunk_size):
-        # Filtrar por Paraná
-        chunk_pr = chunk[chunk['SG_UF_NCM'] == config.UF_PARANA]
+def processar_arquivo_importacao(ano: int) -> Optional[pd.DataFrame]:
+    """
+    Processa arquivo de importação, filtrando para Paraná e agricultura.
 
-        # Filtrar por produtos agrícolas
-        chunk_agro = chunk_pr[chunk_pr['CO_NCM'].apply(eh_produto_agricola)]
+    Args:
+        ano: Ano dos dados
 
-        if len(chunk_agro) > 0:
-            chunks.append(chunk_agro)
+    Returns:
+        DataFrame filtrado ou None se arquivo não existe
+    """
+    print(f"\nProcessando importações {ano}...")
 
-    if not chunks:
-        print(f"  Nenhum dado encontrado para Paraná/Agricultura em {ano}")
+    df = carregar_ano_cache("imp", ano, config.COLUNAS_IMPORTACAO)
+    if df is None:
         return None
 
-    df = pd.concat(chunks, ignore_index=True)
-
-    # Converter colunas numéricas
-    colunas_numericas = ['CO_ANO', 'CO_MES', 'QT_ESTAT', 'KG_LIQUIDO',
-                         'VL_FOB', 'VL_FRETE', 'VL_SEGURO']
-    for col in colunas_numericas:
-        if col in df.columns:
-            df[col] = pd.to_numeric(df[col], errors='coerce')
-
     print(f"  {len(df)} registros filtrados")
     return df
 
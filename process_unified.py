@@ -8,40 +8,47 @@ Este script:
 3. Adiciona nomes de países e municípios
 4. Gera agregações para o dashboard
 5. Salva dados processados para uso no dashboard
+
+Uso:
+    python process_unified.py                  # Processamento completo
+    python process_unified.py --reclassificar  # Só aplica mudanças nas regras de cadeia
 """
 
 import pandas as pd
 import numpy as np
 import json
+import hashlib
+import argparse
 from pathlib import Path
 import sys
 import io
 
 # Configurar encoding UTF-8 para Windows
-if sys.platform == 'win32':
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-from ncm_cadeias_map import classificar_cadeia_sh4, CADEIA_CORES, get_all_cadeias
+from serializacao import escrever_json
+from sankey import construir_sankey, salvar_sankey
+from ncm_cadeias_map import (
+    classificar_cadeia_sh4_array, mapa_cadeias_sh4, diff_cadeias,
+    NCM_ESPECIFICO, KEYWORDS_CADEIA,
+    CADEIAS, CADEIA_CORES, get_all_cadeias
+)
 
 # Paths
 INPUT_DIR = Path("data/processed")
 OUTPUT_DIR = Path("data/processed")
 AUX_DIR = Path("data/auxiliary")
 
+# Cadeia atribuída a cada SH4 no último processamento (base do --reclassificar)
+SNAPSHOT_CADEIAS = OUTPUT_DIR / "cadeias_sh4.json"
+SANKEY_PATH = Path("dashboard/public/data/sankey_data.json")
+
 # Municípios do Paraná (código IBGE começa com 41)
 PARANA_CODE = 41
 
 
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super().default(obj)
 
 
 def load_auxiliary_tables():
@@ -106,7 +113,8 @@ def process_exports():
     df = pd.read_parquet(exp_file)
     print(f"Registros carregados: {len(df):,}")
 
-    # Filtrar apenas Paraná (municípios que começam com 41)
+    # O download_unified já filtra o Paraná na leitura; aqui apenas garante
+    # (municípios que começam com 41) caso o parquet seja de uma versão antiga
     df['UF'] = df['CO_MUN'] // 100000
     df = df[df['UF'] == PARANA_CODE].copy()
     print(f"Registros do Paraná: {len(df):,}")
@@ -115,9 +123,9 @@ def process_exports():
     print("Classificando por cadeia produtiva...")
     df['SH4'] = df['SH4'].astype(str).str.zfill(4)
 
-    cadeias = df['SH4'].apply(lambda x: classificar_cadeia_sh4(x))
-    df['CADEIA_KEY'] = cadeias.apply(lambda x: x[0])
-    df['CADEIA'] = cadeias.apply(lambda x: x[1])
+    chaves, nomes = classificar_cadeia_sh4_array(df['SH4'])
+    df['CADEIA_KEY'] = np.asarray(chaves)
+    df['CADEIA'] = np.asarray(nomes)
 
     # Estatísticas
     print(f"\nDistribuição por cadeia:")
@@ -140,7 +148,7 @@ def process_imports():
     df = pd.read_parquet(imp_file)
     print(f"Registros carregados: {len(df):,}")
 
-    # Filtrar apenas Paraná
+    # Filtrar apenas Paraná (já aplicado no download_unified)
     df['UF'] = df['CO_MUN'] // 100000
     df = df[df['UF'] == PARANA_CODE].copy()
     print(f"Registros do Paraná: {len(df):,}")
@@ -149,129 +157,24 @@ def process_imports():
     print("Classificando por cadeia produtiva...")
     df['SH4'] = df['SH4'].astype(str).str.zfill(4)
 
-    cadeias = df['SH4'].apply(lambda x: classificar_cadeia_sh4(x))
-    df['CADEIA_KEY'] = cadeias.apply(lambda x: x[0])
-    df['CADEIA'] = cadeias.apply(lambda x: x[1])
+    chaves, nomes = classificar_cadeia_sh4_array(df['SH4'])
+    df['CADEIA_KEY'] = np.asarray(chaves)
+    df['CADEIA'] = np.asarray(nomes)
 
     return df
 
 
 def generate_sankey_data(df_exp, pais_dict, mun_dict):
-    """Gera dados para o gráfico Sankey com suporte a filtro por cadeia."""
+    """Gera dados para o gráfico Sankey com suporte a filtro por cadeia (ver sankey.py)."""
     print("\n=== Gerando dados para Sankey ===\n")
 
-    # Adicionar nomes
-    df_exp['NO_PAIS'] = df_exp['CO_PAIS'].map(pais_dict).fillna('Desconhecido')
-    df_exp['NO_MUN'] = df_exp['CO_MUN'].map(mun_dict).fillna(df_exp['CO_MUN'].astype(str))
-
-    # Top 12 municípios e países por valor TOTAL (para visão geral)
-    top_mun = df_exp.groupby('CO_MUN')['VL_FOB'].sum().nlargest(12).index.tolist()
-    top_pais = df_exp.groupby('CO_PAIS')['VL_FOB'].sum().nlargest(12).index.tolist()
-
-    # Filtrar para visão geral
-    df_filtered = df_exp[
-        (df_exp['CO_MUN'].isin(top_mun)) &
-        (df_exp['CO_PAIS'].isin(top_pais))
-    ].copy()
-
-    print(f"Registros para Sankey (visão geral): {len(df_filtered):,}")
-
-    # === Links por cadeia: incluir top fluxos de CADA cadeia ===
-    # Isso garante que todas as cadeias tenham representação
-    print("Gerando links por cadeia (todas as cadeias)...")
-
-    all_cadeias = df_exp['CADEIA'].unique().tolist()
-    links_by_cadeia = []
-    all_mun_ids = set()
-    all_pais_ids = set()
-
-    for cadeia in all_cadeias:
-        df_cadeia = df_exp[df_exp['CADEIA'] == cadeia]
-
-        if len(df_cadeia) == 0:
-            continue
-
-        # Para cada cadeia, pegar top 5 municípios e top 5 países
-        top_mun_cadeia = df_cadeia.groupby('CO_MUN')['VL_FOB'].sum().nlargest(5).index.tolist()
-        top_pais_cadeia = df_cadeia.groupby('CO_PAIS')['VL_FOB'].sum().nlargest(5).index.tolist()
-
-        # Filtrar e agregar
-        df_cadeia_filtered = df_cadeia[
-            (df_cadeia['CO_MUN'].isin(top_mun_cadeia)) &
-            (df_cadeia['CO_PAIS'].isin(top_pais_cadeia))
-        ]
-
-        if len(df_cadeia_filtered) == 0:
-            continue
-
-        cadeia_agg = df_cadeia_filtered.groupby(['NO_MUN', 'NO_PAIS']).agg({
-            'VL_FOB': 'sum'
-        }).reset_index()
-
-        # Top 10 fluxos por cadeia
-        for _, row in cadeia_agg.nlargest(10, 'VL_FOB').iterrows():
-            links_by_cadeia.append({
-                'source': f"mun_{row['NO_MUN']}",
-                'target': f"pais_{row['NO_PAIS']}",
-                'value': float(row['VL_FOB']),
-                'cadeia': cadeia
-            })
-            all_mun_ids.add(row['NO_MUN'])
-            all_pais_ids.add(row['NO_PAIS'])
-
-    print(f"  Links por cadeia: {len(links_by_cadeia)} de {len(all_cadeias)} cadeias")
-
-    # === Links totais para visão geral (sem filtro de cadeia) ===
-    sankey_total = df_filtered.groupby(['NO_MUN', 'NO_PAIS']).agg({
-        'VL_FOB': 'sum'
-    }).reset_index()
+    # Adicionar nomes (se ainda não vieram nos dados)
+    if 'NO_PAIS' not in df_exp.columns:
+        df_exp['NO_PAIS'] = df_exp['CO_PAIS'].map(pais_dict).fillna('Desconhecido')
+    if 'NO_MUN' not in df_exp.columns:
+        df_exp['NO_MUN'] = df_exp['CO_MUN'].map(mun_dict).fillna(df_exp['CO_MUN'].astype(str))
 
-    links_total = []
-    for _, row in sankey_total.nlargest(80, 'VL_FOB').iterrows():
-        links_total.append({
-            'source': f"mun_{row['NO_MUN']}",
-            'target': f"pais_{row['NO_PAIS']}",
-            'value': float(row['VL_FOB'])
-        })
-        all_mun_ids.add(row['NO_MUN'])
-        all_pais_ids.add(row['NO_PAIS'])
-
-    # === Criar nodes incluindo todos os usados ===
-    nodes = []
-    for m in sorted(all_mun_ids):
-        nodes.append({
-            'id': f"mun_{m}",
-            'name': m,
-            'type': 'municipio'
-        })
-    for p in sorted(all_pais_ids):
-        nodes.append({
-            'id': f"pais_{p}",
-            'name': p,
-            'type': 'pais'
-        })
-
-    cadeias_list = sorted(all_cadeias)
-
-    sankey_data = {
-        'nodes': nodes,
-        'links': links_total,
-        'linksByCadeia': links_by_cadeia,
-        'cadeias': cadeias_list
-    }
-
-    print(f"  Nodes: {len(nodes)} ({len(all_mun_ids)} mun + {len(all_pais_ids)} países)")
-    print(f"  Links (total): {len(links_total)}")
-    print(f"  Links (por cadeia): {len(links_by_cadeia)}")
-    print(f"  Cadeias: {len(cadeias_list)}")
-
-    # Verificar cobertura de cadeias
-    cadeias_com_links = set(l['cadeia'] for l in links_by_cadeia)
-    cadeias_sem_links = set(cadeias_list) - cadeias_com_links
-    if cadeias_sem_links:
-        print(f"  AVISO: Cadeias sem links: {cadeias_sem_links}")
-
-    return sankey_data
+    return construir_sankey(df_exp)
 
 
 def generate_timeseries_by_cadeia(df_exp, df_imp):
@@ -320,17 +223,13 @@ def save_unified_data(df_exp, df_imp, sankey_data, timeseries_by_cadeia):
 
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    # 1. Sankey data
-    sankey_path = Path("dashboard/public/data/sankey_data.json")
-    sankey_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(sankey_path, 'w', encoding='utf-8') as f:
-        json.dump(sankey_data, f, cls=NumpyEncoder, ensure_ascii=False, indent=2)
-    print(f"Salvo: {sankey_path}")
+    # 1. Sankey data (None quando gerado pelo build_artifacts.py)
+    if sankey_data is not None:
+        salvar_sankey(sankey_data)
 
     # 2. Timeseries by cadeia (para integrar no aggregated.json)
     timeseries_path = OUTPUT_DIR / "timeseries_by_cadeia.json"
-    with open(timeseries_path, 'w', encoding='utf-8') as f:
-        json.dump(timeseries_by_cadeia, f, cls=NumpyEncoder, ensure_ascii=False)
+    escrever_json(timeseries_path, timeseries_by_cadeia)
     print(f"Salvo: {timeseries_path}")
 
     # 3. Dados unificados completos (parquet)
@@ -343,13 +242,160 @@ def save_unified_data(df_exp, df_imp, sankey_data, timeseries_by_cadeia):
         df_imp.to_parquet(unified_imp_path, index=False)
         print(f"Salvo: {unified_imp_path}")
 
+    # 4. Estado das regras usado nesta classificação
+    salvar_snapshot_cadeias(df_exp, df_imp)
+
+
+def hash_regras_ncm():
+    """
+    Hash das tabelas de regras por NCM/descrição (NCM_ESPECIFICO, KEYWORDS_CADEIA).
+
+    Mudanças nessas tabelas não aparecem no mapa SH4 -> cadeia do snapshot,
+    por isso são registradas à parte para o --reclassificar detectá-las.
+    """
+    conteudo = json.dumps(
+        {"ncm_especifico": NCM_ESPECIFICO, "keywords_cadeia": KEYWORDS_CADEIA},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def salvar_snapshot_cadeias(df_exp, df_imp):
+    """Registra a cadeia de cada SH4 presente nos dados e o hash das regras por NCM."""
+    sh4_codes = set(df_exp['SH4'].astype(str))
+    if df_imp is not None:
+        sh4_codes |= set(df_imp['SH4'].astype(str))
+
+    snapshot = {"regras_ncm": hash_regras_ncm(), "sh4": mapa_cadeias_sh4(sh4_codes)}
+    with open(SNAPSHOT_CADEIAS, 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f, ensure_ascii=False, sort_keys=True)
+    print(f"Salvo: {SNAPSHOT_CADEIAS}")
+
+
+def reclassify_incremental():
+    """
+    Reaplica as regras de cadeia apenas aos SH4 que mudaram de cadeia.
+
+    Compara as regras atuais com o snapshot do último processamento e
+    atualiza somente as linhas afetadas dos parquets unificados e os registros
+    de timeseries_by_cadeia das cadeias envolvidas; o Sankey é refeito pelo
+    agregado único de sankey.py.
+
+    Só o mapa SH4 -> cadeia é comparado linha a linha. Se NCM_ESPECIFICO ou
+    KEYWORDS_CADEIA mudaram (hash diferente do snapshot, ou snapshot antigo
+    sem hash), não há como saber quais linhas foram afetadas: emite um aviso
+    e pede o processamento completo.
+
+    A atualização é incremental por linha, não por arquivo: apenas as linhas
+    afetadas são reclassificadas, mas cada parquet que contém alguma delas é
+    regravado inteiro.
+
+    Returns:
+        bool: False se não há processamento anterior ou se as regras por NCM
+        mudaram (rodar o completo)
+    """
+    print("\n=== Reclassificação incremental ===\n")
+
+    exp_path = OUTPUT_DIR / "unified_exp_pr.parquet"
+    imp_path = OUTPUT_DIR / "unified_imp_pr.parquet"
+    timeseries_path = OUTPUT_DIR / "timeseries_by_cadeia.json"
+
+    if not (exp_path.exists() and SNAPSHOT_CADEIAS.exists()):
+        print("Sem processamento anterior - executando processamento completo")
+        return False
+
+    with open(SNAPSHOT_CADEIAS, 'r', encoding='utf-8') as f:
+        snapshot = json.load(f)
+
+    # Snapshot antigo: só o mapa SH4 -> cadeia, sem hash das regras por NCM
+    if "sh4" not in snapshot:
+        snapshot = {"regras_ncm": None, "sh4": snapshot}
+    if snapshot["regras_ncm"] != hash_regras_ncm():
+        print("AVISO: NCM_ESPECIFICO/KEYWORDS_CADEIA mudaram desde o último "
+              "processamento (ou snapshot sem hash) - executando processamento completo")
+        return False
+    anterior = snapshot["sh4"]
+
+    df_exp = pd.read_parquet(exp_path)
+    df_imp = pd.read_parquet(imp_path) if imp_path.exists() else None
+
+    sh4_codes = set(df_exp['SH4'].astype(str))
+    if df_imp is not None:
+        sh4_codes |= set(df_imp['SH4'].astype(str))
+    atual = mapa_cadeias_sh4(sh4_codes)
+
+    mudancas = diff_cadeias(anterior, atual)
+    if not mudancas:
+        print("Regras de cadeia sem alterações para os SH4 presentes nos dados")
+        return True
+
+    print(f"SH4 com nova cadeia: {len(mudancas)}")
+    for sh4, (antes, depois) in sorted(mudancas.items())[:20]:
+        print(f"  {sh4}: {antes} -> {depois}")
+
+    # Cadeias cujos agregados precisam ser refeitos (nomes)
+    afetadas = set()
+    for antes, depois in mudancas.values():
+        if antes is not None:
+            afetadas.add(CADEIAS.get(antes, antes))
+        afetadas.add(CADEIAS.get(depois, depois))
+
+    # 1. Reclassificar apenas as linhas afetadas
+    for df, path in ((df_exp, exp_path), (df_imp, imp_path)):
+        if df is None:
+            continue
+        linhas = df['SH4'].astype(str).isin(mudancas)
+        if not linhas.any():
+            continue
+        chaves, nomes = classificar_cadeia_sh4_array(df.loc[linhas, 'SH4'])
+        df.loc[linhas, 'CADEIA_KEY'] = np.asarray(chaves)
+        df.loc[linhas, 'CADEIA'] = np.asarray(nomes)
+        # Parquet não permite atualizar linhas no lugar: o arquivo é regravado inteiro
+        df.to_parquet(path, index=False)
+        print(f"Atualizado: {path} ({linhas.sum():,} linhas reclassificadas)")
+
+    # 2. Série temporal: recalcular só as cadeias afetadas
+    if timeseries_path.exists():
+        with open(timeseries_path, 'r', encoding='utf-8') as f:
+            timeseries = [r for r in json.load(f) if r['cadeia'] not in afetadas]
+        df_imp_afetado = None
+        if df_imp is not None:
+            df_imp_afetado = df_imp[df_imp['CADEIA'].isin(afetadas)]
+        timeseries += generate_timeseries_by_cadeia(
+            df_exp[df_exp['CADEIA'].isin(afetadas)], df_imp_afetado
+        )
+        timeseries.sort(key=lambda r: (r['ano'], r['cadeia']))
+        escrever_json(timeseries_path, timeseries)
+        print(f"Atualizado: {timeseries_path}")
+
+    # 3. Sankey: refeito a partir do agregado único (sankey.py), sem laço por cadeia
+    if SANKEY_PATH.exists():
+        salvar_sankey(construir_sankey(df_exp))
+
+    salvar_snapshot_cadeias(df_exp, df_imp)
+    return True
+
 
 def main():
     """Função principal."""
+    parser = argparse.ArgumentParser(description="Processamento unificado ComexStat PR")
+    parser.add_argument('--reclassificar', action='store_true',
+                        help='Reaplica apenas as mudanças nas regras de cadeia '
+                             'sobre o último processamento')
+    parser.add_argument('--sem-sankey', action='store_true',
+                        help='Não gera sankey_data.json (gerado pelo build_artifacts.py)')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("PROCESSAMENTO UNIFICADO - COMEXSTAT PARANÁ")
     print("=" * 60)
 
+    if args.reclassificar and reclassify_incremental():
+        print("\n" + "=" * 60)
+        print("RECLASSIFICAÇÃO CONCLUÍDA")
+        print("=" * 60)
+        return
+
     # 1. Carregar tabelas auxiliares
     pais_dict, mun_dict = load_auxiliary_tables()
 
@@ -376,7 +422,9 @@ def main():
         df_imp['NO_MUN'] = df_imp['CO_MUN'].map(mun_dict).fillna(df_imp['CO_MUN'].astype(str))
 
     # 5. Gerar dados para Sankey
-    sankey_data = generate_sankey_data(df_exp, pais_dict, mun_dict)
+    sankey_data = None
+    if not args.sem_sankey:
+        sankey_data = generate_sankey_data(df_exp, pais_dict, mun_dict)
 
     # 6. Gerar série temporal por cadeia
     timeseries_by_cadeia = generate_timeseries_by_cadeia(df_exp, df_imp)
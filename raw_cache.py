@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+"""
+Cache colunar dos CSVs brutos do ComexStat.
+
+Cada arquivo anual baixado (EXP_YYYY.csv, IMP_YYYY.csv, EXP_YYYY_MUN.csv,
+IMP_YYYY_MUN.csv, exp_mun_YYYY.csv, imp_mun_YYYY.csv) é convertido uma única
+vez para parquet tipado, com todos os estados, particionado por ano e UF:
+
+    data/raw_cache/<tipo>/CO_ANO=YYYY/<COLUNA_UF>=XX/part-0.parquet
+
+Os estágios seguintes (process_data, download_unified, download_municipios)
+leem o cache com filtros aplicados na leitura (predicate pushdown), de modo
+que mudar a lista de UFs, capítulos ou INCLUIR_INSUMOS não exige reprocessar
+o CSV nacional.
+
+Uso:
+    python raw_cache.py            # Converte todos os CSVs encontrados
+    python raw_cache.py --forcar   # Reconverte mesmo se o cache estiver atualizado
+"""
+
+import argparse
+import json
+import re
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.dataset as ds
+
+import config
+
+CACHE_DIR = Path(config.DATA_DIR) / "raw_cache"
+
+# Diretórios onde os scripts de download gravam os CSVs
+DIRETORIOS_CSV = [Path(config.RAW_DIR), Path("data/raw_mun")]
+
+# Tamanho do bloco lido do CSV por vez (bytes)
+BLOCK_SIZE = 64 * 1024 * 1024
+
+# Códigos mantidos como texto para preservar zeros à esquerda
+_CODIGOS_NCM = {
+    "CO_NCM": pa.string(),
+    "CO_UNID": pa.string(),
+    "CO_PAIS": pa.string(),
+    "SG_UF_NCM": pa.string(),
+    "CO_VIA": pa.string(),
+    "CO_URF": pa.string(),
+}
+
+_VALORES = {
+    "QT_ESTAT": pa.float64(),
+    "KG_LIQUIDO": pa.float64(),
+    "VL_FOB": pa.float64(),
+    "VL_FRETE": pa.float64(),
+    "VL_SEGURO": pa.float64(),
+}
+
+_PERIODO = {
+    "CO_ANO": pa.int16(),
+    "CO_MES": pa.int16(),
+}
+
+_MUN = {
+    "coluna_uf": "SG_UF_MUN",
+    "coluna_produto": ("SH4", 4),
+    "tipos": {**_PERIODO, **_VALORES, "SH4": pa.string(), "SG_UF_MUN": pa.string(),
+              "CO_PAIS": pa.int32(), "CO_MUN": pa.int32()},
+}
+
+# Definição de cada tipo de arquivo bruto:
+#   coluna_uf: coluna usada na partição por estado
+#   coluna_produto: código do produto (zero-fill aplicado na conversão)
+#   tipos: tipos das colunas conhecidas (as demais são inferidas)
+TIPOS_ARQUIVO = {
+    "exp": {
+        "padrao": re.compile(r"^EXP_(\d{4})\.csv$", re.IGNORECASE),
+        "coluna_uf": "SG_UF_NCM",
+        "coluna_produto": ("CO_NCM", 8),
+        "tipos": {**_PERIODO, **_CODIGOS_NCM, **_VALORES},
+    },
+    "imp": {
+        "padrao": re.compile(r"^IMP_(\d{4})\.csv$", re.IGNORECASE),
+        "coluna_uf": "SG_UF_NCM",
+        "coluna_produto": ("CO_NCM", 8),
+        "tipos": {**_PERIODO, **_CODIGOS_NCM, **_VALORES},
+    },
+    # Arquivos MUN: cada origem tem o seu tipo (e diretório no cache), para que
+    # EXP_YYYY_MUN.csv (download_municipios, data/raw_mun) e exp_mun_YYYY.csv
+    # (download_unified, data/raw) não disputem a mesma partição
+    "exp_mun": {
+        "padrao": re.compile(r"^EXP_(\d{4})_MUN\.csv$", re.IGNORECASE),
+        **_MUN,
+    },
+    "imp_mun": {
+        "padrao": re.compile(r"^IMP_(\d{4})_MUN\.csv$", re.IGNORECASE),
+        **_MUN,
+    },
+    "exp_mun_unificado": {
+        "padrao": re.compile(r"^exp_mun_(\d{4})\.csv$", re.IGNORECASE),
+        **_MUN,
+    },
+    "imp_mun_unificado": {
+        "padrao": re.compile(r"^imp_mun_(\d{4})\.csv$", re.IGNORECASE),
+        **_MUN,
+    },
+}
+
+
+def _particionamento(tipo: str) -> ds.Partitioning:
+    """Particionamento hive (ano, UF) do cache de um tipo de arquivo."""
+    coluna_uf = TIPOS_ARQUIVO[tipo]["coluna_uf"]
+    return ds.partitioning(
+        pa.schema([("CO_ANO", pa.int16()), (coluna_uf, pa.string())]),
+        flavor="hive",
+    )
+
+
+def _diretorio_ano(tipo: str, ano: int) -> Path:
+    return CACHE_DIR / tipo / f"CO_ANO={ano}"
+
+
+def _assinatura_csv(csv_path: Path) -> dict:
+    stat = csv_path.stat()
+    return {"tamanho": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def cache_atualizado(csv_path, tipo: str, ano: int) -> bool:
+    """
+    Verifica se o cache de um ano corresponde ao CSV de origem.
+
+    Args:
+        csv_path: Caminho do CSV bruto
+        tipo: Tipo de arquivo (chave de TIPOS_ARQUIVO)
+        ano: Ano do arquivo
+
+    Returns:
+        True se o cache existe e foi gerado a partir do mesmo CSV
+    """
+    marcador = _diretorio_ano(tipo, ano) / "_origem.json"
+    if not marcador.exists():
+        return False
+    try:
+        with open(marcador, 'r', encoding='utf-8') as f:
+            origem = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return origem.get("csv") == _assinatura_csv(Path(csv_path))
+
+
+def _lotes_normalizados(reader, tipo: str):
+    """Adiciona SH4/CAPITULO e aplica zero-fill no código do produto, lote a lote."""
+    coluna_produto, largura = TIPOS_ARQUIVO[tipo]["coluna_produto"]
+
+    for lote in reader:
+        tabela = pa.Table.from_batches([lote])
+        produto = pc.utf8_lpad(pc.utf8_trim_whitespace(tabela[coluna_produto]),
+                               width=largura, padding="0")
+        tabela = tabela.set_column(tabela.schema.get_field_index(coluna_produto),
+                                   coluna_produto, produto)
+        sh4 = pc.utf8_slice_codeunits(produto, 0, 4)
+        if "SH4" not in tabela.column_names:
+            tabela = tabela.append_column("SH4", sh4)
+        capitulo = pc.cast(pc.utf8_slice_codeunits(produto, 0, 2), pa.int16())
+        tabela = tabela.append_column("CAPITULO", capitulo)
+        yield from tabela.to_batches()
+
+
+def converter_csv(csv_path, tipo: str, ano: int, forcar: bool = False) -> Path:
+    """
+    Converte um CSV anual para o cache parquet particionado por ano/UF.
+
+    A leitura é feita em blocos (streaming), sem materializar o CSV inteiro.
+
+    Args:
+        csv_path: Caminho do CSV bruto
+        tipo: Tipo de arquivo (chave de TIPOS_ARQUIVO)
+        ano: Ano do arquivo
+        forcar: Reconverte mesmo se o cache estiver atualizado
+
+    Returns:
+        Diretório do ano no cache
+    """
+    csv_path = Path(csv_path)
+    destino = _diretorio_ano(tipo, ano)
+
+    if not forcar and cache_atualizado(csv_path, tipo, ano):
+        return destino
+
+    print(f"  Convertendo {csv_path} -> {destino}")
+    definicao = TIPOS_ARQUIVO[tipo]
+
+    reader = pv.open_csv(
+        csv_path,
+        read_options=pv.ReadOptions(encoding="latin1", block_size=BLOCK_SIZE),
+        parse_options=pv.ParseOptions(delimiter=";"),
+        convert_options=pv.ConvertOptions(column_types=definicao["tipos"]),
+    )
+
+    # Esquema de saída: colunas do CSV + SH4/CAPITULO derivados
+    esquema = reader.schema
+    if "SH4" not in esquema.names:
+        esquema = esquema.append(pa.field("SH4", pa.string()))
+    esquema = esquema.append(pa.field("CAPITULO", pa.int16()))
+    lotes = pa.RecordBatchReader.from_batches(esquema, _lotes_normalizados(reader, tipo))
+
+    if destino.exists():
+        shutil.rmtree(destino)
+
+    ds.write_dataset(
+        lotes,
+        CACHE_DIR / tipo,
+        format="parquet",
+        partitioning=_particionamento(tipo),
+        basename_template="part-{i}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+
+    with open(destino / "_origem.json", 'w', encoding='utf-8') as f:
+        json.dump({"csv": _assinatura_csv(csv_path), "colunas": esquema.names}, f)
+
+    return destino
+
+
+def _colunas_originais(tipo: str) -> list:
+    """Ordem das colunas do CSV (as partições ano/UF voltam à posição original)."""
+    for marcador in sorted((CACHE_DIR / tipo).glob("CO_ANO=*/_origem.json"), reverse=True):
+        try:
+            with open(marcador, 'r', encoding='utf-8') as f:
+                return json.load(f).get("colunas")
+        except (OSError, ValueError):
+            continue
+    return None
+
+
+def ler_cache(tipo: str, anos: list = None, ufs: list = None,
+              filtro: pc.Expression = None, colunas: list = None) -> pd.DataFrame:
+    """
+    Lê o cache aplicando os filtros durante a leitura.
+
+    Os filtros de ano e UF eliminam partições inteiras; os demais são
+    avaliados por row group, sem carregar o restante dos dados.
+
+    Args:
+        tipo: Tipo de arquivo (chave de TIPOS_ARQUIVO)
+        anos: Anos a carregar. Se None, todos os anos do cache.
+        ufs: Siglas das UFs. Se None, todos os estados.
+        filtro: Expressão pyarrow adicional (ex: filtro_capitulos(...))
+        colunas: Colunas a retornar (as ausentes no cache são ignoradas).
+            Se None, todas.
+
+    Returns:
+        DataFrame filtrado (vazio se não houver cache)
+    """
+    base = CACHE_DIR / tipo
+    if not base.exists():
+        return pd.DataFrame(columns=colunas or [])
+
+    coluna_uf = TIPOS_ARQUIVO[tipo]["coluna_uf"]
+    dataset = ds.dataset(base, format="parquet", partitioning=_particionamento(tipo))
+    if colunas is None:
+        colunas = _colunas_originais(tipo)
+    colunas = [c for c in colunas if c in dataset.schema.names] if colunas else None
+
+    expressao = None
+    if anos is not None:
+        expressao = pc.field("CO_ANO").isin([int(a) for a in anos])
+    if ufs is not None:
+        cond = pc.field(coluna_uf).isin(list(ufs))
+        expressao = cond if expressao is None else expressao & cond
+    if filtro is not None:
+        expressao = filtro if expressao is None else expressao & filtro
+
+    tabela = dataset.to_table(columns=colunas, filter=expressao)
+    return tabela.to_pandas()
+
+
+def filtro_capitulos(capitulos: list, posicoes: list = None) -> pc.Expression:
+    """
+    Expressão que seleciona capítulos inteiros e/ou posições SH4 específicas.
+
+    Args:
+        capitulos: Capítulos NCM (ex: [1, 2, ..., 24, 31])
+        posicoes: Posições SH4 adicionais (ex: ["3808"])
+
+    Returns:
+        Expressão pyarrow para usar em ler_cache
+    """
+    expressao = pc.field("CAPITULO").isin([int(c) for c in capitulos])
+    if posicoes:
+        expressao = expressao | pc.field("SH4").isin([str(p) for p in posicoes])
+    return expressao
+
+
+def garantir_cache(tipo: str, arquivos: dict, forcar: bool = False) -> list:
+    """
+    Converte para o cache os CSVs ainda não convertidos ou alterados.
+
+    Args:
+        tipo: Tipo de arquivo (chave de TIPOS_ARQUIVO)
+        arquivos: Dicionário {ano: caminho_csv}
+        forcar: Reconverte todos os arquivos
+
+    Returns:
+        Lista de anos disponíveis no cache
+    """
+    anos = []
+    for ano, csv_path in sorted(arquivos.items()):
+        csv_path = Path(csv_path)
+        if csv_path.exists():
+            converter_csv(csv_path, tipo, ano, forcar=forcar)
+            anos.append(ano)
+        elif (_diretorio_ano(tipo, ano) / "_origem.json").exists():
+            # CSV removido após a conversão: o cache continua válido
+            anos.append(ano)
+    return anos
+
+
+def localizar_csvs(diretorios: list = None) -> dict:
+    """
+    Localiza CSVs brutos nos diretórios de download.
+
+    Returns:
+        Dicionário {tipo: {ano: caminho}}
+    """
+    encontrados = {tipo: {} for tipo in TIPOS_ARQUIVO}
+    for diretorio in diretorios or DIRETORIOS_CSV:
+        diretorio = Path(diretorio)
+        if not diretorio.exists():
+            continue
+        for arquivo in sorted(diretorio.glob("*.csv")):
+            for tipo, definicao in TIPOS_ARQUIVO.items():
+                match = definicao["padrao"].match(arquivo.name)
+                if match:
+                    ano = int(next(g for g in match.groups() if g))
+                    encontrados[tipo].setdefault(ano, arquivo)
+                    break
+    return encontrados
+
+
+def main():
+    """Converte todos os CSVs brutos encontrados para o cache colunar."""
+    parser = argparse.ArgumentParser(description="Cache colunar dos CSVs do ComexStat")
+    parser.add_argument('--forcar', action='store_true',
+                        help='Reconverte mesmo se o cache estiver atualizado')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("CACHE COLUNAR DOS DADOS BRUTOS")
+    print("=" * 60)
+
+    for tipo, arquivos in localizar_csvs().items():
+        if not arquivos:
+            continue
+        print(f"\n{tipo}: {len(arquivos)} arquivo(s)")
+        garantir_cache(tipo, arquivos, forcar=args.forcar)
+
+    print(f"\nCache em: {CACHE_DIR}/")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""
+Construção do Sankey município -> país (sankey_data.json).
+
+Todas as seleções saem de um único agregado (cadeia, município, país):
+os top-k municípios e países da visão geral e de cada cadeia, e os maiores
+fluxos entre eles, são escolhidos por ordenação e posição dentro do grupo
+(sem laço por cadeia). Com CO_ANO nos registros, as mesmas seleções são
+feitas para cada ano e cada (ano, cadeia), no mesmo agregado. Formato:
+
+    {"nodes": [{"id": 0, "codigo": 4118204, "name": "Paranaguá", "type": "municipio"},
+               {"id": 12, "codigo": 160, "name": "China", "type": "pais"}, ...],
+     "links": [{"source": 0, "target": 12, "value": 1.2e9}, ...],
+     "linksByCadeia": [{"source": 0, "target": 12, "value": 8.1e8, "cadeia": 3}, ...],
+     "linksByAno": [{"source": 0, "target": 12, "value": 2.3e8, "ano": 2024}, ...],
+     "linksByAnoCadeia": [{"source": 0, "target": 12, "value": 1.6e8, "ano": 2024, "cadeia": 3}, ...],
+     "cadeias": ["Avicultura", ...],
+     "anos": [2020, ..., 2025]}
+
+Os nós são únicos (um por município/país, compartilhados por todas as
+visões) e referenciados pelo id inteiro; cada par de nós aparece uma vez
+por visão. "cadeia" é o id da cadeia (ver dimensoes.py).
+
+O layout de cada visão (geral e uma por cadeia) é calculado aqui, em um
+tamanho de referência, e gravado em sankey_layout.json: posição dos nós e
+as ordenadas de entrada/saída e largura de cada link. O SankeyChart.jsx só
+escala e desenha, sem rodar o layout no navegador:
+
+    {"largura": 1000, "altura": 500, "espessura": 18,
+     "visoes": {"geral": {"nos": [{"id": 0, "x0": 160, "y0": 20.0, "x1": 178, "y1": 61.3}, ...],
+                          "links": [{"source": 0, "target": 12, "value": 1.2e9,
+                                     "y0": 40.6, "y1": 33.1, "largura": 41.3}, ...]},
+                "3": {...}},          # id da cadeia
+     "anos": {"2024": {"geral": {...}, "3": {...}}, ...}}
+
+Usado por process_unified.py, update_municipios.py,
+update_sankey_with_cadeia.py e download_municipios.py.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from dimensoes import ids_cadeias
+from serializacao import escrever_json, registros, tabela
+
+OUTPUT_DIR = Path("dashboard/public/data")
+
+# Visão geral: top municípios x top países e os maiores fluxos entre eles
+TOP_MUNICIPIOS = 12
+TOP_PAISES = 12
+TOP_LINKS = 80
+
+# Por cadeia
+TOP_MUNICIPIOS_CADEIA = 5
+TOP_PAISES_CADEIA = 5
+TOP_LINKS_CADEIA = 10
+
+# Layout de referência (mesmas medidas do SankeyChart.jsx)
+LARGURA_LAYOUT = 1000
+ALTURA_LAYOUT = 500
+MARGEM_LAYOUT = {"topo": 20, "direita": 160, "base": 20, "esquerda": 160}
+ESPESSURA_NO = 18
+ESPACO_NO = 24
+
+
+def top_k(df, grupo, valor, k):
+    """
+    Linhas com os k maiores valores de cada grupo, em ordem decrescente.
+
+    Equivale a nlargest(k) por grupo (empates pela ordem atual das linhas),
+    com uma ordenação estável e a posição de cada linha no grupo.
+    """
+    if not grupo:
+        return df.sort_values(valor, ascending=False, kind='stable').head(k)
+    ordenado = df.sort_values(grupo + [valor], ascending=[True] * len(grupo) + [False], kind='stable')
+    return ordenado[ordenado.groupby(grupo, sort=False).cumcount() < k]
+
+
+def _nomes(df, codigo, nome):
+    """Nome de cada código (o primeiro encontrado; o próprio código sem a coluna)."""
+    if nome not in df.columns:
+        return {c: str(c) for c in df[codigo].unique()}
+    return df.groupby(codigo, sort=False)[nome].first().to_dict()
+
+
+def _fluxos(base, grupo, k_mun, k_pais, k_links):
+    """Maiores fluxos entre os top municípios e top países de cada grupo (base já agregada)."""
+    chaves = grupo + ['CO_MUN', 'CO_PAIS']
+    top_mun = top_k(base.groupby(grupo + ['CO_MUN'], as_index=False)['VL_FOB'].sum(),
+                    grupo, 'VL_FOB', k_mun)
+    top_pais = top_k(base.groupby(grupo + ['CO_PAIS'], as_index=False)['VL_FOB'].sum(),
+                     grupo, 'VL_FOB', k_pais)
+
+    fluxos = (base
+              .merge(top_mun[grupo + ['CO_MUN']], on=grupo + ['CO_MUN'])
+              .merge(top_pais[grupo + ['CO_PAIS']], on=grupo + ['CO_PAIS'])
+              .sort_values(chaves, kind='stable'))
+    return top_k(fluxos, grupo, 'VL_FOB', k_links)
+
+
+def construir_sankey(df,
+                     top_municipios=TOP_MUNICIPIOS, top_paises=TOP_PAISES, top_links=TOP_LINKS,
+                     top_municipios_cadeia=TOP_MUNICIPIOS_CADEIA, top_paises_cadeia=TOP_PAISES_CADEIA,
+                     top_links_cadeia=TOP_LINKS_CADEIA):
+    """
+    Gera os dados do Sankey a partir dos registros de exportação.
+
+    Args:
+        df: Registros com CO_MUN, CO_PAIS e VL_FOB; NO_MUN e NO_PAIS (nomes)
+            e CADEIA (linksByCadeia) são opcionais
+        top_*: Tamanhos das seleções da visão geral e de cada cadeia
+
+    Returns:
+        dict no formato de sankey_data.json
+    """
+    por_cadeia = 'CADEIA' in df.columns
+    por_ano = 'CO_ANO' in df.columns
+    grupos = (['CO_ANO'] if por_ano else []) + (['CADEIA'] if por_cadeia else [])
+
+    # Agregado único: todas as seleções abaixo partem dele
+    base = df.groupby(grupos + ['CO_MUN', 'CO_PAIS'], sort=True, observed=True,
+                      as_index=False)['VL_FOB'].sum()
+
+    def selecao(grupo, k_mun, k_pais, k_links):
+        agregado = base
+        if grupo != grupos:
+            agregado = base.groupby(grupo + ['CO_MUN', 'CO_PAIS'], as_index=False)['VL_FOB'].sum()
+        return _fluxos(agregado, grupo, k_mun, k_pais, k_links)
+
+    vazio = base.iloc[:0]
+    links = selecao([], top_municipios, top_paises, top_links)
+    links_cadeia = links_ano = links_ano_cadeia = vazio
+    if por_cadeia:
+        links_cadeia = selecao(['CADEIA'], top_municipios_cadeia, top_paises_cadeia, top_links_cadeia)
+    if por_ano:
+        links_ano = selecao(['CO_ANO'], top_municipios, top_paises, top_links)
+    if por_ano and por_cadeia:
+        links_ano_cadeia = selecao(['CO_ANO', 'CADEIA'], top_municipios_cadeia, top_paises_cadeia,
+                                   top_links_cadeia)
+
+    # Nós usados por alguma visão: municípios e depois países, por nome
+    nome_mun = _nomes(df, 'CO_MUN', 'NO_MUN')
+    nome_pais = _nomes(df, 'CO_PAIS', 'NO_PAIS')
+    usados = pd.concat([links, links_cadeia, links_ano, links_ano_cadeia])
+    nodes = pd.concat([
+        pd.DataFrame({'codigo': usados['CO_MUN'].unique(), 'type': 'municipio'})
+          .assign(name=lambda d: d['codigo'].map(nome_mun)),
+        pd.DataFrame({'codigo': usados['CO_PAIS'].unique(), 'type': 'pais'})
+          .assign(name=lambda d: d['codigo'].map(nome_pais)),
+    ])
+    nodes = nodes.sort_values(['type', 'name', 'codigo'], kind='stable', ignore_index=True)
+    nodes['id'] = nodes.index
+    indice = {tipo: dict(zip(grupo['codigo'], grupo['id'])) for tipo, grupo in nodes.groupby('type')}
+
+    def enlaces(fluxos):
+        return pd.DataFrame({
+            'source': fluxos['CO_MUN'].map(indice.get('municipio', {})).to_numpy(dtype='int64'),
+            'target': fluxos['CO_PAIS'].map(indice.get('pais', {})).to_numpy(dtype='int64'),
+            'value': fluxos['VL_FOB'].astype(float).to_numpy(),
+        })
+
+    def por_grupo(fluxos, ano, cadeia):
+        tabela_df = enlaces(fluxos)
+        if ano:
+            tabela_df['ano'] = fluxos['CO_ANO'].to_numpy(dtype='int64')
+        if cadeia:
+            tabela_df['cadeia'] = ids_cadeias(fluxos['CADEIA'] if por_cadeia else [])
+        return tabela_df
+
+    links_cadeia_df = por_grupo(links_cadeia, False, True)
+
+    cadeias = sorted(df['CADEIA'].dropna().unique().tolist()) if por_cadeia else []
+    n_mun = int((nodes['type'] == 'municipio').sum())
+    print(f"  Nodes: {len(nodes)} ({n_mun} mun + {len(nodes) - n_mun} países)")
+    print(f"  Links (total): {len(links)}")
+    print(f"  Links (por cadeia): {len(links_cadeia_df)} "
+          f"({links_cadeia_df['cadeia'].nunique()} de {len(cadeias)} cadeias)")
+
+    sankey_data = {
+        'nodes': registros(nodes, ['id', 'codigo', 'name', 'type']),
+        'links': registros(enlaces(links)),
+        'linksByCadeia': tabela(links_cadeia_df),
+        'cadeias': cadeias,
+    }
+    if por_ano:
+        anos = sorted(int(ano) for ano in base['CO_ANO'].unique())
+        sankey_data['linksByAno'] = tabela(por_grupo(links_ano, True, False))
+        sankey_data['linksByAnoCadeia'] = tabela(por_grupo(links_ano_cadeia, True, por_cadeia))
+        sankey_data['anos'] = anos
+        print(f"  Links (por ano): {len(links_ano)} + {len(links_ano_cadeia)} por cadeia "
+              f"({len(anos)} anos)")
+    return sankey_data
+
+
+
+def _tabela_df(dados):
+    """DataFrame de uma tabela de construir_sankey (Registros/Colunar ou lista de dicts)."""
+    return dados.df if hasattr(dados, 'df') else pd.DataFrame(list(dados))
+
+
+def _coluna(nos, links, tipo, campo):
+    """Nós de uma coluna (municípios ou países) com o valor, maiores primeiro."""
+    valores = links.groupby(campo)['value'].sum()
+    coluna = nos[nos['type'] == tipo].set_index('id')[[]].join(valores.rename('valor'), how='inner')
+    return coluna.sort_values('valor', ascending=False, kind='stable')
+
+
+def layout_sankey(nos, links, largura=LARGURA_LAYOUT, altura=ALTURA_LAYOUT):
+    """
+    Layout de duas colunas (municípios -> países), como o do d3-sankey.
+
+    A escala vertical é a mesma para as duas colunas (a mais cheia ocupa a
+    altura útil); a sobra da outra é distribuída entre os espaços. Os nós são
+    ordenados por valor e os links saem/chegam na ordem vertical da outra
+    ponta, sem cruzar dentro do nó.
+
+    Args:
+        nos: DataFrame com id e type
+        links: DataFrame com source, target e value
+
+    Returns:
+        dict com "nos" (id, x0, y0, x1, y1) e "links" (source, target, value,
+        y0, y1 e largura)
+    """
+    if len(links) == 0:
+        return {"nos": [], "links": []}
+
+    topo = MARGEM_LAYOUT["topo"]
+    util = altura - topo - MARGEM_LAYOUT["base"]
+    colunas = [
+        (_coluna(nos, links, 'municipio', 'source'), MARGEM_LAYOUT["esquerda"]),
+        (_coluna(nos, links, 'pais', 'target'), largura - MARGEM_LAYOUT["direita"] - ESPESSURA_NO),
+    ]
+    maior = max(len(coluna) for coluna, _ in colunas)
+    espaco = min(ESPACO_NO, util / (maior - 1)) if maior > 1 else ESPACO_NO
+    ky = min((util - (len(coluna) - 1) * espaco) / coluna['valor'].sum() for coluna, _ in colunas)
+
+    posicoes = []
+    for coluna, x0 in colunas:
+        alturas = coluna['valor'].to_numpy() * ky
+        y0 = topo + np.r_[0, np.cumsum(alturas + espaco)[:-1]]
+        # Sobra da coluna distribuída igualmente entre os espaços (como no d3-sankey)
+        sobra = (util - alturas.sum() - espaco * (len(coluna) - 1)) / (len(coluna) + 1)
+        y0 = y0 + sobra * np.arange(1, len(coluna) + 1)
+        posicoes.append(pd.DataFrame({
+            'id': coluna.index.to_numpy(), 'x0': x0, 'y0': y0, 'x1': x0 + ESPESSURA_NO, 'y1': y0 + alturas,
+        }))
+    posicoes = pd.concat(posicoes, ignore_index=True)
+
+    topo_no = posicoes.set_index('id')['y0']
+    enlaces = links[['source', 'target', 'value']].copy()
+    enlaces['largura'] = enlaces['value'] * ky
+    enlaces['_ys'] = enlaces['source'].map(topo_no)
+    enlaces['_yt'] = enlaces['target'].map(topo_no)
+
+    def ordenadas(no, outra):
+        # Centro de cada link na borda do nó, na ordem vertical da outra ponta
+        ordem = enlaces.sort_values([no, outra], kind='stable')
+        inicio = ordem.groupby(no)['largura'].cumsum() - ordem['largura']
+        return (ordem[no].map(topo_no) + inicio + ordem['largura'] / 2).reindex(enlaces.index)
+
+    enlaces['y0'] = ordenadas('source', '_yt')
+    enlaces['y1'] = ordenadas('target', '_ys')
+    enlaces = enlaces.sort_values('value', ascending=False, kind='stable')
+
+    return {
+        "nos": registros(posicoes.round(2)),
+        "links": registros(enlaces[['source', 'target', 'value', 'y0', 'y1', 'largura']].round(
+            {'y0': 2, 'y1': 2, 'largura': 2})),
+    }
+
+
+def _visoes(nos, links, links_cadeia):
+    """Layout da visão geral e de cada cadeia (chave: id da cadeia como texto)."""
+    visoes = {"geral": layout_sankey(nos, links)}
+    if len(links_cadeia):
+        for cadeia, links in links_cadeia.groupby('cadeia', sort=True):
+            visoes[str(int(cadeia))] = layout_sankey(nos, links)
+    return visoes
+
+
+def layouts_sankey(sankey_data):
+    """Layouts de todas as visões: geral, por cadeia e, com anos, por ano e (ano, cadeia)."""
+    nos = _tabela_df(sankey_data['nodes'])
+    layouts = {
+        "largura": LARGURA_LAYOUT,
+        "altura": ALTURA_LAYOUT,
+        "espessura": ESPESSURA_NO,
+        "visoes": _visoes(nos, _tabela_df(sankey_data['links']),
+                          _tabela_df(sankey_data['linksByCadeia'])),
+    }
+    links_ano = _tabela_df(sankey_data.get('linksByAno', []))
+    if len(links_ano):
+        links_ano_cadeia = _tabela_df(sankey_data['linksByAnoCadeia'])
+        cadeia_do_ano = dict(tuple(links_ano_cadeia.groupby('ano'))) if len(links_ano_cadeia) else {}
+        layouts["anos"] = {
+            str(int(ano)): _visoes(nos, links, cadeia_do_ano.get(ano, links_ano_cadeia.iloc[:0]))
+            for ano, links in links_ano.groupby('ano', sort=True)
+        }
+    return layouts
+
+
+def salvar_sankey(sankey_data, output_dir=OUTPUT_DIR):
+    """Grava sankey_data.json e o layout pré-calculado (sankey_layout.json)."""
+    output_dir = Path(output_dir)
+    escrever_json(output_dir / "sankey_data.json", sankey_data, comprimir=True)
+    escrever_json(output_dir / "sankey_layout.json", layouts_sankey(sankey_data), comprimir=True)
+    print(f"Salvo: {output_dir / 'sankey_data.json'} (+ sankey_layout.json)")
@@ -0,0 +1,478 @@
+# -*- coding: utf-8 -*-
+"""
+Serialização JSON dos artefatos do dashboard.
+
+Substitui o par DataFrame.to_dict('records') + json.dump(cls=NumpyEncoder)
+usado pelos scripts. Tabelas são marcadas com registros(df) e codificadas
+coluna a coluna direto para bytes (DataFrame.to_json, em C), sem criar um
+dict Python por linha. O restante da estrutura é codificado com orjson,
+quando instalado, ou com o json da biblioteca padrão.
+
+Tipos numpy e NaN (-> null) são tratados nos dois caminhos. A saída é
+sempre compacta (sem indentação nem espaços).
+
+Tabelas grandes podem ser gravadas no formato colunar (config.FORMATO_COLUNAR,
+ver tabela()), decodificado por useData.js:
+
+    {"_formato": "colunar", "n": 2,
+     "strings": ["China", "Soja"],
+     "dicionario": ["pais", "cadeia"],
+     "colunas": {"pais": [0, 0], "cadeia": [1, 1], "valor": [10.5, 3.0]}}
+
+Colunas listadas em "dicionario" guardam índices na tabela "strings"
+(-1 para nulo); as demais guardam os próprios valores.
+
+escrever_json grava em streaming: seções e tabelas vão direto para um
+arquivo temporário (tabelas em lotes de LINHAS_LOTE linhas), que só
+substitui o artefato se o conteúdo mudou. Nem o artefato inteiro em bytes nem
+um dict por linha ficam em memória. Para tabelas e seções que também não
+precisam existir inteiras antes da gravação:
+
+    lotes(fabrica)    tabela gravada a partir de lotes (DataFrames ou listas
+                      de dicts), gerados sob demanda
+    secoes(fabrica)   objeto cujas seções (chave, valor) são geradas uma a
+                      uma e descartadas depois de gravadas
+
+Uso:
+    from serializacao import registros, escrever_json
+
+    escrever_json(caminho, {"paises": registros(df_paises), "total": total})
+"""
+
+import filecmp
+import io
+import json
+import math
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Casas decimais dos floats nas tabelas (DataFrame.to_json aceita até 15)
+PRECISAO_FLOAT = 10
+
+# Linhas serializadas por vez ao gravar uma tabela
+LINHAS_LOTE = 50_000
+
+
+class Registros:
+    """Tabela a ser serializada como lista de objetos (uma por linha)."""
+
+    __slots__ = ('df',)
+
+    def __init__(self, df):
+        self.df = df
+
+    def __len__(self):
+        return len(self.df)
+
+
+def registros(df, colunas=None):
+    """
+    Marca um DataFrame para serialização como lista de registros.
+
+    Equivale a df[colunas].to_dict('records') na saída JSON.
+
+    Args:
+        df: DataFrame
+        colunas: Colunas a incluir, na ordem (padrão: todas)
+
+    Returns:
+        Registros
+    """
+    if colunas is not None:
+        df = df[colunas]
+    return Registros(df)
+
+
+class Colunar:
+    """Tabela a ser serializada no formato colunar."""
+
+    __slots__ = ('df',)
+
+    def __init__(self, df):
+        self.df = df
+
+    def __len__(self):
+        return len(self.df)
+
+
+def colunar(dados, colunas=None):
+    """
+    Marca uma tabela para serialização no formato colunar.
+
+    Args:
+        dados: DataFrame ou lista de dicts
+        colunas: Colunas a incluir, na ordem (padrão: todas)
+
+    Returns:
+        Colunar
+    """
+    if isinstance(dados, Lotes):
+        df = dados.df
+    else:
+        df = dados if isinstance(dados, pd.DataFrame) else pd.DataFrame(list(dados))
+    if colunas is not None:
+        df = df[colunas]
+    return Colunar(df)
+
+
+def tabela(dados, colunas=None):
+    """
+    Marca uma tabela grande no formato configurado em config.FORMATO_COLUNAR.
+
+    No formato colunar, tabelas em lotes() são reunidas antes da gravação.
+
+    Args:
+        dados: DataFrame, lista de dicts ou Lotes
+        colunas: Colunas a incluir, na ordem (padrão: todas)
+
+    Returns:
+        Colunar, Registros, Lotes ou a própria lista de dicts (formato padrão)
+    """
+    if config.FORMATO_COLUNAR:
+        return colunar(dados, colunas)
+    if isinstance(dados, pd.DataFrame):
+        return registros(dados, colunas)
+    if isinstance(dados, Lotes) and colunas is not None:
+        return Lotes(dados.fabrica, colunas)
+    return dados
+
+
+class Lotes:
+    """Tabela gravada como lista de objetos a partir de lotes gerados sob demanda."""
+
+    __slots__ = ('fabrica', 'colunas')
+
+    def __init__(self, fabrica, colunas=None):
+        self.fabrica = fabrica
+        self.colunas = colunas
+
+    def __iter__(self):
+        lotes = self.fabrica() if callable(self.fabrica) else self.fabrica
+        for lote in lotes:
+            if isinstance(lote, pd.DataFrame):
+                yield lote if self.colunas is None else lote[self.colunas]
+            else:
+                lote = list(lote)
+                if self.colunas is not None:
+                    lote = [{c: r.get(c) for c in self.colunas} for r in lote]
+                yield lote
+
+    @property
+    def df(self):
+        """Todos os lotes em um único DataFrame (Arrow e formato colunar)."""
+        partes = [l if isinstance(l, pd.DataFrame) else pd.DataFrame(l) for l in self]
+        partes = [p for p in partes if len(p)]
+        if not partes:
+            return pd.DataFrame(columns=self.colunas)
+        return pd.concat(partes, ignore_index=True)
+
+
+def lotes(fabrica, colunas=None):
+    """
+    Marca uma tabela gerada em lotes para serialização como lista de registros.
+
+    Os lotes são percorridos durante a gravação e descartados em seguida, então
+    a tabela inteira nunca existe em memória.
+
+    Args:
+        fabrica: Função sem argumentos que retorna um iterador de lotes
+            (pode ser chamada mais de uma vez, ex.: JSON e Arrow), ou um
+            iterável (percorrido uma única vez). Cada lote é um DataFrame ou
+            uma lista de dicts.
+        colunas: Colunas a incluir, na ordem (padrão: todas)
+
+    Returns:
+        Lotes
+    """
+    return Lotes(fabrica, colunas)
+
+
+class Secoes:
+    """Objeto JSON cujas seções são geradas durante a gravação."""
+
+    __slots__ = ('fabrica',)
+
+    def __init__(self, fabrica):
+        self.fabrica = fabrica
+
+    def items(self):
+        return self.fabrica() if callable(self.fabrica) else self.fabrica
+
+
+def secoes(fabrica):
+    """
+    Marca um objeto gerado seção por seção.
+
+    Args:
+        fabrica: Função sem argumentos que retorna um iterador de pares
+            (chave, valor), ou um iterável desses pares
+
+    Returns:
+        Secoes
+    """
+    return Secoes(fabrica)
+
+
+def expandir(obj):
+    """
+    Converte blocos colunares de um artefato já carregado em listas de dicts.
+
+    Percorre apenas dicts, como dumps(); outros valores são mantidos.
+    """
+    if isinstance(obj, dict):
+        if obj.get('_formato') == 'colunar':
+            colunas = obj['colunas']
+            strings = obj['strings']
+            for campo in obj['dicionario']:
+                colunas[campo] = [strings[i] if i >= 0 else None for i in colunas[campo]]
+            campos = list(colunas)
+            return [dict(zip(campos, valores)) for valores in zip(*colunas.values())]
+        return {k: expandir(v) for k, v in obj.items()}
+    return obj
+
+
+def _padrao(obj):
+    """Tipos que nem orjson nem json codificam por conta própria."""
+    if isinstance(obj, Registros):
+        return obj.df.to_dict('records')
+    if isinstance(obj, (Colunar, Lotes, Secoes)):
+        return json.loads(dumps(obj))
+    if isinstance(obj, np.integer):
+        return int(obj)
+    if isinstance(obj, np.floating):
+        return None if np.isnan(obj) else float(obj)
+    if isinstance(obj, np.bool_):
+        return bool(obj)
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if obj is pd.NA or obj is pd.NaT:
+        return None
+    raise TypeError(f"Tipo não serializável: {type(obj).__name__}")
+
+
+def _sem_nan(obj):
+    """Troca NaN por None em floats soltos (o json padrão escreveria NaN)."""
+    if isinstance(obj, float) and math.isnan(obj):
+        return None
+    if isinstance(obj, dict):
+        return {k: _sem_nan(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_sem_nan(v) for v in obj]
+    return obj
+
+
+def _dumps_valor(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=_padrao,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    texto = json.dumps(_sem_nan(obj), default=_padrao, ensure_ascii=False,
+                       separators=(',', ':'))
+    return texto.encode('utf-8')
+
+
+def _escrever_df(df, saida, inicio=True):
+    """Escreve as linhas de um DataFrame como objetos JSON, em lotes."""
+    for i in range(0, len(df), LINHAS_LOTE):
+        texto = df.iloc[i:i + LINHAS_LOTE].to_json(orient='records', force_ascii=False,
+                                                    double_precision=PRECISAO_FLOAT)
+        if not inicio:
+            saida.write(b',')
+        saida.write(texto[1:-1].encode('utf-8'))
+        inicio = False
+    return inicio
+
+
+def _escrever_tabela(tabela, saida):
+    saida.write(b'[')
+    _escrever_df(tabela.df, saida)
+    saida.write(b']')
+
+
+def _escrever_lotes(tabela: Lotes, saida):
+    saida.write(b'[')
+    inicio = True
+    for lote in tabela:
+        if isinstance(lote, pd.DataFrame):
+            inicio = _escrever_df(lote, saida, inicio)
+        elif lote:
+            if not inicio:
+                saida.write(b',')
+            saida.write(_dumps_valor(lote)[1:-1])
+            inicio = False
+    saida.write(b']')
+
+
+def _escrever_colunar(tabela: Colunar, saida):
+    df = tabela.df
+    dicionario = [
+        c for c in df.columns
+        if not (pd.api.types.is_numeric_dtype(df[c]) or pd.api.types.is_bool_dtype(df[c]))
+    ]
+
+    colunas = {}
+    strings = []
+    if dicionario:
+        # Uma única tabela de strings para todas as colunas de texto
+        codigos, strings = pd.factorize(pd.concat([df[c] for c in dicionario], ignore_index=True))
+        strings = strings.tolist()
+        for i, c in enumerate(dicionario):
+            colunas[c] = pd.Series(codigos[i * len(df):(i + 1) * len(df)])
+
+    saida.write(b'{"_formato":"colunar","n":' + str(len(df)).encode('ascii'))
+    saida.write(b',"strings":' + _dumps_valor(strings))
+    saida.write(b',"dicionario":' + _dumps_valor([str(c) for c in dicionario]))
+    saida.write(b',"colunas":{')
+    for i, c in enumerate(df.columns):
+        serie = colunas.pop(c, df[c])
+        valores = serie.to_json(orient='values', double_precision=PRECISAO_FLOAT)
+        saida.write((b',' if i else b'') + _dumps_valor(str(c)) + b':' + valores.encode('utf-8'))
+    saida.write(b'}}')
+
+
+def escrever(obj, saida):
+    """
+    Escreve um artefato em JSON compacto (UTF-8) em um arquivo binário aberto.
+
+    Dicts e Secoes são percorridos para encontrar tabelas (Registros, Colunar,
+    Lotes); qualquer outro valor é codificado de uma vez.
+    """
+    if isinstance(obj, Registros):
+        _escrever_tabela(obj, saida)
+    elif isinstance(obj, Colunar):
+        _escrever_colunar(obj, saida)
+    elif isinstance(obj, Lotes):
+        _escrever_lotes(obj, saida)
+    elif isinstance(obj, (dict, Secoes)):
+        saida.write(b'{')
+        for i, (k, v) in enumerate(obj.items()):
+            saida.write((b',' if i else b'') + _dumps_valor(str(k)) + b':')
+            escrever(v, saida)
+        saida.write(b'}')
+    else:
+        saida.write(_dumps_valor(obj))
+
+
+def dumps(obj) -> bytes:
+    """Codifica um artefato em JSON compacto (UTF-8), em memória (ver escrever)."""
+    saida = io.BytesIO()
+    escrever(obj, saida)
+    return saida.getvalue()
+
+
+def gravar_se_mudou(caminho, conteudo: bytes) -> bool:
+    """
+    Grava bytes em um arquivo apenas se o conteúdo mudou.
+
+    Manter o arquivo intacto preserva caches (navegador, CDN, git) quando uma
+    regeneração produz os mesmos bytes.
+
+    Returns:
+        True se o arquivo foi (re)gravado
+    """
+    caminho = Path(caminho)
+    if (caminho.exists() and caminho.stat().st_size == len(conteudo)
+            and caminho.read_bytes() == conteudo):
+        return False
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+    return True
+
+
+def substituir_se_mudou(temporario, caminho) -> bool:
+    """
+    Move um arquivo temporário para caminho apenas se o conteúdo mudou.
+
+    A comparação é feita em blocos, sem carregar os arquivos inteiros; sem
+    mudança, o temporário é removido e caminho fica intacto (ver gravar_se_mudou).
+
+    Returns:
+        True se o arquivo foi (re)gravado
+    """
+    caminho = Path(caminho)
+    if caminho.exists() and filecmp.cmp(temporario, caminho, shallow=False):
+        os.remove(temporario)
+        return False
+    os.replace(temporario, caminho)
+    return True
+
+
+def escrever_arrow(caminho, tabela, comprimir=False) -> int:
+    """
+    Grava uma tabela em Apache Arrow IPC (formato de arquivo), sem regravar
+    se o conteúdo não mudou.
+
+    Colunas de texto são gravadas com dictionary encoding. O corpo não é
+    comprimido (o leitor apache-arrow do navegador não suporta LZ4/ZSTD);
+    a compressão fica com os irmãos .gz/.br.
+
+    Args:
+        caminho: Arquivo de destino (.arrow)
+        tabela: DataFrame, Registros, Colunar ou Lotes (os lotes são reunidos)
+        comprimir: Gera também os irmãos .gz/.br
+
+    Returns:
+        Tamanho do arquivo em bytes
+    """
+    import pyarrow as pa
+
+    df = tabela.df if isinstance(tabela, (Registros, Colunar, Lotes)) else tabela
+    dados = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    dados = dados.combine_chunks()  # um único record batch, mesmo com lotes reunidos
+    for i, campo in enumerate(dados.schema):
+        if pa.types.is_string(campo.type) or pa.types.is_large_string(campo.type):
+            coluna = dados.column(i).cast(pa.string()).dictionary_encode()
+            dados = dados.set_column(i, campo.name, coluna)
+
+    buffer = pa.BufferOutputStream()
+    with pa.ipc.new_file(buffer, dados.schema) as escritor:
+        escritor.write_table(dados)
+    conteudo = buffer.getvalue().to_pybytes()
+
+    gravar_se_mudou(caminho, conteudo)
+    if comprimir:
+        from compressao import comprimir as comprimir_artefato
+        comprimir_artefato(caminho)
+    return len(conteudo)
+
+
+def escrever_json(caminho, obj, comprimir=False) -> int:
+    """
+    Grava um artefato JSON compacto (sem regravar se o conteúdo não mudou).
+
+    A gravação é em streaming, para um arquivo temporário ao lado do destino.
+
+    Args:
+        caminho: Arquivo de destino
+        obj: Estrutura com dicts, listas, escalares, registros(df), lotes()
+            e secoes()
+        comprimir: Gera também os irmãos .gz/.br (artefatos do dashboard)
+
+    Returns:
+        Tamanho do arquivo em bytes
+    """
+    caminho = Path(caminho)
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    temporario = caminho.with_name(caminho.name + '.tmp')
+    try:
+        with open(temporario, 'wb') as f:
+            escrever(obj, f)
+        tamanho = temporario.stat().st_size
+        substituir_se_mudou(temporario, caminho)
+    finally:
+        if temporario.exists():
+            temporario.unlink()
+    if comprimir:
+        from compressao import comprimir as comprimir_artefato
+        comprimir_artefato(caminho)
+    return tamanho
@@ -0,0 +1,306 @@
+# -*- coding: utf-8 -*-
+"""
+Artefatos fatiados (shards) para carregamento sob demanda no dashboard.
+
+A partir dos artefatos já gerados em dashboard/public/data, grava:
+
+    boot.json                 metadados, dimensões, filtros e séries anuais (KPIs)
+    shards/index.json         manifesto: visão/cadeia/ano -> arquivo
+    shards/<visao>.json       uma visão por aba (categorias, paises, graficos, ...)
+    shards/<visao>/cadeia/<cadeia>.json   tabelas por cadeia (filtro)
+    shards/mensal/<ano>.json              série mensal por ano
+    shards/<visao>/ano/<ano>.json         Sankey e municípios de um ano (filtro de ano)
+    shards/hs/<codigo>.json               filhos de um nó da árvore SH/NCM ("raiz": capítulos)
+    shards/prefixos.json                  somas acumuladas mensais: total, por cadeia e por país
+    shards/prefixos/cadeia/<cadeia>.json  somas acumuladas por país de uma cadeia
+
+O dashboard carrega apenas boot.json antes do primeiro render e busca os
+shards da aba ativa e dos filtros selecionados (ver useData.js). Os
+artefatos completos continuam sendo gerados, para compatibilidade.
+
+Uso:
+    python shards.py
+"""
+
+import json
+import re
+import sys
+import io
+import unicodedata
+from collections import defaultdict
+from pathlib import Path
+
+# Fix encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+from dimensoes import NOMES_CADEIAS
+from manifesto import versionado
+from serializacao import escrever_json, expandir, tabela
+
+OUTPUT_DIR = Path("dashboard/public/data")
+SHARDS_DIR = "shards"
+
+# Artefatos completos usados como entrada (sankey_layout.json é gravado junto
+# com sankey_data.json)
+ENTRADAS = ["aggregated.json", "detailed.json", "forecasts.json",
+            "sankey_data.json", "municipios_data.json", "graficos.json",
+            "hierarquia_hs.json", "prefixos.json"]
+
+# Tabelas dos shards por cadeia/ano, fora das visões completas
+POR_FILTRO = {"linksByCadeia", "linksByAno", "linksByAnoCadeia",
+              "municipiosByCadeia", "municipiosByAno", "totaisByAno", "municipiosByAnoCadeia"}
+
+# Shard com os nós do primeiro nível da árvore SH/NCM
+RAIZ_HS = "raiz"
+
+
+def slug(nome):
+    """Nome de arquivo estável para uma cadeia ("Agroind. Grãos" -> "agroind-graos")."""
+    texto = unicodedata.normalize('NFKD', str(nome)).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '-', texto.lower()).strip('-') or 'sem-nome'
+
+
+def _carregar(output_dir, nome):
+    caminho = Path(output_dir) / nome
+    if not caminho.exists():
+        return None
+    with open(caminho, 'r', encoding='utf-8') as f:
+        return expandir(json.load(f))
+
+
+def _nome_cadeia(cadeia):
+    """Nome da cadeia a partir do id (ou do próprio nome); None se desconhecida."""
+    if isinstance(cadeia, str):
+        return cadeia
+    return NOMES_CADEIAS[cadeia] if 0 <= cadeia < len(NOMES_CADEIAS) else None
+
+
+def _agrupar(registros, campo):
+    grupos = defaultdict(list)
+    for registro in registros or []:
+        grupos[registro[campo]].append(registro)
+    return grupos
+
+
+def _prefixos_por_cadeia(prefixos):
+    """Séries de porCadeiaPais (ver preparar_prefixos) agrupadas por cadeia."""
+    grupos = defaultdict(dict)
+    for fluxo in ("exportacoes", "importacoes"):
+        bloco = prefixos.get(fluxo, {}).get("porCadeiaPais")
+        if not bloco:
+            continue
+        linhas = defaultdict(list)
+        for i, cadeia in enumerate(bloco["cadeia"]):
+            linhas[cadeia].append(i)
+        for cadeia, indices in linhas.items():
+            grupos[cadeia][fluxo] = {"porCadeiaPais": {
+                chave: [bloco[chave][i] for i in indices] for chave in ("cadeia", "pais", "acumulado")
+            }}
+    return {cadeia: {"prefixos": dados} for cadeia, dados in sorted(grupos.items())}
+
+
+class _Escritor:
+    """Grava os shards e registra cada arquivo no manifesto."""
+
+    def __init__(self, output_dir):
+        self.output_dir = Path(output_dir)
+        self.gravados = set()
+        self.bytes = 0
+
+    def gravar(self, relativo, dados):
+        tamanho = escrever_json(self.output_dir / relativo, dados, comprimir=True)
+        self.gravados.add(relativo)
+        self.bytes += tamanho
+        return relativo
+
+    def remover_antigos(self):
+        """Remove shards que não foram gravados nesta execução (cadeias/anos que saíram)."""
+        removidos = 0
+        for caminho in list((self.output_dir / SHARDS_DIR).rglob('*')):
+            base = caminho.name.removesuffix('.gz').removesuffix('.br')
+            if not caminho.is_file() or versionado(base):
+                continue
+            if caminho.with_name(base).relative_to(self.output_dir).as_posix() not in self.gravados:
+                caminho.unlink()
+                removidos += 1
+        return removidos
+
+
+def gerar_shards(output_dir=OUTPUT_DIR):
+    """
+    Gera boot.json, os shards e o manifesto a partir dos artefatos completos.
+
+    Args:
+        output_dir: Diretório dos artefatos do dashboard
+
+    Returns:
+        dict: manifesto (shards/index.json) ou None sem aggregated.json
+    """
+    print("Gerando shards...")
+
+    aggregated = _carregar(output_dir, "aggregated.json")
+    if aggregated is None:
+        print("  AVISO: aggregated.json nao encontrado")
+        return None
+    detailed = _carregar(output_dir, "detailed.json")
+    forecasts = _carregar(output_dir, "forecasts.json")
+    sankey = _carregar(output_dir, "sankey_data.json")
+    municipios = _carregar(output_dir, "municipios_data.json")
+    graficos = _carregar(output_dir, "graficos.json")
+    hierarquia = _carregar(output_dir, "hierarquia_hs.json")
+    prefixos = _carregar(output_dir, "prefixos.json")
+    layout = _carregar(output_dir, "sankey_layout.json") or {}
+    layouts = layout.pop("visoes", {})
+    layouts_ano = layout.pop("anos", {})
+
+    escritor = _Escritor(output_dir)
+    manifesto = {"visoes": {}, "porCadeia": {}, "porAno": {}, "hierarquia": {}}
+
+    # Visões completas por aba
+    visoes = {
+        "categorias": {"byCategoria": aggregated.get("byCategoria")},
+        "paises": {"byPais": aggregated.get("byPais")},
+        "produtos": {"topProdutos": aggregated.get("topProdutos")},
+    }
+    if forecasts is not None:
+        visoes["previsoes"] = {"forecasts": forecasts}
+    if sankey is not None:
+        visoes["sankey"] = {"sankey": {k: v for k, v in sankey.items() if k not in POR_FILTRO}}
+        if "geral" in layouts:
+            visoes["sankey"]["sankeyLayout"] = {**layout, "visoes": {"geral": layouts["geral"]}}
+    if graficos is not None:
+        visoes["graficos"] = {"graficos": graficos}
+    if prefixos is not None:
+        # Sem porCadeiaPais (a maior parte do índice): vai nos shards por cadeia
+        visoes["prefixos"] = {"prefixos": {
+            chave: ({k: v for k, v in bloco.items() if k != "porCadeiaPais"}
+                    if chave in ("exportacoes", "importacoes") else bloco)
+            for chave, bloco in prefixos.items()
+        }}
+    if municipios is not None:
+        visoes["municipios"] = {
+            "municipios": {k: v for k, v in municipios.items() if k not in POR_FILTRO}
+        }
+
+    for visao, dados in visoes.items():
+        manifesto["visoes"][visao] = escritor.gravar(f"{SHARDS_DIR}/{visao}.json", dados)
+
+    # Tabelas por cadeia (usadas quando há filtro de cadeia)
+    por_cadeia = {}
+    pais_cadeia = aggregated.get("byPaisByCadeia") or {}
+    if pais_cadeia:
+        exp = _agrupar(pais_cadeia.get("exportacoes"), "cadeia")
+        imp = _agrupar(pais_cadeia.get("importacoes"), "cadeia")
+        por_cadeia["paises"] = {
+            cadeia: {"exportacoes": tabela(exp.get(cadeia, [])),
+                     "importacoes": tabela(imp.get(cadeia, []))}
+            for cadeia in sorted(set(exp) | set(imp))
+        }
+    if sankey is not None and sankey.get("linksByCadeia"):
+        por_cadeia["sankey"] = {
+            cadeia: {"linksByCadeia": tabela(links),
+                     "layouts": {str(cadeia): layouts[str(cadeia)]} if str(cadeia) in layouts else {}}
+            for cadeia, links in sorted(_agrupar(sankey["linksByCadeia"], "cadeia").items())
+        }
+    if municipios is not None and municipios.get("municipiosByCadeia"):
+        por_cadeia["municipios"] = {
+            cadeia: {"municipiosByCadeia": tabela(regs)}
+            for cadeia, regs in sorted(_agrupar(municipios["municipiosByCadeia"], "cadeia").items())
+        }
+
+    if prefixos is not None:
+        por_cadeia["prefixos"] = _prefixos_por_cadeia(prefixos)
+
+    # Manifesto indexado pelo nome da cadeia (as tabelas usam o id, ver dimensoes.py)
+    for visao, cadeias in por_cadeia.items():
+        manifesto["porCadeia"][visao] = {}
+        for cadeia, dados in cadeias.items():
+            nome = _nome_cadeia(cadeia)
+            if nome is not None:
+                manifesto["porCadeia"][visao][nome] = escritor.gravar(
+                    f"{SHARDS_DIR}/{visao}/cadeia/{slug(nome)}.json", dados)
+
+    # Série mensal por ano
+    if detailed is not None and detailed.get("timeseriesMensal"):
+        por_ano = _agrupar(detailed["timeseriesMensal"], "periodo")
+        anos = defaultdict(list)
+        for periodo, registros in sorted(por_ano.items()):
+            anos[int(str(periodo)[:4])].extend(registros)
+        manifesto["porAno"]["mensal"] = {
+            str(ano): escritor.gravar(f"{SHARDS_DIR}/mensal/{ano}.json", {"timeseriesMensal": regs})
+            for ano, regs in sorted(anos.items())
+        }
+
+    # Sankey e municípios de cada ano (seleções já feitas por ano, ver sankey.py
+    # e update_municipios.py)
+    por_ano = {}
+    if sankey is not None and sankey.get("linksByAno"):
+        links_ano = _agrupar(sankey["linksByAno"], "ano")
+        links_ano_cadeia = _agrupar(sankey.get("linksByAnoCadeia"), "ano")
+        por_ano["sankey"] = {
+            ano: {"linksByAno": tabela(links),
+                  "linksByAnoCadeia": tabela(links_ano_cadeia.get(ano, [])),
+                  "layouts": {str(ano): layouts_ano[str(ano)]} if str(ano) in layouts_ano else {}}
+            for ano, links in sorted(links_ano.items())
+        }
+    if municipios is not None and municipios.get("municipiosByAno"):
+        ranking = _agrupar(municipios["municipiosByAno"], "ano")
+        totais = _agrupar(municipios.get("totaisByAno"), "ano")
+        mun_ano_cadeia = _agrupar(municipios.get("municipiosByAnoCadeia"), "ano")
+        por_ano["municipios"] = {
+            ano: {"municipiosByAno": tabela(regs),
+                  "totaisByAno": totais.get(ano, []),
+                  "municipiosByAnoCadeia": tabela(mun_ano_cadeia.get(ano, []))}
+            for ano, regs in sorted(ranking.items())
+        }
+    for visao, anos in por_ano.items():
+        manifesto["porAno"][visao] = {
+            str(ano): escritor.gravar(f"{SHARDS_DIR}/{visao}/ano/{ano}.json", dados)
+            for ano, dados in anos.items()
+        }
+
+    # Filhos de cada nó da árvore SH/NCM (já ordenados por valor, ver preparar_hierarquia_hs)
+    if hierarquia is not None:
+        exp = _agrupar(hierarquia.get("exportacoes"), "pai")
+        imp = _agrupar(hierarquia.get("importacoes"), "pai")
+
+        def filhos(grupos, pai):
+            return tabela([{k: v for k, v in r.items() if k != "pai"} for r in grupos.get(pai, [])])
+
+        manifesto["hierarquia"] = {
+            "niveis": hierarquia.get("niveis"),
+            "nos": {
+                pai or RAIZ_HS: escritor.gravar(
+                    f"{SHARDS_DIR}/hs/{pai or RAIZ_HS}.json",
+                    {"exportacoes": filhos(exp, pai), "importacoes": filhos(imp, pai)})
+                for pai in sorted(set(exp) | set(imp))
+            },
+        }
+
+    # Boot: o necessário para o primeiro render (cabeçalho, filtros e KPIs)
+    boot = {
+        "metadata": aggregated.get("metadata"),
+        "dimensoes": aggregated.get("dimensoes"),
+        "filters": aggregated.get("filters"),
+        "timeseries": aggregated.get("timeseries"),
+        "timeseriesByCadeia": tabela(aggregated.get("timeseriesByCadeia") or []),
+        "shards": f"{SHARDS_DIR}/index.json",
+    }
+    escritor.gravar(f"{SHARDS_DIR}/index.json", manifesto)
+    boot_bytes = escrever_json(Path(output_dir) / "boot.json", boot, comprimir=True)
+    removidos = escritor.remover_antigos()
+
+    print(f"  boot.json: {boot_bytes / 1024:.1f} KB")
+    print(f"  Shards: {len(escritor.gravados)} arquivos ({escritor.bytes / 1024:.1f} KB, {removidos} antigos removidos)")
+    return manifesto
+
+
+def main():
+    """Gera boot.json e os shards a partir dos artefatos atuais."""
+    gerar_shards()
+
+
+if __name__ == "__main__":
+    main()
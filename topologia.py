@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+TopoJSON dos mapas do dashboard (países e municípios do PR).
+
+Os GeoJSON publicados repetem cada fronteira nos dois polígonos vizinhos e
+guardam as coordenadas com precisão total. A topologia gerada aqui:
+
+    - quantiza as coordenadas em uma grade inteira (QUANTIZACAO pontos por
+      eixo, na caixa envolvente do mapa; "transform" volta às coordenadas);
+    - corta os anéis nas junções (pontos em que os vizinhos divergem) e
+      guarda cada trecho uma única vez em "arcs", referenciado pelos
+      polígonos pelo índice (~i = arco i percorrido ao contrário);
+    - simplifica cada arco (Douglas-Peucker, tolerância em células da
+      grade), mantendo as pontas: os vizinhos continuam com a mesma fronteira;
+    - codifica cada arco por diferenças (primeiro ponto absoluto, depois
+      deslocamentos), que viram inteiros pequenos no JSON;
+    - mantém apenas as propriedades usadas pelo dashboard.
+
+O dashboard decodifica com utils/topologia.js e continua usando o GeoJSON
+quando o .topojson não existe.
+
+Uso:
+    python topologia.py       # Converte os GeoJSON publicados e mostra os tamanhos
+"""
+
+import json
+import sys
+import io
+from pathlib import Path
+
+import numpy as np
+
+# Fix encoding for Windows
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+
+from compressao import comprimir
+from serializacao import escrever_json
+
+OUTPUT_DIR = Path("dashboard/public/data")
+
+# Pontos da grade por eixo (como o -q do topojson)
+QUANTIZACAO = 10_000
+
+# Desvio máximo de um ponto removido na simplificação, em células da grade
+TOLERANCIA = 1.5
+
+# GeoJSON publicados -> nome do objeto na topologia e propriedades mantidas
+# (as lidas por WorldMap.jsx e PRMap.jsx; countries.geojson é só a fonte de
+# merge_countries.py e não tem TopoJSON)
+MAPAS = {
+    "countries_merged.geojson": ("countries", ["ISO_CODE", "NAME", "CONTINENT"]),
+    "mun_PR.geojson": ("municipios", ["CodIbge", "Municipio"]),
+}
+
+
+def _poligonos(geometria):
+    """Lista de polígonos (listas de anéis) de um Polygon/MultiPolygon."""
+    if not geometria:
+        return []
+    if geometria['type'] == 'Polygon':
+        return [geometria['coordinates']]
+    if geometria['type'] == 'MultiPolygon':
+        return geometria['coordinates']
+    raise ValueError(f"Geometria nao suportada: {geometria['type']}")
+
+
+def _transformacao(features, quantizacao):
+    """Caixa envolvente e escala da grade (TopoJSON "bbox" e "transform")."""
+    pontos = np.concatenate([
+        np.asarray(anel, dtype=float)[:, :2]
+        for feature in features
+        for poligono in _poligonos(feature.get('geometry'))
+        for anel in poligono
+        if len(anel)
+    ])
+    minimo, maximo = pontos.min(axis=0), pontos.max(axis=0)
+    escala = np.where(maximo > minimo, (maximo - minimo) / (quantizacao - 1), 1.0)
+    return [*minimo.tolist(), *maximo.tolist()], {"scale": escala.tolist(), "translate": minimo.tolist()}
+
+
+def _quantizar(anel, transform):
+    """Anel na grade inteira, sem pontos repetidos em sequência (aberto: sem repetir o primeiro)."""
+    pontos = np.rint((np.asarray(anel, dtype=float)[:, :2] - transform['translate'])
+                     / transform['scale']).astype(np.int64)
+    manter = np.ones(len(pontos), dtype=bool)
+    manter[1:] = (np.diff(pontos, axis=0) != 0).any(axis=1)
+    pontos = [tuple(p) for p in pontos[manter].tolist()]
+    if len(pontos) > 1 and pontos[0] == pontos[-1]:
+        pontos.pop()
+    return pontos
+
+
+def _juncoes(aneis):
+    """Pontos em que os vizinhos diferem entre as passagens (inícios e fins de arcos)."""
+    vizinhos = {}
+    juncoes = set()
+    for anel in aneis:
+        n = len(anel)
+        for i, ponto in enumerate(anel):
+            par = tuple(sorted((anel[i - 1], anel[(i + 1) % n])))
+            anterior = vizinhos.setdefault(ponto, par)
+            if anterior != par:
+                juncoes.add(ponto)
+    return juncoes
+
+
+def _simplificar(pontos, tolerancia):
+    """
+    Douglas-Peucker: índices dos pontos mantidos (sempre as duas pontas).
+
+    Em um arco fechado (anel inteiro) o ponto mais distante do início também
+    é mantido, para que o anel não se reduza a um segmento.
+    """
+    n = len(pontos)
+    manter = np.zeros(n, dtype=bool)
+    manter[[0, n - 1]] = True
+    if n <= 2 or tolerancia <= 0:
+        return np.flatnonzero(np.ones(n, dtype=bool))
+
+    xy = np.asarray(pontos, dtype=float)
+    pilha = [(0, n - 1)]
+    if (xy[0] == xy[-1]).all():
+        meio = int(np.argmax(((xy - xy[0]) ** 2).sum(axis=1)))
+        manter[meio] = True
+        pilha = [(0, meio), (meio, n - 1)]
+
+    while pilha:
+        a, b = pilha.pop()
+        if b - a < 2:
+            continue
+        segmento = xy[b] - xy[a]
+        relativos = xy[a + 1:b] - xy[a]
+        comprimento = np.hypot(*segmento)
+        if comprimento == 0:
+            distancias = np.hypot(relativos[:, 0], relativos[:, 1])
+        else:
+            distancias = np.abs(segmento[0] * relativos[:, 1] - segmento[1] * relativos[:, 0]) / comprimento
+        k = int(np.argmax(distancias))
+        if distancias[k] > tolerancia:
+            meio = a + 1 + k
+            manter[meio] = True
+            pilha += [(a, meio), (meio, b)]
+    return np.flatnonzero(manter)
+
+
+class _Arcos:
+    """Arcos únicos da topologia; um trecho repetido ao contrário vira ~índice."""
+
+    def __init__(self):
+        self.indice = {}
+        self.arcos = []
+
+    def referencia(self, trecho):
+        chave = tuple(trecho)
+        if chave in self.indice:
+            return self.indice[chave]
+        inverso = chave[::-1]
+        if inverso in self.indice:
+            return ~self.indice[inverso]
+        self.indice[chave] = len(self.arcos)
+        self.arcos.append(trecho)
+        return self.indice[chave]
+
+    def codificados(self, tolerancia=TOLERANCIA):
+        """Arcos simplificados, com o primeiro ponto absoluto e os demais como diferenças."""
+        resultado = []
+        for arco in self.arcos:
+            pontos = np.asarray(arco, dtype=np.int64)[_simplificar(arco, tolerancia)]
+            pontos[1:] = np.diff(pontos, axis=0)
+            resultado.append(pontos.tolist())
+        return resultado
+
+
+def _cortar(anel, juncoes, arcos):
+    """Referências dos arcos de um anel (fechado), cortado nas junções."""
+    cortes = [i for i, ponto in enumerate(anel) if ponto in juncoes]
+    if not cortes:
+        # Anel sem junções: um único arco, começando no menor ponto (para
+        # que o mesmo anel em outro polígono gere o mesmo arco)
+        inicio = anel.index(min(anel))
+        girado = anel[inicio:] + anel[:inicio]
+        return [arcos.referencia(girado + girado[:1])]
+
+    girado = anel[cortes[0]:] + anel[:cortes[0]]
+    posicoes = [i - cortes[0] for i in cortes] + [len(anel)]
+    fechado = girado + girado[:1]
+    return [arcos.referencia(fechado[a:b + 1]) for a, b in zip(posicoes, posicoes[1:])]
+
+
+def topologia(geojson, nome, propriedades=None, quantizacao=QUANTIZACAO, tolerancia=TOLERANCIA):
+    """
+    Converte uma FeatureCollection de Polygon/MultiPolygon em TopoJSON.
+
+    Args:
+        geojson: FeatureCollection (dict)
+        nome: Nome do objeto na topologia ("objects")
+        propriedades: Propriedades mantidas (padrão: todas)
+        quantizacao: Pontos da grade por eixo
+        tolerancia: Simplificação dos arcos, em células da grade (0 desliga)
+
+    Returns:
+        dict no formato TopoJSON (quantizado, arcos compartilhados e com diferenças)
+    """
+    features = geojson.get('features', [])
+    bbox, transform = _transformacao(features, quantizacao)
+
+    geometrias = [
+        [[_quantizar(anel, transform) for anel in poligono] for poligono in _poligonos(feature.get('geometry'))]
+        for feature in features
+    ]
+    juncoes = _juncoes(anel for poligonos in geometrias for poligono in poligonos for anel in poligono)
+
+    arcos = _Arcos()
+    objetos = []
+    for feature, poligonos in zip(features, geometrias):
+        referencias = [[_cortar(anel, juncoes, arcos) for anel in poligono] for poligono in poligonos]
+        if not referencias:
+            geometria = {"type": None}
+        elif len(referencias) == 1 and feature['geometry']['type'] == 'Polygon':
+            geometria = {"type": "Polygon", "arcs": referencias[0]}
+        else:
+            geometria = {"type": "MultiPolygon", "arcs": referencias}
+        if feature.get('id') is not None:
+            geometria["id"] = feature['id']
+        props = feature.get('properties') or {}
+        if propriedades is not None:
+            props = {chave: props[chave] for chave in propriedades if chave in props}
+        if props:
+            geometria["properties"] = props
+        objetos.append(geometria)
+
+    return {
+        "type": "Topology",
+        "bbox": bbox,
+        "transform": transform,
+        "objects": {nome: {"type": "GeometryCollection", "geometries": objetos}},
+        "arcs": arcos.codificados(tolerancia),
+    }
+
+
+def salvar_topojson(geojson, destino, nome, propriedades=None):
+    """
+    Grava a topologia de um GeoJSON (com os irmãos .gz/.br).
+
+    Returns:
+        tuple: (bruto, gzip, brotli) em bytes, como compressao.comprimir
+    """
+    topo = topologia(geojson, nome, propriedades)
+    escrever_json(destino, topo, comprimir=True)
+    print(f"  TopoJSON salvo: {destino} ({len(topo['arcs']):,} arcos)")
+    return comprimir(destino)
+
+
+def _kb(tamanho):
+    return "-" if tamanho is None else f"{tamanho / 1024:,.1f} KB"
+
+
+def imprimir_relatorio(tamanhos):
+    """
+    Tabela GeoJSON x TopoJSON (bruto/gzip/brotli) e a razão entre eles.
+
+    Args:
+        tamanhos: {mapa: ((bruto, gzip, brotli) do GeoJSON, (...) do TopoJSON)}
+    """
+    if not tamanhos:
+        return
+    largura = max(26, *(len(nome) for nome in tamanhos))
+    print(f"\n  {'Mapa':{largura}} {'':>8} {'Bruto':>12} {'gzip':>12} {'brotli':>12}")
+    for nome, (geo, topo) in tamanhos.items():
+        print(f"  {nome:{largura}} {'GeoJSON':>8} {_kb(geo[0]):>12} {_kb(geo[1]):>12} {_kb(geo[2]):>12}")
+        print(f"  {'':{largura}} {'TopoJSON':>8} {_kb(topo[0]):>12} {_kb(topo[1]):>12} {_kb(topo[2]):>12}")
+        razoes = [f"{g / t:.1f}x" if g and t else "-" for g, t in zip(geo, topo)]
+        print(f"  {'':{largura}} {'razao':>8} {razoes[0]:>12} {razoes[1]:>12} {razoes[2]:>12}")
+
+
+def converter_mapas(output_dir=OUTPUT_DIR, mapas=MAPAS):
+    """
+    Gera o .topojson de cada GeoJSON publicado em output_dir.
+
+    Returns:
+        dict: tamanhos por mapa (ver imprimir_relatorio)
+    """
+    tamanhos = {}
+    for arquivo, (nome, propriedades) in mapas.items():
+        origem = Path(output_dir) / arquivo
+        if not origem.exists():
+            continue
+        with open(origem, 'r', encoding='utf-8') as f:
+            geojson = json.load(f)
+        destino = origem.with_suffix('.topojson')
+        tamanhos[arquivo] = (comprimir(origem), salvar_topojson(geojson, destino, nome, propriedades))
+    return tamanhos
+
+
+def main():
+    """Converte os GeoJSON publicados e mostra o relatório de tamanhos."""
+    print("Gerando TopoJSON...")
+    imprimir_relatorio(converter_mapas())
+
+
+if __name__ == "__main__":
+    main()
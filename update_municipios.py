@@ -10,31 +10,30 @@ import numpy as np
 import sys
 import io
 
+from dimensoes import dimensao, ids, ids_cadeias
+from serializacao import escrever_json, registros, tabela
+from sankey import construir_sankey, salvar_sankey, top_k
+
 # Importar mapeamento de cadeia
 try:
-    from ncm_cadeias_map import classificar_cadeia_sh4, CADEIAS, CADEIA_CORES
-    def get_cadeia_from_sh4(sh4):
-        return classificar_cadeia_sh4(sh4)
+    from ncm_cadeias_map import classificar_cadeia_sh4_array, CADEIAS, CADEIA_CORES
+    def get_cadeias_from_sh4(sh4_codes):
+        return classificar_cadeia_sh4_array(sh4_codes)
 except ImportError:
     CADEIAS = {}
     CADEIA_CORES = {}
-    def get_cadeia_from_sh4(sh4):
-        return "outros", "Outros"
+    def get_cadeias_from_sh4(sh4_codes):
+        n = len(sh4_codes)
+        return np.full(n, "outros", dtype=object), np.full(n, "Outros", dtype=object)
+
+# Municípios no ranking do mapa (geral e de cada ano)
+TOP_MUNICIPIOS = 50
 
 # Configurar encoding UTF-8 para Windows
-if sys.platform == 'win32':
+if sys.platform == 'win32' and sys.stdout.encoding.lower() != 'utf-8':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super().default(obj)
 
 def load_municipios_from_geojson():
     """Carrega municípios do arquivo GeoJSON"""
@@ -58,6 +57,124 @@ def load_municipios_from_geojson():
     print(f"Carregados {len(mun_dict)} municípios do GeoJSON")
     return mun_dict
 
+def preparar_municipios_data(flow_df, flow_cadeia_df=None):
+    """
+    Prepara os dados do mapa de municípios.
+
+    Com CO_ANO nos fluxos, também o ranking e os totais de cada ano
+    (municipiosByAno, totaisByAno) e os totais por ano e cadeia
+    (municipiosByAnoCadeia), de um único agrupamento.
+
+    Args:
+        flow_df: Fluxos com CO_MUN, NO_MUN, VL_FOB e KG_LIQUIDO (CO_ANO opcional)
+        flow_cadeia_df: Fluxos com CADEIA (opcional, para municipiosByCadeia)
+
+    Returns:
+        dict no formato de municipios_data.json
+    """
+    mun_totals = flow_df.groupby('CO_MUN').agg({
+        'VL_FOB': 'sum',
+        'KG_LIQUIDO': 'sum',
+        'NO_MUN': 'first'
+    }).reset_index()
+
+    mun_totals = mun_totals.sort_values('VL_FOB', ascending=False)
+    total_valor = mun_totals['VL_FOB'].sum()
+
+    map_data = []
+    for _, row in mun_totals.head(TOP_MUNICIPIOS).iterrows():
+        map_data.append({
+            'codigo': int(row['CO_MUN']),
+            'nome': row['NO_MUN'],
+            'valor': float(row['VL_FOB']),
+            'peso': float(row['KG_LIQUIDO']),
+            'percentual': float(row['VL_FOB'] / total_valor * 100)
+        })
+
+    # Criar municipiosByCadeia se temos dados por cadeia (ids - ver dimensoes.py)
+    fontes = [flow_df] if flow_cadeia_df is None else [flow_df, flow_cadeia_df]
+    dim_municipios = dimensao(*fontes, codigo='CO_MUN', nome='NO_MUN')
+    municipios_by_cadeia = pd.DataFrame(columns=['municipio', 'cadeia', 'valor', 'peso'])
+    if flow_cadeia_df is not None:
+        # Agregar por município e cadeia
+        mun_cadeia_totals = flow_cadeia_df.groupby(['CO_MUN', 'CADEIA']).agg({
+            'VL_FOB': 'sum',
+            'KG_LIQUIDO': 'sum'
+        }).reset_index()
+
+        municipios_by_cadeia = pd.DataFrame({
+            'municipio': ids(mun_cadeia_totals['CO_MUN'], dim_municipios),
+            'cadeia': ids_cadeias(mun_cadeia_totals['CADEIA']),
+            'valor': mun_cadeia_totals['VL_FOB'].astype(float).to_numpy(),
+            'peso': mun_cadeia_totals['KG_LIQUIDO'].astype(float).to_numpy(),
+        })
+        print(f"   Criados {len(municipios_by_cadeia)} registros municipio-cadeia")
+
+    output = {
+        'totalValor': float(total_valor),
+        'totalPeso': float(mun_totals['KG_LIQUIDO'].sum()),
+        'municipios': map_data,
+        'dimensoes': {'municipios': registros(dim_municipios)},
+        'municipiosByCadeia': tabela(municipios_by_cadeia)
+    }
+
+    fonte = flow_df
+    if flow_cadeia_df is not None and 'CO_ANO' in flow_cadeia_df.columns:
+        fonte = flow_cadeia_df
+    if 'CO_ANO' in fonte.columns:
+        output.update(_municipios_por_ano(fonte, dim_municipios))
+    return output
+
+def _municipios_por_ano(fonte, dim_municipios):
+    """Ranking e totais de cada ano (e por ano e cadeia) a partir de um agregado por ano."""
+    colunas = ['VL_FOB', 'KG_LIQUIDO']
+    grupos = ['CO_ANO'] + (['CADEIA'] if 'CADEIA' in fonte.columns else [])
+    base = fonte.groupby(grupos + ['CO_MUN'], sort=True, observed=True, as_index=False)[colunas].sum()
+
+    por_ano = base
+    if len(grupos) > 1:
+        por_ano = base.groupby(['CO_ANO', 'CO_MUN'], as_index=False)[colunas].sum()
+    totais = por_ano.groupby('CO_ANO')[colunas].sum()
+    ranking = top_k(por_ano, ['CO_ANO'], 'VL_FOB', TOP_MUNICIPIOS)
+    total_ano = ranking['CO_ANO'].map(totais['VL_FOB'])
+
+    municipios_by_ano = pd.DataFrame({
+        'municipio': ids(ranking['CO_MUN'], dim_municipios),
+        'ano': ranking['CO_ANO'].to_numpy(dtype='int64'),
+        'valor': ranking['VL_FOB'].astype(float).to_numpy(),
+        'peso': ranking['KG_LIQUIDO'].astype(float).to_numpy(),
+        'percentual': (ranking['VL_FOB'] / total_ano * 100).astype(float).to_numpy(),
+    })
+    totais_by_ano = pd.DataFrame({
+        'ano': totais.index.to_numpy(dtype='int64'),
+        'valor': totais['VL_FOB'].astype(float).to_numpy(),
+        'peso': totais['KG_LIQUIDO'].astype(float).to_numpy(),
+    })
+
+    municipios_by_ano_cadeia = pd.DataFrame(columns=['municipio', 'ano', 'cadeia', 'valor', 'peso'])
+    if 'CADEIA' in grupos:
+        municipios_by_ano_cadeia = pd.DataFrame({
+            'municipio': ids(base['CO_MUN'], dim_municipios),
+            'ano': base['CO_ANO'].to_numpy(dtype='int64'),
+            'cadeia': ids_cadeias(base['CADEIA']),
+            'valor': base['VL_FOB'].astype(float).to_numpy(),
+            'peso': base['KG_LIQUIDO'].astype(float).to_numpy(),
+        })
+
+    print(f"   Por ano: {len(totais_by_ano)} anos, {len(municipios_by_ano_cadeia)} registros ano-cadeia")
+    return {
+        'anos': totais_by_ano['ano'].tolist(),
+        'totaisByAno': registros(totais_by_ano),
+        'municipiosByAno': tabela(municipios_by_ano),
+        'municipiosByAnoCadeia': tabela(municipios_by_ano_cadeia),
+    }
+
+def salvar_municipios_data(output):
+    """Salva municipios_data.json para o dashboard"""
+    mun_file = Path("dashboard/public/data/municipios_data.json")
+    escrever_json(mun_file, output, comprimir=True)
+    print(f"   Salvo: {mun_file} ({len(output['municipios'])} municípios, {len(output['municipiosByCadeia'])} por cadeia)")
+
 def create_all_data():
     """Cria todos os dados necessários para Sankey e mapa"""
     print("=== Atualizando dados de municípios ===")
@@ -89,138 +206,25 @@ def create_all_data():
         flow_df['CO_MUN'].astype(str)
     )
 
-    # --- Criar dados para Sankey ---
-    print("\n1. Criando dados para Sankey...")
-
-    # Top 12 municípios e top 12 países por valor
-    top_mun = flow_df.groupby('CO_MUN')['VL_FOB'].sum().nlargest(12).index.tolist()
-    top_pais = flow_df.groupby('CO_PAIS')['VL_FOB'].sum().nlargest(12).index.tolist()
-
-    sankey_flows = flow_df[
-        (flow_df['CO_MUN'].isin(top_mun)) &
-        (flow_df['CO_PAIS'].isin(top_pais))
-    ].copy()
-
-    # Agregar por município-país
-    sankey_agg = sankey_flows.groupby(['NO_MUN', 'NO_PAIS']).agg({
-        'VL_FOB': 'sum'
-    }).reset_index()
-
-    # Criar nodes
-    municipios = sankey_agg['NO_MUN'].unique().tolist()
-    paises = sankey_agg['NO_PAIS'].unique().tolist()
-
-    nodes = []
-    for m in municipios:
-        nodes.append({
-            'id': f"mun_{m}",
-            'name': m,
-            'type': 'municipio'
-        })
-    for p in paises:
-        nodes.append({
-            'id': f"pais_{p}",
-            'name': p,
-            'type': 'pais'
-        })
-
-    # Criar links (top 60 fluxos)
-    links = []
-    for _, row in sankey_agg.nlargest(60, 'VL_FOB').iterrows():
-        links.append({
-            'source': f"mun_{row['NO_MUN']}",
-            'target': f"pais_{row['NO_PAIS']}",
-            'value': float(row['VL_FOB'])
-        })
-
-    # Criar linksByCadeia se temos dados por cadeia
-    links_by_cadeia = []
     if flow_cadeia_df is not None:
-        # Atualizar nomes de municípios no flow_cadeia_df
         flow_cadeia_df['NO_MUN'] = flow_cadeia_df['CO_MUN'].map(MUNICIPIOS_PR).fillna(
             flow_cadeia_df['CO_MUN'].astype(str)
         )
 
-        # Filtrar pelos top municípios e países
-        sankey_flows_cadeia = flow_cadeia_df[
-            (flow_cadeia_df['CO_MUN'].isin(top_mun)) &
-            (flow_cadeia_df['CO_PAIS'].isin(top_pais))
-        ].copy()
-
-        # Agregar por município-país-cadeia
-        sankey_agg_cadeia = sankey_flows_cadeia.groupby(['NO_MUN', 'NO_PAIS', 'CADEIA']).agg({
-            'VL_FOB': 'sum'
-        }).reset_index()
-
-        # Criar links por cadeia
-        for _, row in sankey_agg_cadeia.iterrows():
-            links_by_cadeia.append({
-                'source': f"mun_{row['NO_MUN']}",
-                'target': f"pais_{row['NO_PAIS']}",
-                'value': float(row['VL_FOB']),
-                'cadeia': row['CADEIA']
-            })
-        print(f"   Criados {len(links_by_cadeia)} links por cadeia")
-
-    sankey_data = {'nodes': nodes, 'links': links, 'linksByCadeia': links_by_cadeia}
+    # --- Criar dados para Sankey (ver sankey.py) ---
+    print("\n1. Criando dados para Sankey...")
 
-    sankey_file = Path("dashboard/public/data/sankey_data.json")
-    with open(sankey_file, 'w', encoding='utf-8') as f:
-        json.dump(sankey_data, f, cls=NumpyEncoder, ensure_ascii=False, indent=2)
-    print(f"   Salvo: {sankey_file} ({len(nodes)} nodes, {len(links)} links, {len(links_by_cadeia)} linksByCadeia)")
+    # Os fluxos por cadeia somam os fluxos totais: com eles, um único agregado
+    # serve à visão geral e ao filtro por cadeia
+    sankey_data = construir_sankey(flow_df if flow_cadeia_df is None else flow_cadeia_df, top_links=60)
+    salvar_sankey(sankey_data)
 
     # --- Criar dados para mapa de municípios ---
     print("\n2. Criando dados para mapa de municípios...")
 
-    mun_totals = flow_df.groupby('CO_MUN').agg({
-        'VL_FOB': 'sum',
-        'KG_LIQUIDO': 'sum',
-        'NO_MUN': 'first'
-    }).reset_index()
-
-    mun_totals = mun_totals.sort_values('VL_FOB', ascending=False)
-    total_valor = mun_totals['VL_FOB'].sum()
-
-    map_data = []
-    for _, row in mun_totals.head(50).iterrows():
-        map_data.append({
-            'codigo': int(row['CO_MUN']),
-            'nome': row['NO_MUN'],
-            'valor': float(row['VL_FOB']),
-            'peso': float(row['KG_LIQUIDO']),
-            'percentual': float(row['VL_FOB'] / total_valor * 100)
-        })
-
-    # Criar municipiosByCadeia se temos dados por cadeia
-    municipios_by_cadeia = []
-    if flow_cadeia_df is not None:
-        # Agregar por município e cadeia
-        mun_cadeia_totals = flow_cadeia_df.groupby(['CO_MUN', 'NO_MUN', 'CADEIA']).agg({
-            'VL_FOB': 'sum',
-            'KG_LIQUIDO': 'sum'
-        }).reset_index()
-
-        for _, row in mun_cadeia_totals.iterrows():
-            municipios_by_cadeia.append({
-                'codigo': int(row['CO_MUN']),
-                'nome': row['NO_MUN'],
-                'cadeia': row['CADEIA'],
-                'valor': float(row['VL_FOB']),
-                'peso': float(row['KG_LIQUIDO'])
-            })
-        print(f"   Criados {len(municipios_by_cadeia)} registros municipio-cadeia")
-
-    output = {
-        'totalValor': float(total_valor),
-        'totalPeso': float(mun_totals['KG_LIQUIDO'].sum()),
-        'municipios': map_data,
-        'municipiosByCadeia': municipios_by_cadeia
-    }
-
-    mun_file = Path("dashboard/public/data/municipios_data.json")
-    with open(mun_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, cls=NumpyEncoder, ensure_ascii=False, indent=2)
-    print(f"   Salvo: {mun_file} ({len(map_data)} municípios, {len(municipios_by_cadeia)} por cadeia)")
+    output = preparar_municipios_data(flow_df, flow_cadeia_df)
+    salvar_municipios_data(output)
+    map_data = output['municipios']
 
     # --- Mostrar resumo ---
     print("\n=== Top 10 Municípios Exportadores ===")
@@ -14,17 +14,10 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
     sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
 
-from ncm_cadeias_map import classificar_cadeia, CADEIA_CORES
-
-class NumpyEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (np.integer, np.int64, np.int32)):
-            return int(obj)
-        if isinstance(obj, (np.floating, np.float64, np.float32)):
-            return float(obj)
-        if isinstance(obj, np.ndarray):
-            return obj.tolist()
-        return super().default(obj)
+from ncm_cadeias_map import CADEIA_CORES
+from cadeia_lookup import classificar_ncm
+from sankey import construir_sankey, salvar_sankey
+
 
 def load_municipios_from_geojson():
     """Carrega municípios do arquivo GeoJSON"""
@@ -74,96 +67,18 @@ def create_sankey_with_cadeia():
 
     # Classificar por cadeia
     print("Classificando por cadeia produtiva...")
-    def aplicar_cadeia(row):
-        _, nome = classificar_cadeia(row['CO_NCM'], row.get('DESC_NCM', ''), row['CAPITULO_NCM'])
-        return nome
-
-    df['CADEIA'] = df.apply(aplicar_cadeia, axis=1)
+    _, nomes = classificar_ncm(df['CO_NCM'], df.get('DESC_NCM'), df['CAPITULO_NCM'])
+    df['CADEIA'] = np.asarray(nomes)
 
     # Atualizar nomes de municípios
     df['NO_MUN'] = df['CO_MUN'].map(MUNICIPIOS_PR).fillna(df['CO_MUN'].astype(str))
 
-    # --- Criar dados para Sankey por cadeia ---
+    # --- Criar dados para Sankey por cadeia (ver sankey.py) ---
     print("\nAgregando por Município x País x Cadeia...")
+    sankey_data = construir_sankey(df.rename(columns={'PAIS': 'NO_PAIS'}), top_links=60)
 
-    # Top municípios e países por valor total
-    top_mun = df.groupby('CO_MUN')['VL_FOB'].sum().nlargest(12).index.tolist()
-    top_pais = df.groupby('CO_PAIS')['VL_FOB'].sum().nlargest(12).index.tolist()
-
-    # Filtrar para top municípios e países
-    sankey_df = df[
-        (df['CO_MUN'].isin(top_mun)) &
-        (df['CO_PAIS'].isin(top_pais))
-    ].copy()
-
-    # Agregar por município-país-cadeia
-    sankey_agg = sankey_df.groupby(['NO_MUN', 'PAIS', 'CADEIA']).agg({
-        'VL_FOB': 'sum'
-    }).reset_index()
-
-    print(f"Total de fluxos (com cadeia): {len(sankey_agg)}")
-
-    # Criar nodes
-    municipios = sankey_agg['NO_MUN'].unique().tolist()
-    paises = sankey_agg['PAIS'].unique().tolist()
-    cadeias_list = sankey_agg['CADEIA'].unique().tolist()
-
-    print(f"Municípios: {len(municipios)}, Países: {len(paises)}, Cadeias: {len(cadeias_list)}")
-
-    nodes = []
-    for m in municipios:
-        nodes.append({
-            'id': f"mun_{m}",
-            'name': m,
-            'type': 'municipio'
-        })
-    for p in paises:
-        nodes.append({
-            'id': f"pais_{p}",
-            'name': p,
-            'type': 'pais'
-        })
-
-    # Criar links com informação de cadeia (top 100 fluxos)
-    links = []
-    for _, row in sankey_agg.nlargest(100, 'VL_FOB').iterrows():
-        links.append({
-            'source': f"mun_{row['NO_MUN']}",
-            'target': f"pais_{row['PAIS']}",
-            'value': float(row['VL_FOB']),
-            'cadeia': row['CADEIA']
-        })
-
-    # Também criar versão agregada (sem cadeia) para o total
-    sankey_total = sankey_df.groupby(['NO_MUN', 'PAIS']).agg({
-        'VL_FOB': 'sum'
-    }).reset_index()
-
-    links_total = []
-    for _, row in sankey_total.nlargest(60, 'VL_FOB').iterrows():
-        links_total.append({
-            'source': f"mun_{row['NO_MUN']}",
-            'target': f"pais_{row['PAIS']}",
-            'value': float(row['VL_FOB'])
-        })
-
-    sankey_data = {
-        'nodes': nodes,
-        'links': links_total,  # Links agregados (total)
-        'linksByCadeia': links,  # Links com informação de cadeia
-        'cadeias': cadeias_list
-    }
-
-    # Salvar
-    sankey_file = Path("dashboard/public/data/sankey_data.json")
-    with open(sankey_file, 'w', encoding='utf-8') as f:
-        json.dump(sankey_data, f, cls=NumpyEncoder, ensure_ascii=False, indent=2)
-
-    print(f"\nSalvo: {sankey_file}")
-    print(f"  - {len(nodes)} nodes")
-    print(f"  - {len(links_total)} links totais")
-    print(f"  - {len(links)} links por cadeia")
-    print(f"  - {len(cadeias_list)} cadeias")
+    # Salvar (com o layout pré-calculado)
+    salvar_sankey(sankey_data)
 
     print("\n=== Concluído ===")
 